@@ -0,0 +1,81 @@
+"""
+EMI pricing microbenchmarks: vectorized NumPy path vs the per-loan Decimal
+path, and the annuity factor table vs the uncached (1 + r) ** n formula.
+    
+    python benchmarks/bench_emi.py --loans 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
+
+import django  # noqa: E402
+django.setup()
+
+import numpy as np  # noqa: E402
+from loans.services.loan_calculator import (  # noqa: E402
+    annuity_factor,
+    calculate_monthly_installment,
+    calculate_monthly_installment_uncached,
+    calculate_monthly_installments,
+)
+
+
+def make_portfolio(size, seed=42):
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(50_000, 5_000_000, size) / 1.0
+    rates = np.round(rng.uniform(6, 24, size), 2)
+    tenures = rng.choice([6, 12, 18, 24, 36, 48, 60, 72, 84], size)
+    return amounts, rates, tenures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=1_000_000)
+    parser.add_argument('--decimal-sample', type=int, default=20_000,
+                        help='Loans priced with the Decimal path to extrapolate its cost')
+    args = parser.parse_args()
+    
+    amounts, rates, tenures = make_portfolio(args.loans)
+    
+    started = time.perf_counter()
+    calculate_monthly_installments(amounts, rates, tenures)
+    vectorized = time.perf_counter() - started
+    
+    sample = min(args.decimal_sample, args.loans)
+    started = time.perf_counter()
+    for i in range(sample):
+        calculate_monthly_installment(amounts[i], rates[i], int(tenures[i]))
+    per_loan = (time.perf_counter() - started) / sample
+    
+    print(f'vectorized: {args.loans:,} loans in {vectorized:.3f}s')
+    print(f'decimal:    {per_loan * 1e6:.1f}us/loan, ~{per_loan * args.loans:.1f}s for {args.loans:,} loans')
+    
+    # Scalar path as used by the API: Decimal inputs, one loan at a time
+    loans = [
+        (Decimal(str(amounts[i])), Decimal(str(rates[i])), int(tenures[i])) for i in range(sample)
+    ]
+    def per_loan(function):
+        started = time.perf_counter()
+        for loan in loans:
+            function(*loan)
+        return (time.perf_counter() - started) / sample
+    
+    uncached = per_loan(calculate_monthly_installment_uncached)
+    annuity_factor.cache_clear()
+    cold = per_loan(calculate_monthly_installment)
+    warm = per_loan(calculate_monthly_installment)
+    
+    info = annuity_factor.cache_info()
+    print(f'uncached:     {uncached * 1e6:.1f}us/loan')
+    print(f'factor table: {cold * 1e6:.1f}us/loan cold, {warm * 1e6:.1f}us/loan warm '
+          f'({uncached / warm:.1f}x, {info.currsize:,} factors cached)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Customer insert throughput before and after the registration changes:
+the exists() lookup plus the redundant phone_number/customer_id indexes
+(before) against the constraint-only insert without them (after), for
+single registrations and for create_customers batches. Runs against the
+configured database inside one transaction that is rolled back.
+    
+    python benchmarks/bench_registration.py --customers 5000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from loans.models import Customer  # noqa: E402
+from loans.services.registration import create_customers  # noqa: E402
+
+REDUNDANT_INDEXES = {'bench_customers_phone_number': 'phone_number', 'bench_customers_customer_id': 'customer_id'}
+
+
+class Rollback(Exception):
+    pass
+
+
+def new_customers(prefix, count):
+    return [
+        Customer(
+            first_name='Bench', last_name=str(i), age=30, phone_number=f'{prefix}{i:08d}',
+            monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000'), current_debt=0
+        )
+        for i in range(count)
+    ]
+
+
+def drop_existing_redundant_indexes():
+    """Databases created before migration 0002 still carry the two indexes"""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, Customer._meta.db_table)
+        for name, info in constraints.items():
+            if info['index'] and not info['unique'] and not info['primary_key'] and \
+                    info['columns'] in (['phone_number'], ['customer_id']):
+                cursor.execute(f'DROP INDEX {qn(name)}')
+
+
+def add_redundant_indexes():
+    qn = connection.ops.quote_name
+    table = qn(Customer._meta.db_table)
+    with connection.cursor() as cursor:
+        for name, column in REDUNDANT_INDEXES.items():
+            cursor.execute(f'CREATE INDEX {qn(name)} ON {table} ({qn(column)})')
+
+
+def drop_redundant_indexes():
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for name in REDUNDANT_INDEXES:
+            cursor.execute(f'DROP INDEX {qn(name)}')
+
+
+def register_one_by_one(customers, lookup_first):
+    started = time.perf_counter()
+    for customer in customers:
+        if lookup_first:
+            Customer.objects.filter(phone_number=customer.phone_number).exists()
+            customer.save()
+        else:
+            with transaction.atomic():
+                customer.save()
+    return len(customers) / (time.perf_counter() - started)
+
+
+def register_in_batches(customers, batch_size):
+    started = time.perf_counter()
+    for start in range(0, len(customers), batch_size):
+        create_customers(customers[start:start + batch_size])
+    return len(customers) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    results = {}
+    try:
+        with transaction.atomic():
+            drop_existing_redundant_indexes()
+            # Warm up caches and the connection so the first measured run is not penalised
+            register_in_batches(new_customers('b0', args.customers), args.batch_size)
+            
+            add_redundant_indexes()
+            results['before', 'single'] = register_one_by_one(new_customers('b1', args.customers), lookup_first=True)
+            results['before', 'batch'] = register_in_batches(new_customers('b2', args.customers), args.batch_size)
+            
+            drop_redundant_indexes()
+            results['after', 'single'] = register_one_by_one(new_customers('b3', args.customers), lookup_first=False)
+            results['after', 'batch'] = register_in_batches(new_customers('b4', args.customers), args.batch_size)
+            raise Rollback
+    except Rollback:
+        pass
+    
+    print(f'{connection.vendor}, {args.customers:,} customers per run')
+    for mode in ('single', 'batch'):
+        before, after = results['before', mode], results['after', mode]
+        print(f'{mode:<7} before {before:9,.0f}/s   after {after:9,.0f}/s   {after / before:4.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Response serialization microbenchmarks: DRF serializers + JSONRenderer vs
+loans.fast_serializers + ORJSONRenderer, on in-memory data (no database).
+    
+    python benchmarks/bench_serializers.py --loans 1000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from loans import fast_serializers  # noqa: E402
+from loans.models import Customer, Loan  # noqa: E402
+from loans.renderers import ORJSONRenderer  # noqa: E402
+from loans.serializers import (  # noqa: E402
+    CustomerLoanSerializer,
+    LoanDetailSerializer,
+    LoanEligibilityResponseSerializer
+)
+
+
+def make_rows(count):
+    return [
+        {
+            'loan_id': i,
+            'loan_amount': Decimal(100000 + i * 250),
+            'interest_rate': Decimal('12.50'),
+            'monthly_repayment': Decimal(4700 + i) + Decimal('0.73'),
+            'repayments_left': i % 24,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(name, drf, fast):
+    print(f'{name:<22} drf {drf * 1e6:9.1f}us   fast {fast * 1e6:9.1f}us   {drf / fast:5.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=1000, help='Rows in the view-loans list')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    
+    drf_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+    
+    rows = make_rows(args.loans)
+    report(
+        f'view-loans ({args.loans} rows)',
+        timed(lambda: drf_renderer.render(CustomerLoanSerializer(rows, many=True).data), args.repeat),
+        timed(lambda: fast_renderer.render(fast_serializers.customer_loans(rows)), args.repeat),
+    )
+    
+    customer = Customer(customer_id=7, first_name='Asha', last_name='Rao', phone_number='9876543210', age=34)
+    loan = Loan(loan_id=42, customer=customer, loan_amount=Decimal('500000.00'), interest_rate=Decimal('11.50'),
+                monthly_repayment=Decimal('16489.05'), tenure=36)
+    row = {
+        'loan_id': 42, 'customer__customer_id': 7, 'customer__first_name': 'Asha', 'customer__last_name': 'Rao',
+        'customer__phone_number': '9876543210', 'customer__age': 34, 'loan_amount': Decimal('500000.00'),
+        'interest_rate': Decimal('11.50'), 'monthly_repayment': Decimal('16489.05'), 'tenure': 36,
+    }
+    repeat = args.repeat * 50
+    report(
+        'view-loan',
+        timed(lambda: drf_renderer.render(LoanDetailSerializer(loan).data), repeat),
+        timed(lambda: fast_renderer.render(fast_serializers.loan_detail(row)), repeat),
+    )
+    
+    result = {'customer_id': 7, 'approval': True, 'interest_rate': 11.5,
+              'corrected_interest_rate': 12.0, 'tenure': 36, 'monthly_installment': 16607.15}
+    
+    def drf_eligibility():
+        serializer = LoanEligibilityResponseSerializer(data=result)
+        serializer.is_valid()
+        return drf_renderer.render(serializer.data)
+    
+    report(
+        'check-eligibility',
+        timed(drf_eligibility, repeat),
+        timed(lambda: fast_renderer.render(fast_serializers.validated_eligibility_result(result)), repeat),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Diff two result files written by benchmarks/suite.py:
+    
+    python benchmarks/compare.py before.json after.json --threshold 10
+
+Every numeric measurement present in both is printed with its change.
+Timings (_ms, _us, seconds) and query counts are better lower, throughput
+(_per_second) is better higher. Changes worse than --threshold percent
+are flagged and make the exit status 1, so the script can gate CI.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms', '_us', 'seconds', 'queries_per_request')
+HIGHER_IS_BETTER = ('_per_second',)
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from flatten(value, f'{name}.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def direction(name):
+    """+1 when an increase is an improvement, -1 when it is a regression, 0 for counts"""
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(before, after, threshold):
+    """(name, before, after, percent change, regressed) for every shared measurement"""
+    old = dict(flatten({key: value for key, value in before.items() if key != 'meta'}))
+    new = dict(flatten({key: value for key, value in after.items() if key != 'meta'}))
+    rows = []
+    for name, old_value in old.items():
+        if name not in new:
+            continue
+        new_value = new[name]
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        regressed = direction(name) != 0 and -direction(name) * change > threshold
+        rows.append((name, old_value, new_value, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='Percent change counted as a regression')
+    args = parser.parse_args()
+    
+    with open(args.before) as handle:
+        before = json.load(handle)
+    with open(args.after) as handle:
+        after = json.load(handle)
+    
+    for label, results in (('before', before), ('after', after)):
+        meta = results.get('meta', {})
+        dirty = ' (dirty)' if meta.get('dirty') else ''
+        print(f"{label}: {meta.get('commit')}{dirty} {meta.get('database')} {meta.get('timestamp')}")
+    
+    rows = compare(before, after, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    for name, old_value, new_value, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:<{width}}  {old_value:>12,.2f}  {new_value:>12,.2f}  {change:>+8.1f}%{flag}')
+    
+    regressions = sum(row[4] for row in rows)
+    print(f'{regressions} regression(s) beyond {args.threshold:g}%')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
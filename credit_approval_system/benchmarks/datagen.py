@@ -0,0 +1,114 @@
+"""
+Synthetic portfolio generator: N customers with a Poisson number of loans
+each (mean M), in the column layout of init_data/*.xlsx so the files go
+through import_data unchanged. Distributions are loosely modelled on
+retail lending: log-normal salaries, loan amounts scaled to salary,
+rates around 12%, common tenures, repayment records that lag the
+elapsed months. The same seed always gives the same files.
+    
+    python benchmarks/datagen.py --customers 10000 --loans-per-customer 5 --out /tmp/portfolio
+"""
+import argparse
+import csv
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CUSTOMER_HEADER = [
+    'Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit'
+]
+LOAN_HEADER = [
+    'Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+    'EMIs paid on Time', 'Date of Approval', 'End Date'
+]
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Anaya', 'Rohan', 'Saanvi', 'Vihaan', 'Priya']
+LAST_NAMES = ['Sharma', 'Iyer', 'Patel', 'Reddy', 'Khan', 'Das', 'Nair', 'Gupta', 'Singh', 'Rao']
+TENURES = np.array([6, 12, 18, 24, 36, 48, 60, 72, 84, 120])
+TENURE_WEIGHTS = np.array([4, 14, 8, 18, 20, 12, 12, 5, 4, 3]) / 100
+
+
+def generate(customers, loans_per_customer, seed=42, today=None):
+    """Return (customer_rows, loan_rows) as lists of value lists matching the headers"""
+    # Imported here: loans needs django.setup(), which suite.py does after choosing the database
+    from loans.services.loan_calculator import calculate_monthly_installments
+    
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+    
+    ids = np.arange(1, customers + 1)
+    salaries = np.clip(np.round(rng.lognormal(np.log(50000), 0.6, customers), -3), 15000, 1500000)
+    limits = np.round(salaries * 36, -5)
+    ages = rng.triangular(21, 34, 65, customers).astype(int)
+    customer_rows = [
+        [
+            int(customer_id), FIRST_NAMES[customer_id % 10], LAST_NAMES[customer_id // 10 % 10],
+            int(age), f'9{customer_id:09d}', int(salary), int(limit)
+        ]
+        for customer_id, age, salary, limit in zip(ids, ages, salaries, limits)
+    ]
+    
+    counts = rng.poisson(loans_per_customer, customers)
+    owners = np.repeat(ids, counts)
+    total = len(owners)
+    owner_salaries = np.repeat(salaries, counts)
+    amounts = np.clip(np.round(owner_salaries * rng.lognormal(np.log(6), 0.7, total), -3), 10000, None)
+    rates = np.round(np.clip(rng.normal(12, 3, total), 6, 24), 2)
+    tenures = rng.choice(TENURES, total, p=TENURE_WEIGHTS)
+    emis = calculate_monthly_installments(amounts, rates, tenures)
+    ages_in_months = rng.integers(0, 96, total)
+    # Most customers pay nearly every EMI that has fallen due
+    paid = np.floor(np.minimum(ages_in_months, tenures) * rng.beta(8, 1.5, total)).astype(int)
+    
+    loan_rows = []
+    for loan_id in range(total):
+        start = today - relativedelta(months=int(ages_in_months[loan_id]), days=int(loan_id % 28))
+        loan_rows.append([
+            int(owners[loan_id]), loan_id + 1, int(amounts[loan_id]), int(tenures[loan_id]),
+            float(rates[loan_id]), float(emis[loan_id]), int(paid[loan_id]),
+            start.isoformat(), (start + relativedelta(months=int(tenures[loan_id]))).isoformat()
+        ])
+    return customer_rows, loan_rows
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_portfolio(directory, customers, loans_per_customer, seed=42):
+    """Write customer_data.csv and loan_data.csv; returns their paths and row counts"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    customer_rows, loan_rows = generate(customers, loans_per_customer, seed)
+    customer_path, loan_path = directory / 'customer_data.csv', directory / 'loan_data.csv'
+    write_csv(customer_path, CUSTOMER_HEADER, customer_rows)
+    write_csv(loan_path, LOAN_HEADER, loan_rows)
+    return customer_path, loan_path, len(customer_rows), len(loan_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--loans-per-customer', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True, help='Directory for customer_data.csv and loan_data.csv')
+    args = parser.parse_args()
+    
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
+    import django
+    django.setup()
+    
+    _, _, customers, loans = write_portfolio(args.out, args.customers, args.loans_per_customer, args.seed)
+    print(f'Wrote {customers:,} customers and {loans:,} loans to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
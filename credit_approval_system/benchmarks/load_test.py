@@ -0,0 +1,115 @@
+"""
+Closed-loop HTTP load generator for comparing the WSGI and ASGI setups.
+
+Start one server, then point the script at it:
+    
+    gunicorn credit_system.wsgi -w 4 -b 127.0.0.1:8000
+    uvicorn credit_system.asgi:application --workers 4 --port 8001
+    
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000/api/ --path view-loans/{customer_id}
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8001/api/async/ --path view-loans/{customer_id}
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8001/api/async/ --path check-eligibility \\
+        --body '{"customer_id": {customer_id}, "loan_amount": 200000, "interest_rate": 12, "tenure": 24}'
+
+{customer_id} and {loan_id} in the path or body are replaced per request
+with random ids from --max-id. Uses only the standard library.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def send(reader, writer, host, method, path, body):
+    payload = body.encode() if body else b''
+    head = (
+        f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n'
+        f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'
+    )
+    writer.write(head.encode() + payload)
+    await writer.drain()
+    
+    status_line = await reader.readline()
+    length = 0
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and value == 'close':
+            keep_alive = False
+    
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive
+
+
+async def client(args, deadline, latencies, errors):
+    url = urlsplit(args.base_url)
+    port = url.port or 80
+    reader, writer = await asyncio.open_connection(url.hostname, port)
+    try:
+        while time.perf_counter() < deadline:
+            ids = {
+                'customer_id': random.randint(1, args.max_id),
+                'loan_id': random.randint(1, args.max_id),
+            }
+            path = url.path + args.path.format(**ids)
+            body = args.body.replace('{customer_id}', str(ids['customer_id'])) if args.body else None
+            started = time.perf_counter()
+            status, keep_alive = await send(reader, writer, url.netloc, 'POST' if body else 'GET', path, body)
+            if not keep_alive:
+                # Sync gunicorn workers close the connection after each response
+                writer.close()
+                reader, writer = await asyncio.open_connection(url.hostname, port)
+            latencies.append(time.perf_counter() - started)
+            if status >= 500:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args, deadline, latencies, errors) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f'{len(latencies)} requests in {elapsed:.1f}s: {len(latencies) / elapsed:,.0f} req/s, '
+        f'p50 {p50:.1f}ms, p99 {p99:.1f}ms, {len(errors)} errors'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', required=True)
+    parser.add_argument('--path', required=True)
+    parser.add_argument('--body', help='JSON body; sends POST when given')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--max-id', type=int, default=300)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Reproducible benchmark suite for the credit APIs. It creates a throwaway
+test database with Django's test database machinery (the configured one
+is never touched) and loads a synthetic portfolio (datagen.py) through
+import_data. It then measures:
+  * import throughput of import_data
+  * microbenchmarks of calculate_monthly_installment, CreditScoreCalculator
+    and LoanEligibilityChecker
+  * an in-process load test of the API endpoints, with one Django
+    test client per thread: p50/p95/p99 latency, req/s, queries/request
+Results are written as JSON; diff two runs with benchmarks/compare.py.
+    
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --database postgres --customers 20000 --output after.json
+    python benchmarks/compare.py before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
+
+ENDPOINTS = ['register', 'check-eligibility', 'quote-matrix', 'create-loan', 'view-loan', 'view-loans']
+WRITE_ENDPOINTS = {'register', 'create-loan'}
+SERVER_TIMING_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def postgres_available(database):
+    try:
+        import psycopg2
+        psycopg2.connect(
+            host=database['HOST'], port=database['PORT'], user=database['USER'],
+            password=database['PASSWORD'], dbname='postgres', connect_timeout=3
+        ).close()
+    except Exception:
+        return False
+    return True
+
+
+def configure_database(choice, sqlite_path):
+    """Point the default database at SQLite or keep the configured PostgreSQL; before django.setup()"""
+    from django.conf import settings
+    if choice == 'auto':
+        choice = 'postgres' if postgres_available(settings.DATABASES['default']) else 'sqlite'
+    if choice == 'sqlite':
+        settings.DATABASES = {'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': sqlite_path,
+            # Load-test threads write concurrently; wait for the lock instead of failing
+            'OPTIONS': {'timeout': 30},
+            'TEST': {'NAME': sqlite_path},
+        }}
+    return choice
+
+
+def git_revision():
+    def git(*args):
+        result = subprocess.run(['git', *args], cwd=BASE_DIR, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+    return {'commit': git('rev-parse', '--short', 'HEAD'), 'dirty': bool(git('status', '--porcelain'))}
+
+
+def percentiles(seconds):
+    cuts = statistics.quantiles(seconds, n=100, method='inclusive')
+    return {name: round(cuts[index] * 1000, 3) for name, index in (('p50_ms', 49), ('p95_ms', 94), ('p99_ms', 98))}
+
+
+def per_call_us(function, items):
+    started = time.perf_counter()
+    for item in items:
+        function(item)
+    return round((time.perf_counter() - started) / len(items) * 1e6, 2)
+
+
+def bench_import(directory, customers, loans_per_customer, seed):
+    from django.core.management import call_command
+    from datagen import write_portfolio
+    
+    customer_path, loan_path, customer_rows, loan_rows = write_portfolio(directory, customers, loans_per_customer, seed)
+    started = time.perf_counter()
+    call_command('import_data', customers=str(customer_path), loans=str(loan_path), stdout=StringIO())
+    seconds = time.perf_counter() - started
+    return {
+        'customers': customer_rows,
+        'loans': loan_rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round((customer_rows + loan_rows) / seconds, 1),
+    }
+
+
+def bench_micro(sample, seed):
+    from django.core.cache import cache
+    from loans.models import Customer, Loan
+    from loans.services import CreditScoreCalculator, LoanEligibilityChecker, calculate_monthly_installment
+    from loans.services.loan_calculator import annuity_factor
+    
+    rng = random.Random(seed)
+    loans = list(Loan.objects.values_list('loan_amount', 'interest_rate', 'tenure'))
+    loans = rng.sample(loans, min(sample, len(loans)))
+    customers = list(Customer.objects.all())
+    customers = rng.sample(customers, min(sample, len(customers)))
+    
+    def emi(loan):
+        return calculate_monthly_installment(*loan)
+    
+    annuity_factor.cache_clear()
+    emi_cold = per_call_us(emi, loans)
+    emi_warm = per_call_us(emi, loans)
+    
+    stats = {customer.pk: CreditScoreCalculator(customer).get_stats() for customer in customers}
+    score_db = per_call_us(lambda customer: CreditScoreCalculator(customer).calculate(), customers)
+    score_preloaded = per_call_us(
+        lambda customer: CreditScoreCalculator(customer, stats=stats[customer.pk]).calculate(), customers
+    )
+    
+    def eligibility(customer):
+        return LoanEligibilityChecker(customer, 200000, 12, 24).check_eligibility()
+    
+    cache.clear()
+    eligibility_cold = per_call_us(eligibility, customers)
+    eligibility_warm = per_call_us(eligibility, customers)
+    
+    return {
+        'calculate_monthly_installment': {'cold_us': emi_cold, 'warm_us': emi_warm, 'calls': len(loans)},
+        'credit_score': {'with_db_us': score_db, 'preloaded_us': score_preloaded, 'calls': len(customers)},
+        'eligibility': {
+            'score_cache_cold_us': eligibility_cold, 'score_cache_warm_us': eligibility_warm, 'calls': len(customers)
+        },
+    }
+
+
+def build_request(endpoint, rng, worker, index, customer_ids, loan_ids):
+    """(path, JSON body or None for GET)"""
+    customer_id = rng.choice(customer_ids)
+    if endpoint == 'register':
+        return '/api/register', {
+            'first_name': 'Load', 'last_name': f'Test{index}', 'age': 30,
+            'monthly_income': rng.randrange(20000, 200000, 1000), 'phone_number': f'7{worker:02d}{index:07d}'
+        }
+    if endpoint == 'check-eligibility':
+        return '/api/check-eligibility', {
+            'customer_id': customer_id, 'loan_amount': rng.randrange(50000, 1000000, 10000),
+            'interest_rate': rng.choice([8, 10.5, 12, 14, 16]), 'tenure': rng.choice([12, 24, 36])
+        }
+    if endpoint == 'quote-matrix':
+        # The 50-quote grid a front-end renders per session
+        return '/api/quote-matrix', {
+            'customer_id': customer_id, 'loan_amounts': [100000, 200000, 300000, 500000, 1000000],
+            'interest_rates': [8, 10, 12, 14, 16], 'tenures': [12, 36]
+        }
+    if endpoint == 'create-loan':
+        return '/api/create-loan', {
+            'customer_id': customer_id, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12
+        }
+    if endpoint == 'view-loan':
+        return f'/api/view-loan/{rng.choice(loan_ids)}', None
+    return f'/api/view-loans/{customer_id}', None
+
+
+def bench_endpoint(endpoint, threads, requests, seed, customer_ids, loan_ids):
+    from django.db import connections
+    from django.test import Client
+    
+    latencies, queries, errors = [], [], []
+    
+    def worker(number):
+        client = Client(raise_request_exception=False)
+        rng = random.Random(seed * 1000 + number)
+        try:
+            for index in range(number, requests, threads):
+                path, body = build_request(endpoint, rng, number, index, customer_ids, loan_ids)
+                started = time.perf_counter()
+                if body is None:
+                    response = client.get(path)
+                else:
+                    response = client.post(path, json.dumps(body), content_type='application/json')
+                latencies.append(time.perf_counter() - started)
+                match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+                if match:
+                    queries.append(int(match.group(1)))
+                if response.status_code >= 500:
+                    errors.append(response.status_code)
+        finally:
+            connections.close_all()
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    seconds = time.perf_counter() - started
+    
+    return {
+        'threads': threads,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        **percentiles(latencies),
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+    }
+
+
+def bench_load(threads, requests, seed):
+    from django.db import connection
+    from loans.models import Customer, Loan
+    customer_ids = list(Customer.objects.values_list('customer_id', flat=True))
+    loan_ids = list(Loan.objects.values_list('loan_id', flat=True))
+    
+    def threads_for(endpoint):
+        # SQLite fails a read transaction's upgrade to a write lock at once
+        # instead of waiting, so concurrent writers only measure lock errors
+        if endpoint in WRITE_ENDPOINTS and connection.vendor == 'sqlite':
+            return 1
+        return threads
+    
+    return {
+        endpoint: bench_endpoint(endpoint, threads_for(endpoint), requests, seed, customer_ids, loan_ids)
+        for endpoint in ENDPOINTS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', choices=['auto', 'sqlite', 'postgres'], default='auto',
+                        help='auto uses the configured PostgreSQL when it answers, SQLite otherwise')
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--loans-per-customer', type=float, default=5)
+    parser.add_argument('--sample', type=int, default=1000, help='Calls per microbenchmark')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=400, help='Requests per endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark-results.json')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='credit-bench-')
+    database = configure_database(args.database, os.path.join(workdir, 'bench.sqlite3'))
+    
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    
+    settings.DEBUG = False
+    settings.INSTRUMENTATION_ENABLED = True  # Server-Timing carries the query counts
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        print(f'{database}: importing {args.customers:,} customers x ~{args.loans_per_customer} loans...')
+        results = {'import': bench_import(workdir, args.customers, args.loans_per_customer, args.seed)}
+        print('microbenchmarks...')
+        results['micro'] = bench_micro(args.sample, args.seed)
+        print(f'load: {args.requests} requests per endpoint on {args.threads} threads...')
+        results['load'] = bench_load(args.threads, args.requests, args.seed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    
+    report = {
+        'meta': {
+            **git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': database,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'cpus': os.cpu_count(),
+            'parameters': vars(args),
+        },
+        **results,
+    }
+    with open(args.output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    
+    imported = results['import']
+    print(f"import: {imported['rows_per_second']:,.0f} rows/s ({imported['seconds']}s)")
+    for name, values in results['micro'].items():
+        print(f'{name}: ' + ', '.join(f'{key} {value}' for key, value in values.items() if key != 'calls'))
+    for endpoint, values in results['load'].items():
+        print(
+            f"{endpoint:<18} {values['requests_per_second']:>8,.1f} req/s  p50 {values['p50_ms']}ms  "
+            f"p95 {values['p95_ms']}ms  p99 {values['p99_ms']}ms  {values['queries_per_request']} queries/req  "
+            f"{values['errors']} errors"
+        )
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
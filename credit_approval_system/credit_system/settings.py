@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +25,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include the rest of the stack
+    'loans.instrumentation.InstrumentationMiddleware',
+    'loans.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +69,19 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated hosts with the primary's credentials. Views
+# marked read_from_replica read from them (loans/db_router.py); under tests
+# they mirror the primary
+DATABASE_REPLICA_HOSTS = [host.strip() for host in os.getenv('DATABASE_REPLICA_HOSTS', '').split(',') if host.strip()]
+for index, host in enumerate(DATABASE_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [f'replica{index}' for index in range(1, len(DATABASE_REPLICA_HOSTS) + 1)]
+DATABASE_ROUTERS = ['loans.db_router.PrimaryReplicaRouter']
+
+# After a write, the client's reads stay on the primary this long; keep it
+# above the replicas' worst replication lag
+REPLICA_READ_YOUR_WRITES_SECONDS = int(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -80,6 +97,41 @@ USE_TZ = True
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache (local memory by default, set CACHE_URL=redis://... to share it between workers)
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Upper bound on how long a computed credit score is cached (entries also expire at year end)
+CREDIT_SCORE_CACHE_TIMEOUT = int(os.getenv('CREDIT_SCORE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Upper bound on how long serialized view-loan/view-loans bodies are cached;
+# entries are also checked against the loans' updated_at on every request
+LOAN_RESPONSE_CACHE_TIMEOUT = int(os.getenv('LOAN_RESPONSE_CACHE_TIMEOUT', 10 * 60))
+
+# Per-request Server-Timing header and the /metrics endpoint's data
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'True') == 'True'
+
+# JSON ruleset overriding the built-in scoring thresholds and rate bands
+# (loans/services/scoring_rules.py); workers re-read it when its mtime changes,
+# checking at most every SCORING_RULES_RELOAD_INTERVAL seconds
+SCORING_RULES_FILE = os.getenv('SCORING_RULES_FILE')
+SCORING_RULES_RELOAD_INTERVAL = float(os.getenv('SCORING_RULES_RELOAD_INTERVAL', 30))
+
+# How long a stored response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
@@ -87,6 +139,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kolkata'
+# Run tasks inline instead of through the broker (tests, local runs without Redis)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+CELERY_BEAT_SCHEDULE = {
+    'rescore-portfolio-nightly': {
+        'task': 'loans.tasks.rescore_portfolio',
+        'schedule': crontab(hour=2, minute=0),
+    },
+}
+
+# Hot endpoints build their responses with loans.fast_serializers and encode
+# them with loans.renderers.ORJSONRenderer; False falls back to the DRF
+# serializers and JSONRenderer, which give the same bytes
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', 'True') == 'True'
 
 # REST Framework
 REST_FRAMEWORK = {
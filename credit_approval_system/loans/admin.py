@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer, Loan
+from .models import Customer, Loan, CustomerCreditProfile, CustomerScoreSnapshot, IdempotencyKey
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -13,3 +13,19 @@ class LoanAdmin(admin.ModelAdmin):
     search_fields = ['loan_id', 'customer__first_name', 'customer__last_name']
     list_filter = ['is_active', 'start_date', 'end_date']
     raw_id_fields = ['customer']
+
+@admin.register(CustomerCreditProfile)
+class CustomerCreditProfileAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'loan_count', 'active_loan_sum', 'active_emi_sum', 'updated_at']
+    raw_id_fields = ['customer']
+
+@admin.register(CustomerScoreSnapshot)
+class CustomerScoreSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'credit_score', 'active_emi_sum', 'scored_at']
+    raw_id_fields = ['customer']
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'endpoint', 'response_status', 'created_at', 'expires_at']
+    search_fields = ['key']
+    list_filter = ['endpoint']
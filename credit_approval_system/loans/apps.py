@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class LoansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loans'
+    
+    def ready(self):
+        from . import instrumentation, signals  # noqa: F401
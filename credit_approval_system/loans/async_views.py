@@ -0,0 +1,97 @@
+"""
+Async versions of the read-heavy endpoints, for serving under an ASGI
+server (uvicorn). DRF 3.14 views cannot be async, so these are plain
+Django views that reuse the DRF serializers for validation and
+fast_serializers for output.
+
+Django 4.2 runs every async ORM call through sync_to_async with
+thread_sensitive=True, so a request's queries run one after another on a
+single thread even when awaited together. What these views gain is an
+event loop that stays free while a query waits on the database.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework import status
+
+from . import fast_serializers
+from .db_router import read_from_replica
+from .models import Customer
+from .serializers import LoanEligibilityRequestSerializer
+from .services import LoanEligibilityChecker
+from .services.loan_queries import customer_active_loans_queryset, loan_detail_rows
+
+NOT_FOUND = {'detail': 'Not found.'}
+
+
+async def _get_or_none(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        return None
+
+
+@read_from_replica
+async def check_eligibility(request):
+    """Check loan eligibility for a customer"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    
+    try:
+        payload = json.loads(request.body)
+    except ValueError as exc:
+        return JsonResponse({'detail': f'JSON parse error - {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = LoanEligibilityRequestSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    
+    customer = await _get_or_none(Customer.objects, customer_id=data['customer_id'])
+    if customer is None:
+        return JsonResponse({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    checker = LoanEligibilityChecker(
+        customer=customer,
+        loan_amount=data['loan_amount'],
+        interest_rate=data['interest_rate'],
+        tenure=data['tenure']
+    )
+    # Same path as the sync view: the cached credit score first, and on a
+    # miss the customer's loan totals are scored and cached
+    result = await sync_to_async(checker.check_eligibility)()
+    
+    return JsonResponse(fast_serializers.validated_eligibility_result(result), status=status.HTTP_200_OK)
+
+
+# API clients send no CSRF token (DRF views are exempt too). Set directly
+# because Django 4.2's csrf_exempt wraps the view in a sync function
+check_eligibility.csrf_exempt = True
+
+
+@read_from_replica
+async def view_loan(request, loan_id):
+    """View details of a specific loan"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    row = await loan_detail_rows().filter(loan_id=loan_id).afirst()
+    if row is None:
+        return JsonResponse(NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+    
+    return JsonResponse(fast_serializers.loan_detail(row), status=status.HTTP_200_OK)
+
+
+@read_from_replica
+async def view_loans_by_customer(request, customer_id):
+    """View all loans for a specific customer"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    # One query answers both whether the customer exists and what they owe
+    rows = [row async for row in customer_active_loans_queryset(customer_id)]
+    if not rows:
+        return JsonResponse(NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+    
+    return JsonResponse(fast_serializers.customer_loans(rows), safe=False, status=status.HTTP_200_OK)
@@ -0,0 +1,160 @@
+"""
+Primary/replica database routing. Writes always go to the primary
+('default'). Reads go to a replica from settings.DATABASE_REPLICAS only
+inside views marked with read_from_replica (loan views and eligibility
+checks); everything else, including Celery tasks and management commands,
+reads from the primary.
+
+Read-your-writes: a write pins the rest of its request to the primary,
+and the response carries a cookie that keeps the client's requests on the
+primary for REPLICA_READ_YOUR_WRITES_SECONDS, long enough for the replicas
+to replay a just-created loan.
+"""
+import functools
+import math
+import random
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_PIN_COOKIE = 'primary_reads_until'
+
+# Routing state of the request being handled; None outside a request. A
+# mutable object rather than flags, so that a write made in an async view's
+# sync_to_async thread is seen by the rest of the request.
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    __slots__ = ('replica', 'pinned', 'wrote')
+    
+    def __init__(self, pinned=False):
+        self.replica = None  # alias chosen for the current read_from_replica block
+        self.pinned = pinned  # the client wrote recently
+        self.wrote = False
+    
+    def read_alias(self):
+        if self.pinned or self.wrote:
+            return None
+        return self.replica
+
+
+def reading_from_replica():
+    """True when reads made now are served by a replica, which may lag behind the primary"""
+    state = _routing.get()
+    return state is not None and state.read_alias() is not None
+
+
+def read_from_replica(view):
+    """
+    Let the decorated view's reads go to a replica. One replica is picked
+    per call, so every read of the view sees the same point in time.
+    """
+    def enter():
+        state = _routing.get()
+        if state is None or not settings.DATABASE_REPLICAS:
+            return None, None
+        previous = state.replica
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return state, previous
+    
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            state, previous = enter()
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                if state is not None:
+                    state.replica = previous
+        return async_wrapper
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        state, previous = enter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            if state is not None:
+                state.replica = previous
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        # None falls through to Django's default: the instance's database or the primary
+        return state.read_alias() if state is not None else None
+    
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sets up the per-request routing state, pins clients that wrote within
+    the last REPLICA_READ_YOUR_WRITES_SECONDS to the primary, and marks the
+    responses of requests that wrote. Not used without replicas.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=self.recently_wrote(request))
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(state, response)
+    
+    async def __acall__(self, request):
+        state = RoutingState(pinned=self.recently_wrote(request))
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(state, response)
+    
+    def recently_wrote(self, request):
+        try:
+            until = float(request.COOKIES[PRIMARY_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        now = time.time()
+        # Ignore timestamps further out than the window (plus a second for the
+        # cookie's rounding), so clients cannot opt out of the replicas
+        return now < until <= now + settings.REPLICA_READ_YOUR_WRITES_SECONDS + 1
+    
+    def finish(self, state, response):
+        if state.wrote:
+            window = settings.REPLICA_READ_YOUR_WRITES_SECONDS
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                f'{time.time() + window:.3f}',
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
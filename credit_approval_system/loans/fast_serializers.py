@@ -0,0 +1,220 @@
+"""
+Plain-function counterparts of the response serializers used by the hot
+endpoints. They build the same dicts as the DRF serializers in
+serializers.py (tests/test_serializers.py holds them to byte parity)
+from values() rows and plain dicts, without DRF's per-field machinery.
+
+With settings.FAST_SERIALIZERS off, each builder hands its input to the DRF
+serializer it mirrors instead, as a way back should the two ever disagree.
+"""
+from decimal import Context, Decimal
+from django.conf import settings
+from .serializers import (
+    CreateLoanResponseSerializer,
+    CustomerLoanSerializer,
+    CustomerResponseSerializer,
+    LoanDetailSerializer,
+    LoanEligibilityResponseSerializer,
+)
+
+
+def decimal_formatter(max_digits, decimal_places):
+    """
+    Formatting of serializers.DecimalField(max_digits, decimal_places)
+    .to_representation: quantize (half even) and render as a string
+    """
+    exponent = Decimal(1).scaleb(-decimal_places)
+    context = Context(prec=max_digits)
+    
+    def format_decimal(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        # Database values already carry decimal_places digits; their str()
+        # is the quantized form, at a fraction of quantize()'s cost
+        text = str(value)
+        if (
+            decimal_places
+            and text[-decimal_places - 1:-decimal_places] == '.'
+            and 'E' not in text
+            and len(text.lstrip('-')) <= max_digits + 1
+        ):
+            return text
+        return '{:f}'.format(value.quantize(exponent, context=context))
+    
+    return format_decimal
+
+
+def decimal_validator(max_digits, decimal_places):
+    """
+    DecimalField to_internal_value followed by to_representation, as a
+    serializer built with data= does. ValueError where DRF would report a
+    validation error.
+    """
+    exponent = Decimal(1).scaleb(-decimal_places)
+    limit = Decimal(10) ** (max_digits - decimal_places)
+    
+    def validate_decimal(value):
+        value = Decimal(str(value).strip())
+        if not value.is_finite() or value.as_tuple().exponent < -decimal_places or abs(value) >= limit:
+            raise ValueError(value)
+        return '{:f}'.format(value.quantize(exponent))
+    
+    return validate_decimal
+
+
+format_money = decimal_formatter(12, 2)
+format_rate = decimal_formatter(5, 2)
+validate_money = decimal_validator(12, 2)
+validate_rate = decimal_validator(5, 2)
+
+ELIGIBILITY_FIELDS = [
+    'customer_id', 'approval', 'interest_rate', 'corrected_interest_rate', 'tenure', 'monthly_installment'
+]
+CREATE_LOAN_FIELDS = ['loan_id', 'customer_id', 'loan_approved', 'message', 'monthly_installment']
+
+
+def registered_customer(customer):
+    """CustomerResponseSerializer output for a saved Customer"""
+    if not settings.FAST_SERIALIZERS:
+        return CustomerResponseSerializer(customer).data
+    return {
+        'customer_id': customer.customer_id,
+        'name': f"{customer.first_name} {customer.last_name}",
+        'age': customer.age,
+        'monthly_income': format_money(customer.monthly_salary),
+        'approved_limit': format_money(customer.approved_limit),
+        'phone_number': customer.phone_number,
+    }
+
+
+def loan_detail(row):
+    """LoanDetailSerializer output for a loan_detail_rows() dict"""
+    if not settings.FAST_SERIALIZERS:
+        # DRF reads mappings like instances; the customer is nested as the model is
+        customer = {name: row[f'customer__{name}'] for name in ('customer_id', 'first_name', 'last_name',
+                                                                 'phone_number', 'age')}
+        return LoanDetailSerializer({**row, 'customer': customer}).data
+    return {
+        'loan_id': row['loan_id'],
+        'customer': {
+            'id': row['customer__customer_id'],
+            'first_name': row['customer__first_name'],
+            'last_name': row['customer__last_name'],
+            'phone_number': row['customer__phone_number'],
+            'age': row['customer__age'],
+        },
+        'loan_amount': format_money(row['loan_amount']),
+        'interest_rate': format_rate(row['interest_rate']),
+        'monthly_repayment': format_money(row['monthly_repayment']),
+        'tenure': row['tenure'],
+    }
+
+
+def customer_loan(row):
+    """CustomerLoanSerializer output for a customer_active_loans_queryset() dict"""
+    if not settings.FAST_SERIALIZERS:
+        return CustomerLoanSerializer(row).data
+    return _customer_loan(row)
+
+
+def _customer_loan(row):
+    return {
+        'loan_id': row['loan_id'],
+        'loan_amount': format_money(row['loan_amount']),
+        'interest_rate': format_rate(row['interest_rate']),
+        'monthly_repayment': format_money(row['monthly_repayment']),
+        'repayments_left': row['repayments_left'],
+    }
+
+
+def customer_loans(rows):
+    """Active loan rows, skipping the placeholder row of a customer without loans"""
+    rows = [row for row in rows if row['loan_id'] is not None]
+    if not settings.FAST_SERIALIZERS:
+        return CustomerLoanSerializer(rows, many=True).data
+    return [_customer_loan(row) for row in rows]
+
+
+def eligibility_result(result):
+    """LoanEligibilityResponseSerializer(many=True) output item for a checker result"""
+    if not settings.FAST_SERIALIZERS:
+        return LoanEligibilityResponseSerializer(result).data
+    return {
+        'customer_id': result['customer_id'],
+        'approval': result['approval'],
+        'interest_rate': format_rate(result['interest_rate']),
+        'corrected_interest_rate': format_rate(result['corrected_interest_rate']),
+        'tenure': result['tenure'],
+        'monthly_installment': format_money(result['monthly_installment']),
+    }
+
+
+def validated_eligibility_result(result):
+    """
+    What LoanEligibilityResponseSerializer(data=result) gives after
+    is_valid(): the formatted result, or the raw values when a decimal
+    does not fit the field
+    """
+    if not settings.FAST_SERIALIZERS:
+        return _validated(LoanEligibilityResponseSerializer, result)
+    try:
+        return {
+            'customer_id': int(result['customer_id']),
+            'approval': bool(result['approval']),
+            'interest_rate': validate_rate(result['interest_rate']),
+            'corrected_interest_rate': validate_rate(result['corrected_interest_rate']),
+            'tenure': int(result['tenure']),
+            'monthly_installment': validate_money(result['monthly_installment']),
+        }
+    except ValueError:
+        return {name: result[name] for name in ELIGIBILITY_FIELDS}
+
+
+def quote_matrix(loan_amounts, interest_rates, tenures, quotes):
+    """
+    Quote matrix response: the grid axes, then approval,
+    corrected_interest_rate and monthly_installment as nested lists
+    indexed [amount][rate][tenure], decimals formatted as in eligibility_result
+    """
+    return {
+        'customer_id': quotes['customer_id'],
+        'loan_amounts': [format_money(amount) for amount in loan_amounts],
+        'interest_rates': [format_rate(rate) for rate in interest_rates],
+        'tenures': list(tenures),
+        'approval': quotes['approval'].tolist(),
+        'corrected_interest_rate': [
+            [[format_rate(rate) for rate in row] for row in plane]
+            for plane in quotes['corrected_interest_rate']
+        ],
+        'monthly_installment': [
+            [[format_money(installment) for installment in row] for row in plane]
+            for plane in quotes['monthly_installment'].tolist()
+        ],
+    }
+
+
+def validated_create_loan_result(data):
+    """CreateLoanResponseSerializer(data=data) after is_valid(), as above"""
+    if not settings.FAST_SERIALIZERS:
+        return _validated(CreateLoanResponseSerializer, data)
+    try:
+        message = str(data['message']).strip()
+        if not message:
+            raise ValueError(message)
+        return {
+            'loan_id': None if data['loan_id'] is None else int(data['loan_id']),
+            'customer_id': int(data['customer_id']),
+            'loan_approved': bool(data['loan_approved']),
+            'message': message,
+            'monthly_installment': validate_money(data['monthly_installment']),
+        }
+    except ValueError:
+        return {name: data[name] for name in CREATE_LOAN_FIELDS}
+
+
+def _validated(serializer_class, data):
+    serializer = serializer_class(data=data)
+    serializer.is_valid()
+    return serializer.data
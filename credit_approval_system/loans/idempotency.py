@@ -0,0 +1,104 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """SHA-256 of the parsed request body, independent of key order"""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {'error': 'Idempotency-Key was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(record.response_body, status=record.response_status, headers=record.response_headers)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Make a POST view safe to retry with an Idempotency-Key header.
+    The first request's response is stored and returned for every retry
+    with the same key until it expires (IDEMPOTENCY_KEY_TTL), without
+    running the view again. The key row is inserted in the same
+    transaction as the view's writes, so a concurrent duplicate blocks on
+    the unique constraint until the first request commits and then
+    replays its response, including the headers the view set (Location,
+    ETag...). 5xx responses are not stored.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        endpoint = request.path
+        request_hash = request_fingerprint(request)
+        now = timezone.now()
+        
+        # Fast path: a completed request with this key, one SELECT
+        record = IdempotencyKey.objects.filter(key=key, endpoint=endpoint, expires_at__gt=now).first()
+        if record is not None:
+            return _replay(record, request_hash)
+        
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(key=key, endpoint=endpoint, expires_at__lte=now).delete()
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        key=key,
+                        endpoint=endpoint,
+                        request_hash=request_hash,
+                        response_status=0,
+                        response_body={},
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+                    )
+            except IntegrityError:
+                # A concurrent request with this key committed first
+                return _replay(IdempotencyKey.objects.get(key=key, endpoint=endpoint), request_hash)
+            
+            response = view(request, *args, **kwargs)
+            if response.status_code >= 500:
+                # Release the key so the client's retry runs the view again
+                transaction.set_rollback(True)
+                return response
+            
+            record.response_status = response.status_code
+            record.response_body = response.data
+            # Content-Type is set again when the replay is rendered
+            record.response_headers = {
+                name: value for name, value in response.items() if name.lower() != 'content-type'
+            }
+            record.save(update_fields=['response_status', 'response_body', 'response_headers'])
+        
+        return response
+    
+    return wrapper
+
+
+def purge_expired_keys(now=None):
+    """Delete stored responses past their TTL; returns the number removed"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
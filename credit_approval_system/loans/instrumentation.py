@@ -0,0 +1,254 @@
+"""
+Per-request performance instrumentation: wall time, database query count
+and time, and time spent in the scoring/pricing services, reported in a
+Server-Timing header and aggregated for the Prometheus /metrics endpoint.
+Metrics are kept per process; with several gunicorn/uvicorn workers each
+one reports its own.
+"""
+import functools
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVICE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+# Timings of the request being handled; None outside a request (tasks,
+# management commands), where recording is skipped. A ContextVar follows
+# async views into their sync_to_async threads.
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('db_queries', 'db_time', 'spans')
+    
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+    
+    def add(self, name, seconds):
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [1, seconds]
+        else:
+            span[0] += 1
+            span[1] += seconds
+
+
+def timed(name):
+    """Record the decorated function's time under name for the current request"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings.add(name, perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper counting queries and their time for the current request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += perf_counter() - started
+        timings.db_queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Keep record_query on every connection, as connection.execute_wrapper()
+    would for one block. Installed per connection rather than around each
+    request so queries that async views run in sync_to_async threads, on
+    those threads' connections, are counted too.
+    """
+    if settings.INSTRUMENTATION_ENABLED and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> per-bucket counts (last one is +Inf), sum, count
+        self.series = {}
+    
+    def observe(self, label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+    
+    def inc(self, label_values, amount=1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+
+
+_lock = threading.Lock()
+REQUEST_DURATION = Histogram(
+    'loans_http_request_duration_seconds', 'Wall time of requests by view', ('view', 'method'), REQUEST_BUCKETS
+)
+RESPONSES = Counter('loans_http_responses_total', 'Responses by view and status code', ('view', 'method', 'status'))
+DB_QUERIES = Counter('loans_db_queries_total', 'Database queries run by requests, by view', ('view',))
+DB_TIME = Counter('loans_db_query_seconds_total', 'Time requests spent in database queries, by view', ('view',))
+SERVICE_DURATION = Histogram(
+    'loans_service_duration_seconds', 'Time per request spent in each instrumented service call',
+    ('service',), SERVICE_BUCKETS
+)
+SERVICE_CALLS = Counter('loans_service_calls_total', 'Instrumented service calls', ('service',))
+SCORE_CACHE = Counter(
+    'loans_score_cache_total', 'Credit score cache hits, misses and invalidations', ('event',)
+)
+METRICS = [REQUEST_DURATION, RESPONSES, DB_QUERIES, DB_TIME, SERVICE_DURATION, SERVICE_CALLS, SCORE_CACHE]
+
+
+def observe_request(view, method, status, seconds, timings):
+    with _lock:
+        REQUEST_DURATION.observe((view, method), seconds)
+        RESPONSES.inc((view, method, status))
+        DB_QUERIES.inc((view,), timings.db_queries)
+        DB_TIME.inc((view,), timings.db_time)
+        for name, (calls, total) in timings.spans.items():
+            SERVICE_DURATION.observe((name,), total)
+            SERVICE_CALLS.inc((name,), calls)
+
+
+def increment(counter, label_values, amount=1):
+    """Add to a counter outside observe_request, e.g. from a service; recorded in and out of requests"""
+    with _lock:
+        counter.inc(label_values, amount)
+
+
+def counter_values(counter):
+    """{label values: count} of one counter"""
+    with _lock:
+        return dict(counter.series)
+
+
+def render_metrics():
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.render()]
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics(metrics=METRICS):
+    with _lock:
+        for metric in metrics:
+            metric.series.clear()
+
+
+def server_timing(seconds, timings):
+    """Server-Timing value; span durations nest (credit_score includes its score_* parts)"""
+    parts = [
+        f'app;dur={seconds * 1000:.3f}',
+        f'db;dur={timings.db_time * 1000:.3f};desc="{timings.db_queries} queries"',
+    ]
+    for name, (calls, total) in timings.spans.items():
+        parts.append(f'{name};dur={total * 1000:.3f};desc="{calls} calls"')
+    return ', '.join(parts)
+
+
+class InstrumentationMiddleware:
+    """
+    Times each request and records its database and service timings.
+    Goes first in MIDDLEWARE so the other middleware is included. For
+    streaming responses only the time to the first byte is measured.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf_counter() - started, timings)
+    
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf_counter() - started, timings)
+    
+    def finish(self, request, response, seconds, timings):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        observe_request(view, request.method, response.status_code, seconds, timings)
+        response['Server-Timing'] = server_timing(seconds, timings)
+        return response
+
+
+def metrics(request):
+    """Prometheus text exposition of this process's request and score cache metrics"""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
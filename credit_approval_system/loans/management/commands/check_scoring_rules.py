@@ -0,0 +1,23 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from loans.services.scoring_rules import get_scoring_rules, load_rules_file
+
+class Command(BaseCommand):
+    help = 'Validate a scoring rules file before deploying it, or show the active rules'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='JSON ruleset to validate; omit to show the active rules')
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        if path is None:
+            rules = get_scoring_rules()
+        else:
+            try:
+                rules = load_rules_file(path)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Invalid scoring rules: {exc}')
+        
+        self.stdout.write(json.dumps(rules.rules, indent=2))
+        label = path or 'Active rules'
+        self.stdout.write(self.style.SUCCESS(f'{label}: version {rules.version} ({rules.tag}) is valid'))
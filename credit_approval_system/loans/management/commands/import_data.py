@@ -1,96 +1,120 @@
-import openpyxl
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import os
+from django.core.management.base import BaseCommand, CommandError
 from loans.models import Customer, Loan
-from datetime import datetime
-from decimal import Decimal
+from loans.services.copy_import import copy_import
+from loans.services.data_import import (
+    DEFAULT_CHUNK_SIZE,
+    ImportStats,
+    import_customers,
+    import_loans,
+    refresh_derived_data,
+    reset_sequences,
+    rows_as_dicts,
+)
+from loans.services.import_readers import READERS, get_reader
 
-class Command(BaseCommand):
-    help = 'Import customer and loan data from Excel files'
+CUSTOMER_FILE = 'init_data/customer_data.xlsx'
+LOAN_FILE = 'init_data/loan_data.xlsx'
+MAX_WARNINGS = 20
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write('Starting data import...')
-        
-        # Import customers
-        self.import_customers()
-        
-        # Import loans
-        self.import_loans()
-        
-        self.stdout.write(self.style.SUCCESS('Data import completed successfully!'))
+class Command(BaseCommand):
+    help = 'Import customer and loan data from Excel, CSV or Parquet files'
     
-    @transaction.atomic
-    def import_customers(self):
-        self.stdout.write('Importing customers...')
-        
-        wb = openpyxl.load_workbook('init_data/customer_data.xlsx')
-        sheet = wb.active
-        
-        customers_created = 0
-        
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if not row[0]:  # Skip empty rows
-                continue
-            
-            customer_id, first_name, last_name, phone_number, monthly_salary, approved_limit, current_debt = row
-            
-            # Check if customer already exists
-            if not Customer.objects.filter(customer_id=customer_id).exists():
-                Customer.objects.create(
-                    customer_id=customer_id,
-                    first_name=first_name,
-                    last_name=last_name,
-                    age=30,  # Default age as it's not in the data
-                    phone_number=str(phone_number),
-                    monthly_salary=Decimal(str(monthly_salary)),
-                    approved_limit=Decimal(str(approved_limit)),
-                    current_debt=Decimal(str(current_debt)) if current_debt else Decimal('0')
-                )
-                customers_created += 1
-        
-        self.stdout.write(self.style.SUCCESS(f'Created {customers_created} customers'))
+    def add_arguments(self, parser):
+        formats = ', '.join(sorted(READERS))
+        parser.add_argument(
+            '--customers',
+            default=CUSTOMER_FILE,
+            help=f'Customer file, format picked from the extension ({formats})',
+        )
+        parser.add_argument(
+            '--loans',
+            default=LOAN_FILE,
+            help=f'Loan file, format picked from the extension ({formats})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows read, validated and written per batch',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Update rows whose id already exists instead of skipping them',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['orm', 'copy'],
+            default='orm',
+            help='orm: chunked bulk_create; copy: COPY into a staging table and merge in SQL',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes for --engine=copy (PostgreSQL only)',
+        )
     
-    @transaction.atomic
-    def import_loans(self):
-        self.stdout.write('Importing loans...')
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.upsert = options['upsert']
+        self.engine = options['engine']
+        self.workers = options['workers']
+        self.warnings = 0
         
-        wb = openpyxl.load_workbook('init_data/loan_data.xlsx')
-        sheet = wb.active
+        customer_rows = self.open_rows(options['customers'])
+        loan_rows = self.open_rows(options['loans'])
         
-        loans_created = 0
+        self.stdout.write(f'Starting data import ({self.engine} engine)...')
+        customers = ImportStats('customers')
+        loans = ImportStats('loans')
         
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if not row[0]:  # Skip empty rows
-                continue
+        try:
+            # Import customers
+            self.stdout.write(f'Importing customers from {options["customers"]}...')
+            customers = self.run_import('customers', import_customers, customer_rows, options['customers'], customers)
+            self.stdout.write(self.style.SUCCESS(customers.summary()))
             
-            customer_id, loan_id, loan_amount, tenure, interest_rate, monthly_repayment, emis_paid_on_time, start_date, end_date = row
+            # Import loans
+            self.stdout.write(f'Importing loans from {options["loans"]}...')
+            loans = self.run_import('loans', import_loans, loan_rows, options['loans'], loans)
+            self.stdout.write(self.style.SUCCESS(loans.summary()))
+            if loans.missing_customer:
+                self.stdout.write(self.style.WARNING(f'{loans.missing_customer} loans skipped for unknown customers'))
+        finally:
+            # Chunks commit one at a time, so this also runs after a failed import.
+            # New rows keep their source ids, so move the id sequences past them
+            reset_sequences(Customer, Loan)
             
-            try:
-                customer = Customer.objects.get(customer_id=customer_id)
-                
-                # Check if loan already exists
-                if not Loan.objects.filter(loan_id=loan_id).exists():
-                    # Parse dates
-                    if isinstance(start_date, str):
-                        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                    if isinstance(end_date, str):
-                        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    
-                    Loan.objects.create(
-                        loan_id=loan_id,
-                        customer=customer,
-                        loan_amount=Decimal(str(loan_amount)),
-                        tenure=int(tenure),
-                        interest_rate=Decimal(str(interest_rate)),
-                        monthly_repayment=Decimal(str(monthly_repayment)),
-                        emis_paid_on_time=int(emis_paid_on_time),
-                        start_date=start_date,
-                        end_date=end_date,
-                        is_active=(datetime.now().date() <= end_date)
-                    )
-                    loans_created += 1
-            except Customer.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'Customer {customer_id} not found for loan {loan_id}'))
-                continue
+            # Bring credit profiles in line with the imported loans
+            self.stdout.write('Rebuilding credit profiles...')
+            rebuilt = refresh_derived_data(customers.customer_ids | loans.customer_ids, chunk_size=self.chunk_size)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} credit profiles'))
         
-        self.stdout.write(self.style.SUCCESS(f'Created {loans_created} loans'))
+        self.stdout.write(self.style.SUCCESS('Data import completed successfully!'))
+    
+    def run_import(self, kind, orm_import, rows, path, stats):
+        if self.engine == 'copy':
+            return copy_import(
+                kind, path, chunk_size=self.chunk_size, upsert=self.upsert,
+                warn=self.warn, workers=self.workers, stats=stats
+            )
+        return orm_import(rows, chunk_size=self.chunk_size, upsert=self.upsert, warn=self.warn, stats=stats)
+    
+    def open_rows(self, path):
+        """Validate the path up front and return a lazy stream of dict rows"""
+        if not os.path.isfile(path):
+            raise CommandError(f'File not found: {path}')
+        try:
+            reader = get_reader(path)
+            return rows_as_dicts(reader(path))
+        except (ValueError, ImportError) as exc:
+            raise CommandError(str(exc))
+    
+    def warn(self, message):
+        self.warnings += 1
+        if self.warnings <= MAX_WARNINGS:
+            self.stdout.write(self.style.WARNING(message))
+        elif self.warnings == MAX_WARNINGS + 1:
+            self.stdout.write(self.style.WARNING('Further warnings suppressed'))
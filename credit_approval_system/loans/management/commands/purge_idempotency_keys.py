@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from loans.idempotency import purge_expired_keys
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses whose TTL has passed'
+    
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired idempotency keys'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.services.credit_profile import rebuild_profiles, verify_profiles
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify customer credit profiles from the loans table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare stored profiles against the loans table, do not write',
+        )
+        parser.add_argument(
+            '--customer',
+            type=int,
+            action='append',
+            dest='customer_ids',
+            help='Limit to this customer id (can be repeated)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        customer_ids = options['customer_ids']
+        chunk_size = options['chunk_size']
+        
+        if options['verify']:
+            mismatched = verify_profiles(customer_ids, chunk_size=chunk_size)
+            if mismatched:
+                preview = ', '.join(str(customer_id) for customer_id in mismatched[:20])
+                raise CommandError(
+                    f'{len(mismatched)} credit profiles are out of date (customers: {preview})'
+                )
+            self.stdout.write(self.style.SUCCESS('All credit profiles are up to date'))
+            return
+        
+        rebuilt = rebuild_profiles(customer_ids, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} credit profiles'))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from loans.services.rescoring import DEFAULT_RESCORE_CHUNK_SIZE, rescore_portfolio
+
+class Command(BaseCommand):
+    help = 'Recompute every customer\'s credit score into customer_score_snapshots'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_RESCORE_CHUNK_SIZE,
+            help='Customer id range scored per query',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Score chunks in this many processes (PostgreSQL only)',
+        )
+    
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size and --workers must be positive')
+        
+        started = time.perf_counter()
+        scored = rescore_portfolio(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            progress=self.stdout.write,
+        )
+        seconds = time.perf_counter() - started
+        rate = scored / seconds if seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Rescored {scored} customers in {seconds:.2f}s ({rate:,.0f} customers/sec)'
+        ))
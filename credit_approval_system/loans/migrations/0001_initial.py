@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:15
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('customer_id', models.AutoField(primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('age', models.IntegerField(validators=[django.core.validators.MinValueValidator(18), django.core.validators.MaxValueValidator(100)])),
+                ('phone_number', models.CharField(max_length=15, unique=True)),
+                ('monthly_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('approved_limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('current_debt', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'customers',
+            },
+        ),
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('loan_id', models.AutoField(primary_key=True, serialize=False)),
+                ('loan_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('tenure', models.IntegerField(help_text='Loan tenure in months')),
+                ('interest_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('monthly_repayment', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='loans.customer')),
+            ],
+            options={
+                'db_table': 'loans',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_number'], name='customers_phone_n_7d2329_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['customer_id'], name='customers_custome_b85ebb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'is_active'], name='loans_custome_6c7195_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['start_date', 'end_date'], name='loans_start_d_5c9ae3_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditProfile',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_profile', serialize=False, to='loans.customer')),
+                ('active_loan_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_emi_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_loan_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_tenure', models.IntegerField(default=0)),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('loan_count', models.IntegerField(default=0)),
+                ('loans_per_year', models.JSONField(default=dict, help_text='Loan count keyed by start year')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'customer_credit_profiles',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanRequest',
+            fields=[
+                ('request_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('customer_id', models.IntegerField(help_text='Customer the loan is requested for; checked by the worker')),
+                ('loan_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('tenure', models.IntegerField(help_text='Loan tenure in months')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('monthly_installment', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('loan', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loan_request', to='loans.loan')),
+            ],
+            options={
+                'db_table': 'loan_requests',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_loanrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerScoreSnapshot',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_snapshot', serialize=False, to='loans.customer')),
+                ('credit_score', models.IntegerField()),
+                ('active_emi_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('scored_at', models.DateTimeField(help_text='Start of the rescoring run that wrote this score')),
+            ],
+            options={
+                'db_table': 'customer_score_snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_customerscoresnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customers_phone_n_7d2329_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customers_custome_b85ebb_idx',
+        ),
+    ]
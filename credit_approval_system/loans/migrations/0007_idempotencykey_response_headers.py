@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_remove_duplicate_customer_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='response_headers',
+            field=models.JSONField(default=dict),
+        ),
+    ]
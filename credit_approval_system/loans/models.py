@@ -1,5 +1,7 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+import uuid
 from decimal import Decimal
 
 class Customer(models.Model):
@@ -17,10 +19,8 @@ class Customer(models.Model):
     
     class Meta:
         db_table = 'customers'
-        indexes = [
-            models.Index(fields=['phone_number']),
-            models.Index(fields=['customer_id']),
-        ]
+        # No extra indexes: phone_number is unique and customer_id is the
+        # primary key, so both already have one
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} (ID: {self.customer_id})"
@@ -69,3 +69,130 @@ class Loan(models.Model):
     def remaining_amount(self):
         """Calculate remaining amount to be paid"""
         return self.loan_amount - self.total_amount_paid()
+
+
+
+class CustomerCreditProfile(models.Model):
+    """Running loan totals per customer, so scoring reads one row instead of the loan history"""
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='credit_profile'
+    )
+    active_loan_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_emi_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_loan_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_tenure = models.IntegerField(default=0)
+    emis_paid_on_time = models.IntegerField(default=0)
+    loan_count = models.IntegerField(default=0)
+    loans_per_year = models.JSONField(default=dict, help_text="Loan count keyed by start year")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'customer_credit_profiles'
+    
+    def __str__(self):
+        return f"Credit profile - Customer {self.customer_id}"
+    
+    def add_loan(self, loan):
+        """Add a newly created loan to the running totals"""
+        # Unsaved values may still be floats, e.g. EMIs from the eligibility result
+        loan_amount = Decimal(str(loan.loan_amount))
+        monthly_repayment = Decimal(str(loan.monthly_repayment))
+        
+        if loan.is_active:
+            self.active_loan_sum += loan_amount
+            self.active_emi_sum += monthly_repayment
+        self.total_loan_amount += loan_amount
+        self.total_tenure += loan.tenure
+        self.emis_paid_on_time += loan.emis_paid_on_time
+        self.loan_count += 1
+        
+        year = str(loan.start_date.year)
+        self.loans_per_year[year] = self.loans_per_year.get(year, 0) + 1
+    
+    def as_stats(self, current_year):
+        """Return the totals in the shape CreditScoreCalculator expects"""
+        return {
+            'active_loan_sum': self.active_loan_sum,
+            'active_emi_sum': self.active_emi_sum,
+            'total_tenure': self.total_tenure,
+            'emis_paid_on_time': self.emis_paid_on_time,
+            'loan_count': self.loan_count,
+            'current_year_count': self.loans_per_year.get(str(current_year), 0),
+            'total_loan_amount': self.total_loan_amount,
+        }
+
+
+class CustomerScoreSnapshot(models.Model):
+    """Credit score materialized by the nightly rescoring job"""
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='score_snapshot'
+    )
+    credit_score = models.IntegerField()
+    active_emi_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    scored_at = models.DateTimeField(help_text="Start of the rescoring run that wrote this score")
+    
+    class Meta:
+        db_table = 'customer_score_snapshots'
+    
+    def __str__(self):
+        return f"Score {self.credit_score} - Customer {self.customer_id}"
+
+
+class LoanRequest(models.Model):
+    """A create-loan request queued for the Celery worker, polled by the client"""
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (APPROVED, 'Approved'),
+        (REJECTED, 'Rejected'),
+        (FAILED, 'Failed'),
+    ]
+    
+    request_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    customer_id = models.IntegerField(help_text="Customer the loan is requested for; checked by the worker")
+    loan_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    tenure = models.IntegerField(help_text="Loan tenure in months")
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    loan = models.OneToOneField(
+        Loan, on_delete=models.SET_NULL, null=True, blank=True, related_name='loan_request'
+    )
+    monthly_installment = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'loan_requests'
+    
+    def __str__(self):
+        return f"Loan request {self.request_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a POST made with an Idempotency-Key header, replayed on retries"""
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=100)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder)
+    # Headers the view set itself (Location, ETag...), restored on replays
+    response_headers = models.JSONField(default=dict)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'endpoint'], name='unique_idempotency_key_per_endpoint'),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.key}"
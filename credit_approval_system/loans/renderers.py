@@ -0,0 +1,49 @@
+"""
+JSON renderer that encodes with orjson when it is installed. The output is
+the same bytes rest_framework's JSONRenderer produces for the same data
+(compact separators, UTF-8, U+2028/U+2029 escaped); anything orjson would
+encode differently or not at all goes through the stdlib renderer.
+Known differences, both for floats only (responses carry money as
+strings): exponents are spelled 1e16 rather than 1e+16, and NaN/Infinity
+become null where the stdlib renderer raises.
+
+Set per view on the hot endpoints. With settings.FAST_SERIALIZERS off it
+renders through JSONRenderer as well.
+"""
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimal, datetime, UUID, lazy strings... converted the way DRF does
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or not settings.FAST_SERIALIZERS
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        try:
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # orjson.JSONEncodeError is a TypeError: non-str keys, huge ints...
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        # Unlike DRF, orjson leaves these JavaScript line terminators raw
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,17 +1,26 @@
 from rest_framework import serializers
-from .models import Customer, Loan
+from .models import Customer, Loan, LoanRequest
+
+ELIGIBILITY_BATCH_MAX_ITEMS = 10000
+REGISTRATION_BATCH_MAX_ITEMS = 1000
+QUOTE_MATRIX_MAX_AXIS_VALUES = 50
+QUOTE_MATRIX_MAX_CELLS = 2500
+
+PHONE_NUMBER_TAKEN = "Phone number already registered"
 
 class CustomerRegistrationSerializer(serializers.Serializer):
+    # Duplicate phone numbers are caught by the unique constraint on insert,
+    # not with a query here; the views report them as a phone_number error
     first_name = serializers.CharField(max_length=100)
     last_name = serializers.CharField(max_length=100)
     age = serializers.IntegerField(min_value=18, max_value=100)
     monthly_income = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
     phone_number = serializers.CharField(max_length=15)
-    
-    def validate_phone_number(self, value):
-        if Customer.objects.filter(phone_number=value).exists():
-            raise serializers.ValidationError("Phone number already registered")
-        return value
+
+
+class CustomerRegistrationBatchSerializer(serializers.Serializer):
+    # Items are validated one by one with CustomerRegistrationSerializer
+    customers = serializers.ListField(allow_empty=False, max_length=REGISTRATION_BATCH_MAX_ITEMS)
 
 
 class CustomerResponseSerializer(serializers.ModelSerializer):
@@ -33,6 +42,39 @@ class LoanEligibilityRequestSerializer(serializers.Serializer):
     tenure = serializers.IntegerField(min_value=1)
 
 
+class LoanEligibilityBatchRequestSerializer(serializers.Serializer):
+    # Items are validated one by one with LoanEligibilityRequestSerializer
+    # so that a bad application does not reject the whole batch
+    applications = serializers.ListField(allow_empty=False, max_length=ELIGIBILITY_BATCH_MAX_ITEMS)
+
+
+class QuoteMatrixRequestSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    loan_amounts = serializers.ListField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0),
+        allow_empty=False,
+        max_length=QUOTE_MATRIX_MAX_AXIS_VALUES
+    )
+    interest_rates = serializers.ListField(
+        child=serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0),
+        allow_empty=False,
+        max_length=QUOTE_MATRIX_MAX_AXIS_VALUES
+    )
+    tenures = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=QUOTE_MATRIX_MAX_AXIS_VALUES
+    )
+    
+    def validate(self, data):
+        cells = len(data['loan_amounts']) * len(data['interest_rates']) * len(data['tenures'])
+        if cells > QUOTE_MATRIX_MAX_CELLS:
+            raise serializers.ValidationError(
+                f'The grid has {cells} quotes; at most {QUOTE_MATRIX_MAX_CELLS} are allowed'
+            )
+        return data
+
+
 class LoanEligibilityResponseSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
     approval = serializers.BooleanField()
@@ -57,6 +99,17 @@ class CreateLoanResponseSerializer(serializers.Serializer):
     monthly_installment = serializers.DecimalField(max_digits=12, decimal_places=2)
 
 
+class LoanRequestSerializer(serializers.ModelSerializer):
+    loan_id = serializers.IntegerField(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = LoanRequest
+        fields = [
+            'request_id', 'customer_id', 'status', 'loan_id', 'loan_amount', 'interest_rate',
+            'tenure', 'monthly_installment', 'message', 'created_at', 'updated_at'
+        ]
+
+
 class CustomerDetailSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='customer_id')
     
@@ -81,4 +134,7 @@ class CustomerLoanSerializer(serializers.ModelSerializer):
         fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'repayments_left']
     
     def get_repayments_left(self, obj):
+        # customer_active_loans_queryset rows carry it computed in SQL
+        if isinstance(obj, dict):
+            return obj['repayments_left']
         return obj.emis_left()
@@ -1,10 +1,22 @@
 from .credit_score import CreditScoreCalculator
-from .loan_eligibility import LoanEligibilityChecker
-from .loan_calculator import calculate_monthly_installment, round_to_nearest_lakh
+from .loan_eligibility import LoanEligibilityChecker, check_eligibility_batch
+from .loan_origination import originate_loan
+from .quotes import quote_matrix
+from .loan_calculator import (
+    calculate_monthly_installment,
+    calculate_monthly_installments,
+    amortization_schedule,
+    round_to_nearest_lakh
+)
 
 __all__ = [
     'CreditScoreCalculator',
     'LoanEligibilityChecker',
+    'check_eligibility_batch',
+    'originate_loan',
+    'quote_matrix',
     'calculate_monthly_installment',
+    'calculate_monthly_installments',
+    'amortization_schedule',
     'round_to_nearest_lakh'
 ]
@@ -0,0 +1,331 @@
+"""
+Staging-table import engine.
+
+Rows are validated with the same builders as the ORM engine, streamed into a
+temporary staging table (COPY FROM STDIN on PostgreSQL, batched INSERTs on
+SQLite) and merged into the real tables with one INSERT ... SELECT ...
+ON CONFLICT ... RETURNING statement per table.
+
+The file is always read and validated once, in the calling process, and
+duplicate ids are dropped there (first occurrence wins). With several
+workers the validated chunks are handed to forked processes that each
+stage and merge their share, so no two workers write the same row.
+"""
+import abc
+import csv
+import io
+import multiprocessing
+from datetime import date
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from loans.models import Customer, Loan
+from .data_import import (
+    DEFAULT_CHUNK_SIZE,
+    ImportStats,
+    build_customer,
+    build_loan,
+    build_objects,
+    chunked,
+    rows_as_dicts,
+)
+from .import_readers import read_rows
+
+CUSTOMER_COLUMNS = [
+    ('customer_id', 'integer'),
+    ('first_name', 'varchar(100)'),
+    ('last_name', 'varchar(100)'),
+    ('age', 'integer'),
+    ('phone_number', 'varchar(15)'),
+    ('monthly_salary', 'numeric(12, 2)'),
+    ('approved_limit', 'numeric(12, 2)'),
+    ('current_debt', 'numeric(12, 2)'),
+]
+
+LOAN_COLUMNS = [
+    ('loan_id', 'integer'),
+    ('customer_id', 'integer'),
+    ('loan_amount', 'numeric(12, 2)'),
+    ('tenure', 'integer'),
+    ('interest_rate', 'numeric(5, 2)'),
+    ('monthly_repayment', 'numeric(12, 2)'),
+    ('emis_paid_on_time', 'integer'),
+    ('start_date', 'date'),
+    ('end_date', 'date'),
+]
+
+
+class StagingImport(abc.ABC):
+    """Load one model's rows through a temporary staging table"""
+    
+    # Values that must be unique across the file, the primary key first
+    unique_fields = ()
+    
+    def __init__(self, model, columns, builder, chunk_size=DEFAULT_CHUNK_SIZE, upsert=False):
+        self.model = model
+        self.columns = columns
+        self.builder = builder
+        self.chunk_size = chunk_size
+        self.upsert = upsert
+        self.key = model._meta.pk.column
+        self.target = connection.ops.quote_name(model._meta.db_table)
+        self.staging = connection.ops.quote_name(f'staging_{model._meta.db_table}')
+    
+    def parse(self, rows, stats, warn):
+        """
+        Validate dict rows into chunks of staging values. Unique values are
+        tracked across the whole file, so later duplicates are skipped in
+        whichever chunk they appear.
+        """
+        seen = {field: {} for field in self.unique_fields}
+        
+        for chunk in chunked(rows, self.chunk_size):
+            values = []
+            for obj in build_objects(chunk, self.builder, stats, warn).values():
+                duplicate = next((field for field in self.unique_fields if getattr(obj, field) in seen[field]), None)
+                if duplicate:
+                    stats.skipped += 1
+                    if duplicate != self.key:
+                        value = getattr(obj, duplicate)
+                        warn(f'{stats.name}: {obj.pk} skipped, {duplicate} {value} is already used by {seen[duplicate][value]}')
+                    continue
+                for field in self.unique_fields:
+                    seen[field][getattr(obj, field)] = obj.pk
+                values.append([self._value(obj, name) for name, _ in self.columns])
+            if values:
+                yield values
+    
+    def load(self, chunks):
+        """Stage chunks of values and merge them in one transaction; returns the merge counts"""
+        stats = ImportStats(self.model._meta.db_table)
+        
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging(cursor)
+            for values in chunks:
+                self._stage(cursor, values)
+            self._merge(cursor, stats)
+            cursor.execute(f'DROP TABLE {self.staging}')
+        
+        return stats
+    
+    def run(self, rows, warn, stats=None):
+        """Parse, stage and merge dict rows in this process"""
+        stats = stats or ImportStats(self.model._meta.db_table)
+        add_counts(stats, self.load(self.parse(rows, stats, warn)))
+        return stats.finish()
+    
+    def _create_staging(self, cursor):
+        columns = ', '.join(f'{name} {sql_type}' for name, sql_type in self.columns)
+        cursor.execute(f'DROP TABLE IF EXISTS {self.staging}')
+        cursor.execute(f'CREATE TEMPORARY TABLE {self.staging} ({columns})')
+    
+    def _value(self, obj, name):
+        value = getattr(obj, name)
+        if value is None:
+            return None
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+    
+    def _stage(self, cursor, values):
+        names = [name for name, _ in self.columns]
+        
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(values)
+            buffer.seek(0)
+            sql = f'COPY {self.staging} ({", ".join(names)}) FROM STDIN WITH (FORMAT csv)'
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+                raw_cursor.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        else:
+            placeholders = ', '.join(['%s'] * len(names))
+            cursor.executemany(
+                f'INSERT INTO {self.staging} ({", ".join(names)}) VALUES ({placeholders})',
+                values,
+            )
+    
+    def _conflict_sql(self, columns):
+        if not self.upsert:
+            return 'ON CONFLICT DO NOTHING'
+        updates = ', '.join(
+            f'{column} = EXCLUDED.{column}' for column in columns if column not in (self.key, 'created_at')
+        )
+        return f'ON CONFLICT ({self.key}) DO UPDATE SET {updates}'
+    
+    def _count(self, cursor, source_sql):
+        cursor.execute(f'SELECT COUNT(*) {source_sql}')
+        return cursor.fetchone()[0]
+    
+    def _count_existing(self, cursor, source_sql):
+        return self._count(
+            cursor,
+            f'{source_sql} AND EXISTS (SELECT 1 FROM {self.target} t WHERE t.{self.key} = s.{self.key})'
+        )
+    
+    def _finish_counts(self, stats, staged, existing, written):
+        if self.upsert:
+            stats.updated += existing
+            stats.created += written - existing
+        else:
+            stats.created += written
+            stats.skipped += staged - written
+    
+    @abc.abstractmethod
+    def _merge(self, cursor, stats):
+        """Insert (or upsert) the staged rows into the target table, updating stats"""
+
+
+class CustomerStagingImport(StagingImport):
+    unique_fields = ('customer_id', 'phone_number')
+    
+    def __init__(self, **kwargs):
+        super().__init__(Customer, CUSTOMER_COLUMNS, build_customer, **kwargs)
+    
+    def _merge(self, cursor, stats):
+        # Numbers registered to another customer would break the unique
+        # constraint, also under DO UPDATE, so those rows are skipped
+        source = (
+            f'FROM {self.staging} s WHERE NOT EXISTS (SELECT 1 FROM {self.target} t '
+            f'WHERE t.phone_number = s.phone_number AND t.customer_id <> s.customer_id)'
+        )
+        names = [name for name, _ in self.columns]
+        target_columns = names + ['created_at', 'updated_at']
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        
+        staged = self._count(cursor, source)
+        stats.skipped += self._count(cursor, f'FROM {self.staging} s') - staged
+        existing = self._count_existing(cursor, source)
+        
+        cursor.execute(
+            f'INSERT INTO {self.target} ({", ".join(target_columns)}) '
+            f'SELECT {", ".join("s." + name for name in names)}, %s, %s '
+            f'{source} {self._conflict_sql(target_columns)} RETURNING customer_id',
+            [now, now],
+        )
+        written = [row[0] for row in cursor.fetchall()]
+        self._finish_counts(stats, staged, existing, len(written))
+        stats.customer_ids.update(written)
+
+
+class LoanStagingImport(StagingImport):
+    unique_fields = ('loan_id',)
+    
+    def __init__(self, today=None, **kwargs):
+        self.today = today or date.today()
+        super().__init__(Loan, LOAN_COLUMNS, lambda row: build_loan(row, self.today), **kwargs)
+    
+    def _merge(self, cursor, stats):
+        customers = connection.ops.quote_name(Customer._meta.db_table)
+        known = f'EXISTS (SELECT 1 FROM {customers} c WHERE c.customer_id = s.customer_id)'
+        source = f'FROM {self.staging} s WHERE {known}'
+        names = [name for name, _ in self.columns]
+        target_columns = names + ['is_active', 'created_at', 'updated_at']
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        
+        stats.missing_customer += self._count(cursor, f'FROM {self.staging} s WHERE NOT {known}')
+        staged = self._count(cursor, source)
+        existing = self._count_existing(cursor, source)
+        if self.upsert:
+            # RETURNING only reports the new owner of a loan that moves to
+            # another customer; the previous owner's profile changes as well
+            cursor.execute(
+                f'SELECT DISTINCT t.customer_id FROM {self.target} t '
+                f'JOIN {self.staging} s ON t.{self.key} = s.{self.key} '
+                f'WHERE {known} AND t.customer_id <> s.customer_id'
+            )
+            stats.customer_ids.update(row[0] for row in cursor.fetchall())
+        
+        # is_active is derived in SQL from a single cut-off date
+        cursor.execute(
+            f'INSERT INTO {self.target} ({", ".join(target_columns)}) '
+            f'SELECT {", ".join("s." + name for name in names)}, s.end_date >= %s, %s, %s '
+            f'{source} {self._conflict_sql(target_columns)} RETURNING customer_id',
+            [self.today.isoformat(), now, now],
+        )
+        written = [row[0] for row in cursor.fetchall()]
+        self._finish_counts(stats, staged, existing, len(written))
+        stats.customer_ids.update(written)
+
+
+IMPORTERS = {
+    'customers': CustomerStagingImport,
+    'loans': LoanStagingImport,
+}
+
+
+def add_counts(total, stats):
+    """Add one step's counters and customer ids to a running total"""
+    for counter in ['rows', 'created', 'updated', 'skipped', 'invalid', 'missing_customer']:
+        setattr(total, counter, getattr(total, counter) + getattr(stats, counter))
+    total.customer_ids.update(stats.customer_ids)
+
+
+def _run_worker(importer, chunks, results):
+    """Stage and merge the chunks sent through the queue until None; runs in a child process"""
+    finished = False
+    
+    def receive():
+        nonlocal finished
+        yield from iter(chunks.get, None)
+        finished = True
+    
+    try:
+        results.put((importer.load(receive()), None))
+    except Exception as exc:
+        # Keep taking chunks, so the parent never blocks on a full queue
+        if not finished:
+            for _ in iter(chunks.get, None):
+                pass
+        results.put((None, f'{type(exc).__name__}: {exc}'))
+    finally:
+        connections.close_all()
+
+
+def copy_import(kind, path, chunk_size=DEFAULT_CHUNK_SIZE, upsert=False, warn=None, workers=1, stats=None):
+    """
+    Import customers or loans from a file through a staging table.
+    With workers > 1 (PostgreSQL only) the validated chunks are spread
+    across forked processes, each staging and merging what it receives.
+    Pass stats to keep the counts of workers that committed when another
+    one fails.
+    """
+    warn = warn or (lambda message: None)
+    stats = stats or ImportStats(kind)
+    importer = IMPORTERS[kind](chunk_size=chunk_size, upsert=upsert)
+    rows = rows_as_dicts(read_rows(path))
+    
+    if workers <= 1 or connection.vendor != 'postgresql':
+        return importer.run(rows, warn, stats)
+    
+    # Children must not share the parent's database connection
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    # Bounded, so parsing stays only a few chunks ahead of the workers
+    chunks = context.Queue(maxsize=2 * workers)
+    results = context.Queue()
+    processes = [context.Process(target=_run_worker, args=(importer, chunks, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    
+    try:
+        for values in importer.parse(rows, stats, warn):
+            chunks.put(values)
+    finally:
+        for _ in processes:
+            chunks.put(None)
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    
+    errors = []
+    for merged, error in outcomes:
+        if error:
+            errors.append(error)
+        else:
+            add_counts(stats, merged)
+    if errors:
+        raise RuntimeError(f'{kind} import failed in {len(errors)} of {workers} workers: {errors[0]}')
+    return stats.finish()
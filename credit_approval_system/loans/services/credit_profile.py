@@ -0,0 +1,113 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import ExtractYear
+from loans.models import Customer, Loan, CustomerCreditProfile
+
+PROFILE_TOTAL_FIELDS = [
+    'active_loan_sum',
+    'active_emi_sum',
+    'total_loan_amount',
+    'total_tenure',
+    'emis_paid_on_time',
+    'loan_count',
+]
+
+
+def compute_profiles(customer_ids):
+    """
+    Build unsaved CustomerCreditProfile objects from the loans table.
+    Uses two GROUP BY queries regardless of the number of customers.
+    """
+    active = Q(loans__is_active=True)
+    customers = Customer.objects.filter(customer_id__in=customer_ids).values('customer_id').annotate(
+        active_loan_sum=Sum('loans__loan_amount', filter=active),
+        active_emi_sum=Sum('loans__monthly_repayment', filter=active),
+        total_loan_amount=Sum('loans__loan_amount'),
+        total_tenure=Sum('loans__tenure'),
+        emis_paid_on_time=Sum('loans__emis_paid_on_time'),
+        loan_count=Count('loans__loan_id'),
+    )
+    
+    profiles = {}
+    for row in customers:
+        profiles[row['customer_id']] = CustomerCreditProfile(
+            customer_id=row['customer_id'],
+            active_loan_sum=row['active_loan_sum'] or Decimal(0),
+            active_emi_sum=row['active_emi_sum'] or Decimal(0),
+            total_loan_amount=row['total_loan_amount'] or Decimal(0),
+            total_tenure=row['total_tenure'] or 0,
+            emis_paid_on_time=row['emis_paid_on_time'] or 0,
+            loan_count=row['loan_count'],
+            loans_per_year={},
+        )
+    
+    yearly_counts = Loan.objects.filter(customer_id__in=customer_ids).values(
+        'customer_id', year=ExtractYear('start_date')
+    ).annotate(count=Count('loan_id')).order_by()
+    
+    for row in yearly_counts:
+        profiles[row['customer_id']].loans_per_year[str(row['year'])] = row['count']
+    
+    return profiles
+
+
+def _customer_id_chunks(customer_ids, chunk_size):
+    if customer_ids is None:
+        customer_ids = Customer.objects.order_by('customer_id').values_list('customer_id', flat=True)
+    customer_ids = sorted(set(customer_ids))
+    
+    for start in range(0, len(customer_ids), chunk_size):
+        yield customer_ids[start:start + chunk_size]
+
+
+def rebuild_profiles(customer_ids=None, chunk_size=1000):
+    """Recompute and upsert profiles for the given customers (all when None)"""
+    rebuilt = 0
+    for chunk in _customer_id_chunks(customer_ids, chunk_size):
+        profiles = compute_profiles(chunk)
+        with transaction.atomic():
+            CustomerCreditProfile.objects.bulk_create(
+                profiles.values(),
+                update_conflicts=True,
+                unique_fields=['customer'],
+                update_fields=PROFILE_TOTAL_FIELDS + ['loans_per_year', 'updated_at'],
+            )
+        rebuilt += len(profiles)
+    return rebuilt
+
+
+def verify_profiles(customer_ids=None, chunk_size=1000):
+    """Return ids of customers whose stored profile differs from their loans"""
+    mismatched = []
+    for chunk in _customer_id_chunks(customer_ids, chunk_size):
+        expected = compute_profiles(chunk)
+        stored = CustomerCreditProfile.objects.in_bulk(chunk)
+        for customer_id, profile in expected.items():
+            current = stored.get(customer_id)
+            if current is None or any(
+                getattr(current, field) != getattr(profile, field)
+                for field in PROFILE_TOTAL_FIELDS + ['loans_per_year']
+            ):
+                mismatched.append(customer_id)
+    return mismatched
+
+
+def record_loan(loan):
+    """Add a new loan to its customer's profile, in the caller's transaction"""
+    with transaction.atomic():
+        profile = CustomerCreditProfile.objects.select_for_update().filter(
+            customer_id=loan.customer_id
+        ).first()
+        
+        if profile is None:
+            rebuild_profiles([loan.customer_id])
+            return
+        
+        profile.add_loan(loan)
+        profile.save()
+
+
+def refresh_profile(customer_id):
+    """Recompute a single customer's profile after a loan was changed or deleted"""
+    rebuild_profiles([customer_id])
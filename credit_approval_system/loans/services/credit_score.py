@@ -1,113 +1,115 @@
 from decimal import Decimal
-from datetime import datetime, date
-from django.db.models import Sum, Q
-from loans.models import Loan
+from datetime import datetime
+from django.db.models import Sum, Count, Q
+from loans.instrumentation import timed
+from loans.models import Loan, CustomerCreditProfile
+from .scoring_rules import get_scoring_rules
+
+
+def loan_stats_aggregates(current_year=None, prefix=''):
+    """
+    Conditional aggregates for every input the credit score needs.
+    Use prefix='' on a Loan queryset and prefix='loans__' on a Customer queryset.
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+    
+    active = Q(**{f'{prefix}is_active': True})
+    this_year = Q(**{f'{prefix}start_date__year': current_year})
+    
+    return {
+        'active_loan_sum': Sum(f'{prefix}loan_amount', filter=active),
+        'active_emi_sum': Sum(f'{prefix}monthly_repayment', filter=active),
+        'total_tenure': Sum(f'{prefix}tenure'),
+        'emis_paid_on_time': Sum(f'{prefix}emis_paid_on_time'),
+        'loan_count': Count(f'{prefix}loan_id'),
+        'current_year_count': Count(f'{prefix}loan_id', filter=this_year),
+        'total_loan_amount': Sum(f'{prefix}loan_amount'),
+    }
+
+
+def normalize_loan_stats(row):
+    """Replace NULL aggregates (customer without loans) with zeros"""
+    return {
+        'active_loan_sum': row.get('active_loan_sum') or Decimal(0),
+        'active_emi_sum': row.get('active_emi_sum') or Decimal(0),
+        'total_tenure': row.get('total_tenure') or 0,
+        'emis_paid_on_time': row.get('emis_paid_on_time') or 0,
+        'loan_count': row.get('loan_count') or 0,
+        'current_year_count': row.get('current_year_count') or 0,
+        'total_loan_amount': row.get('total_loan_amount') or Decimal(0),
+    }
+
 
 class CreditScoreCalculator:
-    def __init__(self, customer):
+    def __init__(self, customer, stats=None, rules=None):
         self.customer = customer
+        self.stats = stats
+        self.rules = rules or get_scoring_rules()
         self.score = 0
-        
+    
+    def get_stats(self):
+        """
+        Load the customer's loan totals, from the credit profile row when it
+        exists, otherwise with a single aggregate query over their loans
+        """
+        if self.stats is None:
+            profile = CustomerCreditProfile.objects.filter(customer_id=self.customer.pk).first()
+            if profile is not None:
+                self.stats = profile.as_stats(datetime.now().year)
+            else:
+                row = Loan.objects.filter(customer=self.customer).aggregate(
+                    **loan_stats_aggregates()
+                )
+                self.stats = normalize_loan_stats(row)
+        return self.stats
+    
+    @timed('credit_score')
     def calculate(self):
         """Calculate credit score based on various factors (out of 100)"""
+        stats = self.get_stats()
+        
         # If sum of current loans > approved limit, credit score = 0
-        if self._check_exceeds_limit():
+        if self._check_exceeds_limit(stats):
             return 0
         
         score = 0
         
         # Component 1: Past loans paid on time (40 points)
-        score += self._score_payment_history()
+        score += self._score_payment_history(stats)
         
         # Component 2: Number of loans taken (20 points)
-        score += self._score_number_of_loans()
+        score += self._score_number_of_loans(stats)
         
         # Component 3: Loan activity in current year (20 points)
-        score += self._score_current_year_activity()
+        score += self._score_current_year_activity(stats)
         
         # Component 4: Loan approved volume (20 points)
-        score += self._score_loan_volume()
+        score += self._score_loan_volume(stats)
         
-        return min(100, max(0, score))
+        self.score = min(100, max(0, score))
+        return self.score
     
-    def _check_exceeds_limit(self):
-        """Check if sum of current EMIs exceeds approved limit"""
-        current_loans = Loan.objects.filter(
-            customer=self.customer,
-            is_active=True
-        )
-        
-        total_loan_amount = current_loans.aggregate(
-            total=Sum('loan_amount')
-        )['total'] or Decimal(0)
-        
-        return total_loan_amount > self.customer.approved_limit
+    def _check_exceeds_limit(self, stats):
+        """Check if sum of current loans exceeds approved limit"""
+        return stats['active_loan_sum'] > self.customer.approved_limit
     
-    def _score_payment_history(self):
+    @timed('score_payment_history')
+    def _score_payment_history(self, stats):
         """Score based on EMIs paid on time vs total EMIs"""
-        loans = Loan.objects.filter(customer=self.customer)
-        
-        if not loans.exists():
-            return 20  # New customer gets average score
-        
-        total_emis = sum(loan.tenure for loan in loans)
-        emis_paid_on_time = sum(loan.emis_paid_on_time for loan in loans)
-        
-        if total_emis == 0:
-            return 20
-        
-        payment_ratio = emis_paid_on_time / total_emis
-        return round(payment_ratio * 40)
+        return self.rules.payment_history_points(stats)
     
-    def _score_number_of_loans(self):
+    @timed('score_number_of_loans')
+    def _score_number_of_loans(self, stats):
         """Score based on number of loans"""
-        loan_count = Loan.objects.filter(customer=self.customer).count()
-        
-        if loan_count == 0:
-            return 10
-        elif loan_count <= 3:
-            return 20
-        elif loan_count <= 6:
-            return 15
-        else:
-            return 10  # Too many loans
+        return self.rules.number_of_loans_points(stats['loan_count'])
     
-    def _score_current_year_activity(self):
+    @timed('score_current_year_activity')
+    def _score_current_year_activity(self, stats):
         """Score based on loan activity in current year"""
-        current_year = datetime.now().year
-        
-        current_year_loans = Loan.objects.filter(
-            customer=self.customer,
-            start_date__year=current_year
-        )
-        
-        count = current_year_loans.count()
-        
-        if count == 0:
-            return 5
-        elif count <= 2:
-            return 20
-        elif count <= 4:
-            return 15
-        else:
-            return 10
+        return self.rules.current_year_activity_points(stats['current_year_count'])
     
-    def _score_loan_volume(self):
+    @timed('score_loan_volume')
+    def _score_loan_volume(self, stats):
         """Score based on total loan volume vs approved limit"""
-        total_loan_amount = Loan.objects.filter(
-            customer=self.customer
-        ).aggregate(total=Sum('loan_amount'))['total'] or Decimal(0)
-        
-        if self.customer.approved_limit == 0:
-            return 10
-        
-        volume_ratio = total_loan_amount / self.customer.approved_limit
-        
-        if volume_ratio < Decimal('0.5'):
-            return 20
-        elif volume_ratio < Decimal('1.0'):
-            return 15
-        elif volume_ratio < Decimal('2.0'):
-            return 10
-        else:
-            return 5
+        return self.rules.loan_volume_points(stats['total_loan_amount'], self.customer.approved_limit)
@@ -0,0 +1,330 @@
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Q
+from loans.models import Customer, Loan
+from .credit_profile import rebuild_profiles
+from .score_cache import invalidate_credit_scores
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_CUSTOMER_AGE = 30  # Used when the source has no age column
+
+# Source headers that differ from the model field names
+HEADER_ALIASES = {
+    'monthly_income': 'monthly_salary',
+    'monthly_payment': 'monthly_repayment',
+    'date_of_approval': 'start_date',
+}
+
+CUSTOMER_UPDATE_FIELDS = [
+    'first_name', 'last_name', 'age', 'phone_number',
+    'monthly_salary', 'approved_limit', 'current_debt', 'updated_at',
+]
+LOAN_UPDATE_FIELDS = [
+    'customer', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment',
+    'emis_paid_on_time', 'start_date', 'end_date', 'is_active', 'updated_at',
+]
+
+INVALID_ROW_ERRORS = (KeyError, ValueError, TypeError, InvalidOperation)
+
+
+class ImportStats:
+    """Counters for one import step"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.missing_customer = 0
+        self.customer_ids = set()
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+    
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+    
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+    
+    def summary(self):
+        return (
+            f'{self.name}: {self.rows} rows, {self.created} created, {self.updated} updated, '
+            f'{self.skipped} skipped, {self.invalid} invalid in {self.seconds:.2f}s '
+            f'({self.rows_per_second:,.0f} rows/sec)'
+        )
+
+
+def normalize_header(name):
+    """'EMIs paid on Time' -> 'emis_paid_on_time', with aliases applied"""
+    key = re.sub(r'[^a-z0-9]+', '_', str(name).strip().lower()).strip('_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def rows_as_dicts(rows):
+    """
+    Turn a header row followed by value rows into dicts keyed by field name.
+    This is where every reader in import_readers joins the same pipeline.
+    """
+    rows = iter(rows)
+    header_row = next(rows, None)
+    if header_row is None:
+        return
+    header = [normalize_header(name) for name in header_row]
+    
+    for row in rows:
+        if not row or row[0] in (None, ''):  # Skip empty rows
+            continue
+        yield dict(zip(header, row))
+
+
+def chunked(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _decimal(value, default=None):
+    if value is None or value == '':
+        if default is None:
+            raise ValueError('missing value')
+        return default
+    return Decimal(str(value).strip())
+
+
+def _integer(value):
+    return int(Decimal(str(value).strip()))
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+def _phone(value):
+    # Spreadsheets and CSV readers may hand phone numbers over as numbers
+    if isinstance(value, (int, float, Decimal)):
+        return str(int(value))
+    return str(value).strip()
+
+
+def build_customer(row):
+    age = row.get('age')
+    return Customer(
+        customer_id=_integer(row['customer_id']),
+        first_name=str(row['first_name']).strip(),
+        last_name=str(row['last_name']).strip(),
+        age=_integer(age) if age not in (None, '') else DEFAULT_CUSTOMER_AGE,
+        phone_number=_phone(row['phone_number']),
+        monthly_salary=_decimal(row['monthly_salary']),
+        approved_limit=_decimal(row['approved_limit']),
+        current_debt=_decimal(row.get('current_debt'), Decimal('0')),
+    )
+
+
+def build_loan(row, today):
+    end_date = _date(row['end_date'])
+    return Loan(
+        loan_id=_integer(row['loan_id']),
+        customer_id=_integer(row['customer_id']),
+        loan_amount=_decimal(row['loan_amount']),
+        tenure=_integer(row['tenure']),
+        interest_rate=_decimal(row['interest_rate']),
+        monthly_repayment=_decimal(row['monthly_repayment']),
+        emis_paid_on_time=_integer(row['emis_paid_on_time']),
+        start_date=_date(row['start_date']),
+        end_date=end_date,
+        is_active=today <= end_date,
+    )
+
+
+def build_objects(rows, builder, stats, warn):
+    """Validate rows into model objects, dropping duplicate ids within the chunk"""
+    objects = {}
+    for row in rows:
+        stats.rows += 1
+        try:
+            obj = builder(row)
+        except INVALID_ROW_ERRORS as exc:
+            stats.invalid += 1
+            warn(f'{stats.name}: invalid row {stats.rows}: {exc!r}')
+            continue
+        if obj.pk in objects:
+            stats.skipped += 1  # First occurrence wins
+            continue
+        objects[obj.pk] = obj
+    return objects
+
+
+def import_customers(rows, chunk_size=DEFAULT_CHUNK_SIZE, upsert=False, warn=None, stats=None):
+    """
+    Bulk import customers from dict rows, one existence query per chunk.
+    Rows whose phone number belongs to another customer are skipped. Pass
+    stats to keep the counts of committed chunks when a later chunk fails.
+    """
+    warn = warn or (lambda message: None)
+    stats = stats or ImportStats('customers')
+    
+    for chunk in chunked(rows, chunk_size):
+        customers = build_objects(chunk, build_customer, stats, warn)
+        if not customers:
+            continue
+        
+        with transaction.atomic():
+            taken = Customer.objects.filter(
+                Q(customer_id__in=customers.keys())
+                | Q(phone_number__in={customer.phone_number for customer in customers.values()})
+            ).values_list('customer_id', 'phone_number')
+            existing = set()
+            phone_owners = {}
+            for customer_id, phone_number in taken:
+                phone_owners[phone_number] = customer_id
+                if customer_id in customers:
+                    existing.add(customer_id)
+            
+            to_write = []
+            for customer in customers.values():
+                # Earlier rows of the chunk claim their numbers as well
+                owner = phone_owners.setdefault(customer.phone_number, customer.customer_id)
+                if owner != customer.customer_id:
+                    stats.skipped += 1
+                    warn(
+                        f'Phone number {customer.phone_number} of customer {customer.customer_id} '
+                        f'already belongs to customer {owner}'
+                    )
+                elif customer.customer_id in existing and not upsert:
+                    stats.skipped += 1
+                else:
+                    to_write.append(customer)
+            
+            if upsert:
+                Customer.objects.bulk_create(
+                    to_write,
+                    update_conflicts=True,
+                    unique_fields=['customer_id'],
+                    update_fields=CUSTOMER_UPDATE_FIELDS,
+                )
+                updated = sum(1 for customer in to_write if customer.customer_id in existing)
+                stats.updated += updated
+                stats.created += len(to_write) - updated
+                stats.customer_ids.update(customer.customer_id for customer in to_write)
+            else:
+                Customer.objects.bulk_create(to_write, ignore_conflicts=True)
+                # Rows a concurrent writer inserted first were dropped by the
+                # conflict clause, so count what is actually stored
+                stored = dict(
+                    Customer.objects.filter(
+                        customer_id__in=[customer.customer_id for customer in to_write]
+                    ).values_list('customer_id', 'phone_number')
+                )
+                inserted = [c.customer_id for c in to_write if stored.get(c.customer_id) == c.phone_number]
+                stats.created += len(inserted)
+                stats.skipped += len(to_write) - len(inserted)
+                stats.customer_ids.update(inserted)
+    
+    return stats.finish()
+
+
+def import_loans(rows, chunk_size=DEFAULT_CHUNK_SIZE, upsert=False, warn=None, today=None, stats=None):
+    """
+    Bulk import loans from dict rows, two existence queries per chunk. The
+    customers of every written loan are collected in stats.customer_ids,
+    including the previous owner of a loan that --upsert moved.
+    """
+    warn = warn or (lambda message: None)
+    today = today or date.today()
+    stats = stats or ImportStats('loans')
+    
+    for chunk in chunked(rows, chunk_size):
+        loans = build_objects(chunk, lambda row: build_loan(row, today), stats, warn)
+        if not loans:
+            continue
+        
+        with transaction.atomic():
+            known_customers = set(
+                Customer.objects.filter(
+                    customer_id__in={loan.customer_id for loan in loans.values()}
+                ).values_list('customer_id', flat=True)
+            )
+            # loan_id -> current customer, whose profile changes when the loan moves
+            existing = dict(
+                Loan.objects.filter(loan_id__in=loans.keys()).values_list('loan_id', 'customer_id')
+            )
+            
+            to_write = []
+            for loan in loans.values():
+                if loan.customer_id not in known_customers:
+                    stats.missing_customer += 1
+                    warn(f'Customer {loan.customer_id} not found for loan {loan.loan_id}')
+                elif loan.loan_id in existing and not upsert:
+                    stats.skipped += 1
+                else:
+                    to_write.append(loan)
+            
+            if upsert:
+                Loan.objects.bulk_create(
+                    to_write,
+                    update_conflicts=True,
+                    unique_fields=['loan_id'],
+                    update_fields=LOAN_UPDATE_FIELDS,
+                )
+                updated = sum(1 for loan in to_write if loan.loan_id in existing)
+                stats.updated += updated
+                stats.created += len(to_write) - updated
+                stats.customer_ids.update(existing[loan.loan_id] for loan in to_write if loan.loan_id in existing)
+            else:
+                Loan.objects.bulk_create(to_write, ignore_conflicts=True)
+                # As for customers: rows a concurrent writer inserted first were
+                # dropped by the conflict clause, so count what is actually stored.
+                # Exact columns only: decimals are rounded on the way in
+                stored = {
+                    loan_id: row for loan_id, *row in Loan.objects.filter(
+                        loan_id__in=[loan.loan_id for loan in to_write]
+                    ).values_list('loan_id', 'customer_id', 'tenure', 'start_date', 'end_date')
+                }
+                inserted = sum(
+                    1 for loan in to_write
+                    if stored.get(loan.loan_id) == [loan.customer_id, loan.tenure, loan.start_date, loan.end_date]
+                )
+                stats.created += inserted
+                stats.skipped += len(to_write) - inserted
+            stats.customer_ids.update(loan.customer_id for loan in to_write)
+    
+    return stats.finish()
+
+
+def reset_sequences(*models):
+    """Move AutoField sequences past explicitly imported ids (no-op on SQLite)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def refresh_derived_data(customer_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    bulk_create skips model signals, so rebuild the credit profiles and drop
+    cached scores of every customer the import touched
+    """
+    if not customer_ids:
+        return 0
+    rebuilt = rebuild_profiles(customer_ids, chunk_size=chunk_size)
+    invalidate_credit_scores(customer_ids)
+    return rebuilt
@@ -0,0 +1,60 @@
+import csv
+from pathlib import Path
+import openpyxl
+
+
+def read_xlsx_rows(path):
+    """Stream rows from the first sheet without loading the workbook into memory"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_csv_rows(path):
+    """Stream rows from a CSV file; the first row is the header"""
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        yield from csv.reader(csv_file)
+
+
+def read_parquet_rows(path):
+    """Stream rows from a Parquet file one row group at a time"""
+    # Imported here so Excel and CSV imports do not pay for loading pyarrow
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError('Reading Parquet files requires the pyarrow package') from exc
+    
+    return _iter_row_groups(pq.ParquetFile(path))
+
+
+def _iter_row_groups(parquet_file):
+    yield tuple(parquet_file.schema_arrow.names)
+    for index in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(index)
+        yield from zip(*(column.to_pylist() for column in table.columns))
+
+
+READERS = {
+    '.xlsx': read_xlsx_rows,
+    '.xlsm': read_xlsx_rows,
+    '.csv': read_csv_rows,
+    '.parquet': read_parquet_rows,
+    '.pq': read_parquet_rows,
+}
+
+
+def get_reader(path):
+    """Pick a reader from the file extension"""
+    extension = Path(path).suffix.lower()
+    try:
+        return READERS[extension]
+    except KeyError:
+        supported = ', '.join(sorted(READERS))
+        raise ValueError(f'Unsupported file type "{extension}" for {path} (supported: {supported})')
+
+
+def read_rows(path):
+    """Header row followed by value rows, whatever the file format"""
+    return get_reader(path)(path)
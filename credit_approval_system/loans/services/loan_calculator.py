@@ -1,6 +1,31 @@
-from decimal import Decimal
+from decimal import Decimal, localcontext
+from functools import lru_cache
 import math
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from loans.instrumentation import timed
 
+# Distinct (rate, tenure) pairs kept in the annuity factor table: every
+# two-decimal rate up to 36% for nine tenures fits, at ~150 bytes per entry
+EMI_FACTOR_CACHE_SIZE = 32768
+
+
+@lru_cache(maxsize=EMI_FACTOR_CACHE_SIZE)
+def annuity_factor(annual_interest_rate, tenure_months):
+    """
+    EMI per unit of principal for a (rate, tenure) pair: r × (1 + r)^n / ((1 + r)^n - 1).
+    Memoized with LRU eviction, so the common pairs stay in the table and
+    rare ones are dropped. Computed with extra precision so that
+    principal × factor rounds to the same cent as the full formula.
+    """
+    with localcontext() as ctx:
+        ctx.prec = 50
+        r = Decimal(annual_interest_rate) / Decimal(12) / Decimal(100)
+        one_plus_r_power_n = (1 + r) ** Decimal(tenure_months)
+        return r * one_plus_r_power_n / (one_plus_r_power_n - 1)
+
+
+@timed('emi')
 def calculate_monthly_installment(loan_amount, annual_interest_rate, tenure_months):
     """
     Calculate EMI using compound interest formula.
@@ -9,9 +34,20 @@ def calculate_monthly_installment(loan_amount, annual_interest_rate, tenure_mont
     P = Principal loan amount
     r = Monthly interest rate (annual rate / 12 / 100)
     n = Number of months (tenure)
+    The P-independent part comes from the annuity factor table.
     """
     if annual_interest_rate == 0:
-        return Decimal(loan_amount) / Decimal(tenure_months)
+        return round(Decimal(loan_amount) / Decimal(tenure_months), 2)
+    
+    # Decimal keys so 10.5, 10.50 and Decimal('10.5') share one entry
+    factor = annuity_factor(Decimal(annual_interest_rate), Decimal(tenure_months))
+    return round(Decimal(loan_amount) * factor, 2)
+
+
+def calculate_monthly_installment_uncached(loan_amount, annual_interest_rate, tenure_months):
+    """The full Decimal formula evaluated per call; the reference for the factor table"""
+    if annual_interest_rate == 0:
+        return round(Decimal(loan_amount) / Decimal(tenure_months), 2)
     
     P = Decimal(loan_amount)
     r = Decimal(annual_interest_rate) / Decimal(12) / Decimal(100)
@@ -26,6 +62,85 @@ def calculate_monthly_installment(loan_amount, annual_interest_rate, tenure_mont
     return round(emi, 2)
 
 
+def calculate_monthly_installments(loan_amounts, annual_interest_rates, tenures_months):
+    """
+    Vectorized calculate_monthly_installment for whole portfolios.
+    Takes array-likes (broadcast against each other) and returns a float64
+    array of EMIs rounded to the cent, matching the Decimal path exactly.
+    """
+    P, rate, n = np.broadcast_arrays(
+        np.asarray(loan_amounts, dtype=np.float64),
+        np.asarray(annual_interest_rates, dtype=np.float64),
+        np.asarray(tenures_months, dtype=np.float64),
+    )
+    r = rate / 1200
+    
+    # (1 + r)^n - 1 via log1p/expm1 keeps precision for small monthly rates
+    growth = np.expm1(n * np.log1p(r))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = np.where(r == 0, P / n, P * r * (growth + 1) / growth)
+    
+    cents = emi * 100
+    rounded = np.rint(cents)  # Round half to even, like Decimal's round()
+    
+    # Float error can only matter when the exact value sits on a half cent;
+    # recompute those few with the Decimal path
+    tolerance = 1e-9 + np.abs(cents) * 1e-11
+    ambiguous = np.flatnonzero(np.abs(cents - np.floor(cents) - 0.5) <= tolerance)
+    if ambiguous.size:
+        originals = np.broadcast_arrays(
+            np.asarray(loan_amounts, dtype=object),
+            np.asarray(annual_interest_rates, dtype=object),
+            np.asarray(tenures_months, dtype=object),
+        )
+        flat_rounded = rounded.reshape(-1)
+        for index in ambiguous:
+            exact = calculate_monthly_installment(
+                *(values.reshape(-1)[index] for values in originals)
+            )
+            flat_rounded[index] = float(exact * 100)
+    
+    return rounded / 100
+
+
+def amortization_schedule(loan_amount, annual_interest_rate, tenure_months,
+                          monthly_installment=None, start_date=None, from_month=1, to_month=None):
+    """
+    Lazily yield the month-by-month repayment breakdown of a loan.
+    Each row has month, due_date, payment, interest, principal and balance.
+    Interest is charged on the outstanding balance and rounded to the cent;
+    the last payment clears whatever balance is left. Only rows between
+    from_month and to_month (inclusive) are yielded.
+    """
+    balance = Decimal(loan_amount)
+    r = Decimal(annual_interest_rate) / Decimal(12) / Decimal(100)
+    if monthly_installment is None:
+        monthly_installment = calculate_monthly_installment(loan_amount, annual_interest_rate, tenure_months)
+    installment = Decimal(monthly_installment)
+    last_month = min(tenure_months, to_month or tenure_months)
+    
+    for month in range(1, last_month + 1):
+        interest = round(balance * r, 2)
+        if month == tenure_months:
+            principal = balance
+        else:
+            principal = min(installment - interest, balance)
+        balance -= principal
+        
+        if month >= from_month:
+            yield {
+                'month': month,
+                'due_date': start_date + relativedelta(months=month) if start_date else None,
+                'payment': principal + interest,
+                'interest': interest,
+                'principal': principal,
+                'balance': balance,
+            }
+        
+        if balance <= 0:
+            return
+
+
 def round_to_nearest_lakh(amount):
     """Round amount to nearest lakh (100,000)"""
     return round(Decimal(amount) / Decimal(100000)) * Decimal(100000)
@@ -1,10 +1,14 @@
 from decimal import Decimal
-from .credit_score import CreditScoreCalculator
+from datetime import datetime
+from .credit_score import CreditScoreCalculator, loan_stats_aggregates, normalize_loan_stats
 from .loan_calculator import calculate_monthly_installment
-from loans.models import Loan
+from .score_cache import get_cached_credit_score
+from .scoring_rules import get_scoring_rules
+from loans.instrumentation import timed
+from loans.models import Customer, CustomerCreditProfile
 
 class LoanEligibilityChecker:
-    def __init__(self, customer, loan_amount, interest_rate, tenure):
+    def __init__(self, customer, loan_amount, interest_rate, tenure, stats=None, rules=None):
         self.customer = customer
         self.loan_amount = Decimal(loan_amount)
         self.interest_rate = Decimal(interest_rate)
@@ -13,14 +17,25 @@ class LoanEligibilityChecker:
         self.corrected_interest_rate = self.interest_rate
         self.approval = False
         self.monthly_installment = Decimal(0)
-        
+        self.stats = stats
+        self.current_emi_sum = Decimal(0)
+        self.rules = rules or get_scoring_rules()
+    
+    @timed('eligibility')
     def check_eligibility(self):
         """Main method to check loan eligibility"""
         # Calculate credit score
-        calculator = CreditScoreCalculator(self.customer)
-        self.credit_score = calculator.calculate()
+        if self.stats is not None:
+            # Loan totals were preloaded (batch path), score them directly
+            calculator = CreditScoreCalculator(self.customer, stats=self.stats, rules=self.rules)
+            self.credit_score = calculator.calculate()
+            self.current_emi_sum = self.stats['active_emi_sum']
+        else:
+            cached = get_cached_credit_score(self.customer, rules=self.rules)
+            self.credit_score = cached['credit_score']
+            self.current_emi_sum = cached['active_emi_sum']
         
-        # Check if EMIs exceed 50% of salary
+        # Check if EMIs exceed the allowed share of salary (50% by default)
         if self._check_emi_salary_ratio():
             self.approval = False
             self.corrected_interest_rate = self.interest_rate
@@ -29,26 +44,14 @@ class LoanEligibilityChecker:
             )
             return self._get_result()
         
-        # Determine approval and corrected interest rate based on credit score
-        if self.credit_score > 50:
-            self.approval = True
-            self.corrected_interest_rate = self.interest_rate
-        elif 30 < self.credit_score <= 50:
-            if self.interest_rate >= 12:
-                self.approval = True
-                self.corrected_interest_rate = self.interest_rate
-            else:
-                self.approval = True
-                self.corrected_interest_rate = Decimal('12.0')
-        elif 10 < self.credit_score <= 30:
-            if self.interest_rate >= 16:
-                self.approval = True
-                self.corrected_interest_rate = self.interest_rate
-            else:
-                self.approval = True
-                self.corrected_interest_rate = Decimal('16.0')
-        else:  # credit_score <= 10
-            self.approval = False
+        # Determine approval and corrected interest rate from the credit
+        # score's rate band. By default a score above 50 keeps the rate
+        # applied for, 30-50 pays at least 12%, 10-30 at least 16%, and
+        # 10 or below is rejected
+        self.approval, minimum_rate = self.rules.rate_band(self.credit_score)
+        if minimum_rate is not None and self.interest_rate < minimum_rate:
+            self.corrected_interest_rate = minimum_rate
+        else:
             self.corrected_interest_rate = self.interest_rate
         
         # Calculate monthly installment with corrected rate
@@ -59,19 +62,14 @@ class LoanEligibilityChecker:
         return self._get_result()
     
     def _check_emi_salary_ratio(self):
-        """Check if sum of all current EMIs > 50% of monthly salary"""
-        current_emis = Loan.objects.filter(
-            customer=self.customer,
-            is_active=True
-        )
-        
-        total_current_emi = sum(loan.monthly_repayment for loan in current_emis)
+        """Check if sum of all current EMIs > the allowed share of monthly salary"""
+        total_current_emi = self.current_emi_sum
         new_emi = calculate_monthly_installment(
             self.loan_amount, self.interest_rate, self.tenure
         )
         
         total_emi = total_current_emi + new_emi
-        max_allowed_emi = self.customer.monthly_salary * Decimal('0.5')
+        max_allowed_emi = self.customer.monthly_salary * self.rules.max_emi_to_salary
         
         return total_emi > max_allowed_emi
     
@@ -85,3 +83,59 @@ class LoanEligibilityChecker:
             'tenure': self.tenure,
             'monthly_installment': float(self.monthly_installment)
         }
+
+
+def check_eligibility_batch(applications):
+    """
+    Check eligibility for many applications with a fixed number of queries.
+    Each application is a dict with customer_id, loan_amount, interest_rate
+    and tenure. Returns results in input order, None where the customer
+    does not exist.
+    """
+    current_year = datetime.now().year
+    rules = get_scoring_rules()
+    customer_ids = {application['customer_id'] for application in applications}
+    
+    customers = Customer.objects.filter(
+        customer_id__in=customer_ids
+    ).select_related('credit_profile')
+    
+    stats_by_customer = {}
+    missing_profiles = {}
+    for customer in customers:
+        try:
+            stats = customer.credit_profile.as_stats(current_year)
+        except CustomerCreditProfile.DoesNotExist:
+            missing_profiles[customer.customer_id] = customer
+            continue
+        stats_by_customer[customer.customer_id] = (customer, stats)
+    
+    # Customers without a profile fall back to one aggregate query for all of them
+    if missing_profiles:
+        aggregates = loan_stats_aggregates(current_year, prefix='loans__')
+        rows = Customer.objects.filter(
+            customer_id__in=missing_profiles
+        ).values('customer_id').annotate(**aggregates)
+        for row in rows:
+            customer = missing_profiles[row['customer_id']]
+            stats_by_customer[customer.customer_id] = (customer, normalize_loan_stats(row))
+    
+    results = []
+    for application in applications:
+        entry = stats_by_customer.get(application['customer_id'])
+        if entry is None:
+            results.append(None)
+            continue
+        
+        customer, stats = entry
+        checker = LoanEligibilityChecker(
+            customer=customer,
+            loan_amount=application['loan_amount'],
+            interest_rate=application['interest_rate'],
+            tenure=application['tenure'],
+            stats=stats,
+            rules=rules
+        )
+        results.append(checker.check_eligibility())
+    
+    return results
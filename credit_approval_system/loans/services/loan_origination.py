@@ -0,0 +1,57 @@
+from datetime import date
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import F
+from loans.models import Customer, Loan
+from .credit_score import CreditScoreCalculator
+from .loan_eligibility import LoanEligibilityChecker
+
+
+def originate_loan(customer_id, loan_amount, interest_rate, tenure):
+    """
+    Check eligibility and book the loan in one transaction.
+    The customer row is locked first, so concurrent requests for the same
+    customer are serialized: each one is scored against the loans the
+    previous ones committed, and the debt update cannot be lost.
+    Returns (customer, eligibility_result, loan); loan is None when the
+    request is not approved. Raises Customer.DoesNotExist.
+    """
+    loan_amount = Decimal(loan_amount)
+    
+    with transaction.atomic():
+        customer = Customer.objects.select_for_update().get(customer_id=customer_id)
+        
+        # Read the loan totals under the lock instead of from the score cache,
+        # which another request may have filled before the last commit
+        stats = CreditScoreCalculator(customer).get_stats()
+        eligibility_result = LoanEligibilityChecker(
+            customer=customer,
+            loan_amount=loan_amount,
+            interest_rate=interest_rate,
+            tenure=tenure,
+            stats=stats
+        ).check_eligibility()
+        
+        if not eligibility_result['approval']:
+            return customer, eligibility_result, None
+        
+        start_date = date.today()
+        loan = Loan.objects.create(
+            customer=customer,
+            loan_amount=loan_amount,
+            tenure=tenure,
+            interest_rate=eligibility_result['corrected_interest_rate'],
+            monthly_repayment=eligibility_result['monthly_installment'],
+            emis_paid_on_time=0,
+            start_date=start_date,
+            end_date=start_date + relativedelta(months=tenure),
+            is_active=True
+        )
+        
+        # UPDATE ... SET current_debt = current_debt + %s, touching only these columns
+        customer.current_debt = F('current_debt') + loan_amount
+        customer.save(update_fields=['current_debt', 'updated_at'])
+        customer.refresh_from_db(fields=['current_debt'])
+    
+    return customer, eligibility_result, loan
@@ -0,0 +1,59 @@
+from django.db.models import Count, F, FilteredRelation, Max, Q, Value
+from django.db.models.functions import Greatest
+from loans.models import Customer, Loan
+
+LOAN_DETAIL_FIELDS = [
+    'loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'tenure',
+    'customer__customer_id', 'customer__first_name', 'customer__last_name',
+    'customer__phone_number', 'customer__age',
+    # ETag validators
+    'updated_at', 'customer__updated_at',
+]
+
+
+def loan_detail_queryset():
+    """Loans joined to their customer, limited to the columns LoanDetailSerializer reads"""
+    return Loan.objects.select_related('customer').only(*LOAN_DETAIL_FIELDS)
+
+
+def loan_detail_rows():
+    """The same columns as values() dicts, for fast_serializers.loan_detail"""
+    return Loan.objects.values(*LOAN_DETAIL_FIELDS)
+
+
+def customer_active_loans_queryset(customer_id, after=None):
+    """
+    One row per active loan of the customer, as dicts for CustomerLoanSerializer,
+    ordered by loan_id and with repayments_left computed in SQL. The query
+    starts from the customer and LEFT JOINs the active loans, so a known
+    customer without (further) active loans yields a single row with
+    loan_id None and an unknown customer yields no rows; the caller needs
+    no separate existence check. after restricts the join to
+    loan_id > after, for keyset pagination.
+    """
+    condition = Q(loans__is_active=True)
+    if after is not None:
+        condition &= Q(loans__loan_id__gt=after)
+    
+    return Customer.objects.filter(customer_id=customer_id).annotate(
+        active_loan=FilteredRelation('loans', condition=condition)
+    ).values(
+        loan_id=F('active_loan__loan_id'),
+        loan_amount=F('active_loan__loan_amount'),
+        interest_rate=F('active_loan__interest_rate'),
+        monthly_repayment=F('active_loan__monthly_repayment'),
+        repayments_left=Greatest(F('active_loan__tenure') - F('active_loan__emis_paid_on_time'), Value(0)),
+    ).order_by('active_loan__loan_id')
+
+
+def customer_loans_validator(customer_id):
+    """
+    (active loan count, latest updated_at among active loans) for the
+    customer, or None when the customer does not exist. Any save, delete
+    or deactivation of one of their active loans changes this pair.
+    """
+    active = Q(loans__is_active=True)
+    return Customer.objects.filter(customer_id=customer_id).annotate(
+        active_loans=Count('loans', filter=active),
+        last_change=Max('loans__updated_at', filter=active),
+    ).values_list('active_loans', 'last_change').first()
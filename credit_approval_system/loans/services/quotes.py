@@ -0,0 +1,66 @@
+"""
+What-if quotes: loan eligibility for a whole grid of loan amounts, interest
+rates and tenures for one customer. The credit score and current EMI load
+are looked up once, and the EMIs of every cell come from one vectorized
+calculate_monthly_installments pass.
+"""
+import math
+import numpy as np
+from loans.instrumentation import timed
+from .loan_calculator import calculate_monthly_installments
+from .score_cache import get_cached_credit_score
+from .scoring_rules import get_scoring_rules
+
+
+def _axis(values, axis):
+    """values as an object array along one of the three grid dimensions"""
+    shape = [1, 1, 1]
+    shape[axis] = len(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array.reshape(shape)
+
+
+@timed('quote_matrix')
+def quote_matrix(customer, loan_amounts, interest_rates, tenures, rules=None):
+    """
+    Eligibility for every (loan amount, interest rate, tenure) combination,
+    the same as LoanEligibilityChecker.check_eligibility for each cell.
+    loan_amounts and interest_rates are Decimals. Returns arrays shaped
+    (amounts, rates, tenures): approval (bool), corrected_interest_rate
+    (Decimal) and monthly_installment (float, rounded to the cent).
+    """
+    rules = rules or get_scoring_rules()
+    cached = get_cached_credit_score(customer, rules=rules)
+    
+    amounts = _axis(loan_amounts, 0)
+    rates = _axis(interest_rates, 1)
+    months = _axis(tenures, 2)
+    
+    # EMI-to-salary check on the requested terms, in integer cents so the
+    # comparison is exact: total > limit  <=>  total > floor(limit)
+    requested_emi = calculate_monthly_installments(amounts, rates, months)
+    limit_cents = math.floor(customer.monthly_salary * rules.max_emi_to_salary * 100)
+    current_cents = int(cached['active_emi_sum'] * 100)
+    over_limit = current_cents + np.rint(requested_emi * 100).astype(np.int64) > limit_cents
+    
+    # The rate band depends on the score alone, so it is the same for every cell
+    band_approval, minimum_rate = rules.rate_band(cached['credit_score'])
+    corrected_rates = _axis([
+        minimum_rate if minimum_rate is not None and rate < minimum_rate else rate
+        for rate in interest_rates
+    ], 1)
+    if any(corrected is not rate for corrected, rate in zip(corrected_rates.flat, interest_rates)):
+        corrected_emi = calculate_monthly_installments(amounts, corrected_rates, months)
+    else:
+        corrected_emi = requested_emi
+    
+    shape = requested_emi.shape
+    return {
+        'customer_id': customer.customer_id,
+        'approval': np.where(over_limit, False, band_approval),
+        'corrected_interest_rate': np.where(
+            over_limit, np.broadcast_to(rates, shape), np.broadcast_to(corrected_rates, shape)
+        ),
+        'monthly_installment': np.where(over_limit, requested_emi, corrected_emi),
+    }
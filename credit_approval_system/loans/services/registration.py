@@ -0,0 +1,30 @@
+from django.db import IntegrityError, transaction
+from loans.models import Customer, CustomerCreditProfile
+
+
+def create_customers(customers):
+    """
+    Insert unsaved customers with their empty credit profiles and return
+    the ones created. Customers whose phone number is already registered
+    are left out (and keep customer_id None). Without conflicts this is
+    one multi-row INSERT per table; on a conflict the taken numbers are
+    looked up once and the rest inserted again, so the unique constraint
+    alone decides races between concurrent registrations.
+    """
+    while customers:
+        try:
+            with transaction.atomic():
+                created = Customer.objects.bulk_create(customers)
+                # bulk_create sends no post_save, which creates the profile for single inserts
+                CustomerCreditProfile.objects.bulk_create(
+                    [CustomerCreditProfile(customer_id=customer.customer_id) for customer in created]
+                )
+            return created
+        except IntegrityError:
+            taken = set(Customer.objects.filter(
+                phone_number__in=[customer.phone_number for customer in customers]
+            ).values_list('phone_number', flat=True))
+            if not taken:
+                raise
+            customers = [customer for customer in customers if customer.phone_number not in taken]
+    return []
@@ -0,0 +1,112 @@
+"""
+Portfolio rescoring: credit scores for every customer, computed with one
+GROUP BY query per range of customer ids and upserted into
+customer_score_snapshots.
+"""
+import multiprocessing
+import time
+from datetime import datetime
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from loans.models import Customer, CustomerScoreSnapshot
+from .credit_score import loan_stats_aggregates, normalize_loan_stats
+from .scoring_rules import get_scoring_rules
+
+DEFAULT_RESCORE_CHUNK_SIZE = 2000
+
+
+def customer_id_ranges(chunk_size=DEFAULT_RESCORE_CHUNK_SIZE):
+    """Half-open (low, high) customer id ranges covering the whole table"""
+    bounds = Customer.objects.aggregate(low=Min('customer_id'), high=Max('customer_id'))
+    if bounds['low'] is None:
+        return []
+    return [
+        (low, min(low + chunk_size, bounds['high'] + 1))
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size)
+    ]
+
+
+def score_customer_range(low, high, scored_at=None, current_year=None):
+    """
+    Score customers with low <= customer_id < high and upsert their snapshots.
+    Costs one aggregate query over customers LEFT JOIN loans and one upsert,
+    however many customers the range holds. Returns the number scored.
+    """
+    scored_at = scored_at or timezone.now()
+    current_year = current_year or datetime.now().year
+    
+    rows = Customer.objects.filter(customer_id__gte=low, customer_id__lt=high).values(
+        'customer_id', 'approved_limit'
+    ).annotate(**loan_stats_aggregates(current_year, prefix='loans__')).order_by()
+    
+    rows = list(rows)
+    stats = [normalize_loan_stats(row) for row in rows]
+    scores = get_scoring_rules().score_batch(stats, [row['approved_limit'] for row in rows])
+    
+    snapshots = [
+        CustomerScoreSnapshot(
+            customer_id=row['customer_id'],
+            credit_score=int(score),
+            active_emi_sum=row_stats['active_emi_sum'],
+            scored_at=scored_at,
+        )
+        for row, row_stats, score in zip(rows, stats, scores)
+    ]
+    
+    with transaction.atomic():
+        CustomerScoreSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['customer'],
+            update_fields=['credit_score', 'active_emi_sum', 'scored_at'],
+        )
+    return len(snapshots)
+
+
+def _score_range_in_worker(args):
+    """Runs in a child process; args is (low, high, scored_at, current_year)"""
+    try:
+        return score_customer_range(*args)
+    finally:
+        connections.close_all()
+
+
+def rescore_portfolio(chunk_size=DEFAULT_RESCORE_CHUNK_SIZE, workers=1, progress=None):
+    """
+    Rescore every customer, chunk by chunk. With workers > 1 (PostgreSQL
+    only) the chunks are spread over a pool of forked processes.
+    progress receives one line per finished chunk with the running
+    throughput. Returns the number of customers scored.
+    """
+    progress = progress or (lambda message: None)
+    scored_at = timezone.now()
+    current_year = datetime.now().year
+    ranges = customer_id_ranges(chunk_size)
+    started = time.perf_counter()
+    scored = 0
+    
+    def report(done, count):
+        elapsed = time.perf_counter() - started
+        rate = scored / elapsed if elapsed else 0.0
+        progress(f'chunk {done}/{len(ranges)}: {count} customers, {scored} total ({rate:,.0f} customers/sec)')
+    
+    if workers <= 1 or connection.vendor != 'postgresql':
+        for done, (low, high) in enumerate(ranges, start=1):
+            count = score_customer_range(low, high, scored_at, current_year)
+            scored += count
+            report(done, count)
+        return scored
+    
+    # Children must not share the parent's database connection
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(workers) as pool:
+        results = pool.imap_unordered(
+            _score_range_in_worker,
+            [(low, high, scored_at, current_year) for low, high in ranges],
+        )
+        for done, count in enumerate(results, start=1):
+            scored += count
+            report(done, count)
+    return scored
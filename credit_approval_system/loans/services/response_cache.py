@@ -0,0 +1,49 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+
+# Bump when the response shape of the cached endpoints changes
+RESPONSE_CACHE_VERSION = 1
+
+
+def loan_detail_key(loan_id):
+    return f'loan_detail:{loan_id}'
+
+
+def customer_loans_key(customer_id):
+    return f'customer_loans:{customer_id}'
+
+
+def make_etag(*parts):
+    """Strong ETag over the values that decide the response body"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_cached_body(key, etag):
+    """
+    Serialized body stored under key, if it was built for this ETag.
+    An entry for an older ETag is never returned, so the cache cannot
+    serve data older than the validator read from the database.
+    """
+    entry = cache.get(key, version=RESPONSE_CACHE_VERSION)
+    if entry is not None and entry['etag'] == etag:
+        return entry['data']
+    return None
+
+
+def cache_body(key, etag, data):
+    cache.set(
+        key,
+        {'etag': etag, 'data': data},
+        timeout=settings.LOAN_RESPONSE_CACHE_TIMEOUT,
+        version=RESPONSE_CACHE_VERSION,
+    )
+
+
+def invalidate_loan_responses(loan_id, customer_id):
+    """Drop the cached detail of a loan and its customer's loan list"""
+    cache.delete_many(
+        [loan_detail_key(loan_id), customer_loans_key(customer_id)],
+        version=RESPONSE_CACHE_VERSION,
+    )
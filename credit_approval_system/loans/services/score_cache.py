@@ -0,0 +1,136 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from loans.db_router import reading_from_replica
+from loans.instrumentation import SCORE_CACHE, counter_values, increment, reset_metrics
+from .credit_score import CreditScoreCalculator
+from .scoring_rules import get_scoring_rules
+
+# Bump when the scoring code changes so old entries are never read; entries
+# also record the ruleset they were scored with (see scoring_rules)
+SCORE_CACHE_VERSION = 1
+
+
+def score_cache_key(customer_id, year):
+    """Per-customer key; the year is part of it because current-year activity is scored"""
+    return f'credit_score:{customer_id}:{year}'
+
+
+def score_generation_key(customer_id):
+    """
+    Key of the customer's generation: the time of the last invalidation.
+    Entries record the generation they were computed under and are only
+    served while it is current.
+    """
+    return f'credit_score_generation:{customer_id}'
+
+
+def seconds_until_year_end(now=None):
+    """Seconds left until 1 January of next year"""
+    now = now or datetime.now()
+    next_year = datetime(now.year + 1, 1, 1, tzinfo=now.tzinfo)
+    return max(1, int((next_year - now).total_seconds()))
+
+
+def _count(name, amount=1):
+    # Kept on /metrics as loans_score_cache_total{event="hits"} and so on
+    increment(SCORE_CACHE, (name,), amount)
+
+
+def get_cached_credit_score(customer, rules=None):
+    """
+    Return the customer's credit score and active EMI sum, computing and
+    caching them on a miss. Entries expire at the year boundary at the latest;
+    an entry scored under other rules than the active ones, or before the
+    customer's last invalidation, counts as a miss.
+    """
+    rules = rules or get_scoring_rules()
+    now = datetime.now()
+    key = score_cache_key(customer.pk, now.year)
+    generation_key = score_generation_key(customer.pk)
+    
+    found = cache.get_many([key, generation_key], version=SCORE_CACHE_VERSION)
+    entry, generation = found.get(key), found.get(generation_key)
+    if entry is not None and entry.get('rules') == rules.tag and entry.get('generation') == generation:
+        _count('hits')
+        return {
+            'credit_score': entry['credit_score'],
+            'active_emi_sum': Decimal(entry['active_emi_sum']),
+        }
+    
+    _count('misses')
+    calculator = CreditScoreCalculator(customer, rules=rules)
+    credit_score = calculator.calculate()
+    active_emi_sum = calculator.get_stats()['active_emi_sum']
+    
+    if _may_store(generation_key, generation):
+        cache.set(
+            key,
+            {
+                'credit_score': credit_score,
+                'active_emi_sum': str(active_emi_sum),
+                'rules': rules.tag,
+                'generation': generation,
+            },
+            timeout=min(settings.CREDIT_SCORE_CACHE_TIMEOUT, seconds_until_year_end(now)),
+            version=SCORE_CACHE_VERSION,
+        )
+    return {'credit_score': credit_score, 'active_emi_sum': active_emi_sum}
+
+
+def _may_store(generation_key, generation):
+    """
+    Whether a score computed under `generation` may be cached: not when an
+    invalidation ran while it was computed, nor when it was read from a
+    replica that may not have replayed the last invalidated write yet
+    """
+    if cache.get(generation_key, version=SCORE_CACHE_VERSION) != generation:
+        return False
+    if generation is not None and reading_from_replica():
+        return time.time() - generation >= settings.REPLICA_READ_YOUR_WRITES_SECONDS
+    return True
+
+
+def invalidate_credit_score(customer_id):
+    """
+    Start a new generation for the customer now and again after the
+    surrounding transaction commits, so a concurrent reader cannot cache
+    pre-commit data.
+    """
+    key = score_generation_key(customer_id)
+    
+    def bump():
+        cache.set(key, time.time(), timeout=settings.CREDIT_SCORE_CACHE_TIMEOUT, version=SCORE_CACHE_VERSION)
+    
+    bump()
+    transaction.on_commit(bump)
+    _count('invalidations')
+
+
+def invalidate_credit_scores(customer_ids):
+    """Bulk variant for imports and other writes that bypass model signals"""
+    keys = [score_generation_key(customer_id) for customer_id in customer_ids]
+    generation = time.time()
+    for start in range(0, len(keys), 1000):
+        cache.set_many(
+            dict.fromkeys(keys[start:start + 1000], generation),
+            timeout=settings.CREDIT_SCORE_CACHE_TIMEOUT,
+            version=SCORE_CACHE_VERSION,
+        )
+    _count('invalidations', len(keys))
+
+
+def get_score_cache_stats():
+    """Hit/miss counters of this process, as exported on /metrics"""
+    counts = counter_values(SCORE_CACHE)
+    stats = {name: counts.get((name,), 0) for name in ('hits', 'misses', 'invalidations')}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_score_cache_stats():
+    reset_metrics([SCORE_CACHE])
@@ -0,0 +1,274 @@
+"""
+Credit scoring rules as data. A ruleset is a JSON document holding the
+credit score thresholds, the interest rate bands and the EMI-to-salary
+cap. DEFAULT_RULES holds the built-in numbers. Rulesets are compiled into
+sorted bound lists, so every lookup is one bisect.
+
+Point SCORING_RULES_FILE at a ruleset to override the defaults. Each
+worker checks the file's mtime at most every SCORING_RULES_RELOAD_INTERVAL
+seconds and swaps in a changed file without a restart. A file that fails
+to load is logged and the previous rules stay active.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES = {
+    'version': 1,
+    # Share of EMIs paid on time scaled to `points`; customers with no EMIs
+    # due yet get `no_history`
+    'payment_history': {'points': 40, 'no_history': 20},
+    # points[i] when the count is at most at_most[i]; the last entry is for
+    # counts above every bound
+    'number_of_loans': {'at_most': [0, 3, 6], 'points': [10, 20, 15, 10]},
+    'current_year_activity': {'at_most': [0, 2, 4], 'points': [5, 20, 15, 10]},
+    # points[i] when total approved / approved limit is below below[i];
+    # customers without a limit get `no_limit`
+    'loan_volume': {'below': ['0.5', '1.0', '2.0'], 'points': [20, 15, 10, 5], 'no_limit': 10},
+    # Scores above `above` are approved at no less than min_interest_rate
+    # (null keeps the requested rate); scores at or below every band are rejected
+    'rate_bands': [
+        {'above': 50, 'min_interest_rate': None},
+        {'above': 30, 'min_interest_rate': '12.0'},
+        {'above': 10, 'min_interest_rate': '16.0'},
+    ],
+    # Reject when existing plus new EMIs exceed this share of the monthly salary
+    'max_emi_to_salary': '0.5',
+}
+
+
+def _decimal(value, name):
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'{name}: {value!r} is not a number') from None
+
+
+def _lookup_table(section, name, bounds_key, convert):
+    """Sorted bounds and their points, checked to describe every value exactly once"""
+    bounds = [convert(bound, f'{name}.{bounds_key}') for bound in section[bounds_key]]
+    points = [int(point) for point in section['points']]
+    if any(low >= high for low, high in zip(bounds, bounds[1:])):
+        raise ValueError(f'{name}.{bounds_key} must be strictly increasing')
+    if len(points) != len(bounds) + 1:
+        raise ValueError(f'{name}.points needs one entry per bound plus one above them ({len(bounds) + 1})')
+    return bounds, points
+
+
+class ScoringRules:
+    """
+    A compiled ruleset. Immutable once built, so one instance is shared by
+    every thread. Raises ValueError when the ruleset is incomplete or its
+    tables are inconsistent.
+    """
+    
+    def __init__(self, rules):
+        try:
+            self.version = int(rules['version'])
+            
+            history = rules['payment_history']
+            self.payment_points = int(history['points'])
+            self.no_history_points = int(history['no_history'])
+            
+            self.loan_count_bounds, self.loan_count_points = _lookup_table(
+                rules['number_of_loans'], 'number_of_loans', 'at_most', lambda value, name: int(value)
+            )
+            self.activity_bounds, self.activity_points = _lookup_table(
+                rules['current_year_activity'], 'current_year_activity', 'at_most', lambda value, name: int(value)
+            )
+            self.volume_bounds, self.volume_points = _lookup_table(
+                rules['loan_volume'], 'loan_volume', 'below', _decimal
+            )
+            self.no_limit_points = int(rules['loan_volume']['no_limit'])
+            
+            bands = sorted(rules['rate_bands'], key=lambda band: band['above'])
+            self.band_floors = [int(band['above']) for band in bands]
+            # Outcome per bisect position: below the lowest floor is a rejection
+            self.band_outcomes = [(False, None)] + [
+                (True, None if band['min_interest_rate'] is None
+                 else _decimal(band['min_interest_rate'], 'rate_bands.min_interest_rate'))
+                for band in bands
+            ]
+            if len(set(self.band_floors)) != len(self.band_floors):
+                raise ValueError('rate_bands must not repeat an `above` score')
+            
+            self.max_emi_to_salary = _decimal(rules['max_emi_to_salary'], 'max_emi_to_salary')
+        except KeyError as exc:
+            raise ValueError(f'Scoring rules are missing {exc}') from None
+        except TypeError as exc:
+            raise ValueError(f'Scoring rules are malformed: {exc}') from None
+        
+        self.rules = rules
+        # Identifies the exact content, so cached scores are never reused
+        # across different rules that carry the same version number
+        digest = hashlib.sha1(json.dumps(rules, sort_keys=True, default=str).encode()).hexdigest()
+        self.tag = f'{self.version}-{digest[:8]}'
+    
+    def __repr__(self):
+        return f'<ScoringRules {self.tag}>'
+    
+    def payment_history_points(self, stats):
+        total_emis = stats['total_tenure']
+        if stats['loan_count'] == 0 or total_emis == 0:
+            return self.no_history_points
+        return round(stats['emis_paid_on_time'] / total_emis * self.payment_points)
+    
+    def number_of_loans_points(self, loan_count):
+        return self.loan_count_points[bisect_left(self.loan_count_bounds, loan_count)]
+    
+    def current_year_activity_points(self, count):
+        return self.activity_points[bisect_left(self.activity_bounds, count)]
+    
+    def loan_volume_points(self, total_loan_amount, approved_limit):
+        if approved_limit == 0:
+            return self.no_limit_points
+        ratio = total_loan_amount / approved_limit
+        return self.volume_points[bisect_right(self.volume_bounds, ratio)]
+    
+    def rate_band(self, credit_score):
+        """(approved, minimum interest rate or None) for a credit score"""
+        return self.band_outcomes[bisect_left(self.band_floors, credit_score)]
+    
+    def score(self, stats, approved_limit):
+        """Credit score out of 100 from a customer's loan totals"""
+        if stats['active_loan_sum'] > approved_limit:
+            return 0
+        score = (
+            self.payment_history_points(stats)
+            + self.number_of_loans_points(stats['loan_count'])
+            + self.current_year_activity_points(stats['current_year_count'])
+            + self.loan_volume_points(stats['total_loan_amount'], approved_limit)
+        )
+        return min(100, max(0, score))
+    
+    def score_batch(self, stats_rows, approved_limits):
+        """
+        Vectorized score() for many customers: stats_rows are loan totals
+        (normalize_loan_stats) and approved_limits the matching limits.
+        Returns an int64 array. Amounts are compared in integer cents, so
+        the volume bands match the Decimal path exactly.
+        """
+        def column(name):
+            return np.fromiter((row[name] for row in stats_rows), dtype=np.int64, count=len(stats_rows))
+        
+        def cents(values):
+            # Exact for two-decimal amounts: float64 holds them to well past 10^13
+            amounts = np.fromiter(map(float, values), dtype=np.float64, count=len(stats_rows))
+            return np.rint(amounts * 100).astype(np.int64)
+        
+        loan_count = column('loan_count')
+        total_tenure = column('total_tenure')
+        limits = cents(approved_limits)
+        total_amount = cents(row['total_loan_amount'] for row in stats_rows)
+        active_amount = cents(row['active_loan_sum'] for row in stats_rows)
+        
+        no_history = (loan_count == 0) | (total_tenure == 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = column('emis_paid_on_time') / np.where(no_history, 1, total_tenure)
+        # np.rint rounds half to even, like round()
+        history = np.where(no_history, self.no_history_points, np.rint(ratio * self.payment_points)).astype(np.int64)
+        
+        counts = np.asarray(self.loan_count_points)[np.searchsorted(self.loan_count_bounds, loan_count, side='left')]
+        activity = np.asarray(self.activity_points)[
+            np.searchsorted(self.activity_bounds, column('current_year_count'), side='left')
+        ]
+        
+        # total / limit >= numerator / denominator, without dividing
+        volume_index = np.zeros(len(stats_rows), dtype=np.int64)
+        for bound in self.volume_bounds:
+            numerator, denominator = bound.as_integer_ratio()
+            volume_index += total_amount * denominator >= limits * numerator
+        volume = np.where(limits == 0, self.no_limit_points, np.asarray(self.volume_points)[volume_index])
+        
+        scores = np.clip(history + counts + activity + volume, 0, 100)
+        return np.where(active_amount > limits, 0, scores)
+
+
+def load_rules_file(path):
+    """Read and compile a ruleset from a JSON file"""
+    with open(path) as handle:
+        try:
+            rules = json.load(handle)
+        except ValueError as exc:
+            raise ValueError(f'{path} is not valid JSON: {exc}') from None
+    return ScoringRules(rules)
+
+
+DEFAULT_SCORING_RULES = ScoringRules(DEFAULT_RULES)
+
+_lock = threading.Lock()
+_active = DEFAULT_SCORING_RULES
+_source = None  # (path, mtime_ns) the active rules were read from
+_next_check = 0.0  # time.monotonic() after which the file is looked at again
+
+
+def _refresh(now):
+    global _active, _source, _next_check
+    _next_check = now + settings.SCORING_RULES_RELOAD_INTERVAL
+    path = settings.SCORING_RULES_FILE
+    if not path:
+        _active, _source = DEFAULT_SCORING_RULES, None
+        return
+    
+    try:
+        source = (path, os.stat(path).st_mtime_ns)
+    except OSError as exc:
+        source = (path, None)
+        if source != _source:
+            logger.error('Cannot read scoring rules %s, keeping %r: %s', path, _active, exc)
+        _source = source
+        return
+    if source == _source:
+        return
+    
+    # Remember the attempt even if it fails, so a broken file is reported once
+    _source = source
+    try:
+        rules = load_rules_file(path)
+    except (OSError, ValueError) as exc:
+        logger.error('Cannot load scoring rules from %s, keeping %r: %s', path, _active, exc)
+        return
+    
+    if rules.tag != _active.tag:
+        logger.info('Scoring rules %r loaded from %s (was %r)', rules, path, _active)
+    _active = rules
+
+
+def get_scoring_rules():
+    """
+    The active ruleset. Within SCORING_RULES_RELOAD_INTERVAL of the last
+    check this is one clock read; after it the rules file is stat()ed and
+    compiled again when it changed.
+    """
+    now = time.monotonic()
+    if now < _next_check:
+        return _active
+    with _lock:
+        if now >= _next_check:
+            _refresh(now)
+        return _active
+
+
+def reload_scoring_rules():
+    """Check the rules file now instead of waiting for the reload interval"""
+    global _next_check
+    with _lock:
+        _next_check = 0.0
+    return get_scoring_rules()
+
+
+@receiver(setting_changed)
+def _rules_setting_changed(setting, **kwargs):
+    if setting in ('SCORING_RULES_FILE', 'SCORING_RULES_RELOAD_INTERVAL'):
+        reload_scoring_rules()
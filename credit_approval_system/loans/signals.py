@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Customer, Loan, CustomerCreditProfile
+from .services.credit_profile import record_loan, refresh_profile
+from .services.response_cache import invalidate_loan_responses
+from .services.score_cache import invalidate_credit_score
+
+
+@receiver(post_save, sender=Customer)
+def create_credit_profile(sender, instance, created, raw=False, **kwargs):
+    """Every new customer starts with an empty credit profile"""
+    if created and not raw:
+        # A new customer cannot have a profile yet, so no lookup first;
+        # rebuild_profiles and verify_profiles repair missing rows
+        CustomerCreditProfile.objects.create(customer_id=instance.customer_id)
+
+
+@receiver(post_save, sender=Loan)
+def update_credit_profile_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep the customer's credit profile in step with their loans"""
+    if raw:
+        return
+    if created:
+        record_loan(instance)
+    else:
+        refresh_profile(instance.customer_id)
+
+
+@receiver(post_delete, sender=Loan)
+def update_credit_profile_on_delete(sender, instance, origin=None, **kwargs):
+    # When the customer itself is being deleted its profile goes too;
+    # rebuilding it here would insert a row for a customer that is going away
+    if isinstance(origin, Customer) or getattr(origin, 'model', None) is Customer:
+        return
+    refresh_profile(instance.customer_id)
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def invalidate_score_on_loan_change(sender, instance, **kwargs):
+    invalidate_credit_score(instance.customer_id)
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def invalidate_cached_loan_responses(sender, instance, **kwargs):
+    invalidate_loan_responses(instance.loan_id, instance.customer_id)
+
+
+@receiver(post_save, sender=Customer)
+def invalidate_score_on_limit_change(sender, instance, created, update_fields=None, **kwargs):
+    """The score depends on approved_limit; other customer fields are read live"""
+    if created or update_fields is None or 'approved_limit' in update_fields:
+        invalidate_credit_score(instance.customer_id)
@@ -0,0 +1,94 @@
+from decimal import Decimal
+from celery import group, shared_task
+from celery.utils.log import get_task_logger
+from django.db import OperationalError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Customer, LoanRequest
+from .services import originate_loan
+from .services.rescoring import DEFAULT_RESCORE_CHUNK_SIZE, customer_id_ranges, score_customer_range
+
+logger = get_task_logger(__name__)
+
+APPROVED_MESSAGE = 'Loan approved successfully'
+REJECTED_MESSAGE = 'Loan not approved based on credit score or EMI-to-salary ratio'
+NOT_QUEUED_MESSAGE = 'Loan request could not be queued; please submit it again'
+
+
+@shared_task(autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def process_loan_request(request_id):
+    """
+    Run eligibility and book the loan for a queued LoanRequest.
+    The request row is locked and its outcome saved in the same transaction
+    as the loan, so a redelivered task finds it decided and does nothing.
+    """
+    with transaction.atomic():
+        loan_request = LoanRequest.objects.select_for_update().filter(request_id=request_id).first()
+        if loan_request is None or loan_request.status != LoanRequest.PENDING:
+            return None
+        
+        try:
+            customer, eligibility_result, loan = originate_loan(
+                customer_id=loan_request.customer_id,
+                loan_amount=loan_request.loan_amount,
+                interest_rate=loan_request.interest_rate,
+                tenure=loan_request.tenure
+            )
+        except Customer.DoesNotExist:
+            loan_request.status = LoanRequest.FAILED
+            loan_request.message = 'Customer not found'
+        else:
+            loan_request.loan = loan
+            loan_request.monthly_installment = Decimal(str(eligibility_result['monthly_installment']))
+            if loan is None:
+                loan_request.status = LoanRequest.REJECTED
+                loan_request.message = REJECTED_MESSAGE
+            else:
+                loan_request.status = LoanRequest.APPROVED
+                loan_request.message = APPROVED_MESSAGE
+        
+        loan_request.save()
+    
+    return loan_request.status
+
+
+def dispatch_loan_request(request_id):
+    """
+    Send a committed LoanRequest to the worker. Runs after the request's
+    transaction commits, when the 202 (and any idempotency key) is already
+    stored, so a broker failure marks the request failed instead of
+    leaving it pending with no task to process it.
+    """
+    try:
+        process_loan_request.delay(request_id)
+    except Exception:
+        logger.exception('Could not queue loan request %s', request_id)
+        LoanRequest.objects.filter(request_id=request_id, status=LoanRequest.PENDING).update(
+            status=LoanRequest.FAILED, message=NOT_QUEUED_MESSAGE, updated_at=timezone.now()
+        )
+
+
+@shared_task
+def rescore_portfolio(chunk_size=DEFAULT_RESCORE_CHUNK_SIZE):
+    """
+    Nightly entry point (see CELERY_BEAT_SCHEDULE): fan the customer table
+    out as one rescore_customer_range task per id range, so the worker
+    pool scores the chunks in parallel
+    """
+    scored_at = timezone.now().isoformat()
+    ranges = customer_id_ranges(chunk_size)
+    group(rescore_customer_range.s(low, high, scored_at) for low, high in ranges).apply_async()
+    logger.info('Queued rescoring of %d customer id ranges', len(ranges))
+    return len(ranges)
+
+
+@shared_task(autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def rescore_customer_range(low, high, scored_at):
+    """Score customers with low <= customer_id < high"""
+    started = timezone.now()
+    scored = score_customer_range(low, high, scored_at=parse_datetime(scored_at))
+    seconds = (timezone.now() - started).total_seconds()
+    rate = scored / seconds if seconds else 0.0
+    logger.info('Rescored customers %d-%d: %d in %.2fs (%.0f customers/sec)', low, high - 1, scored, seconds, rate)
+    return scored
@@ -0,0 +1,147 @@
+import time
+from decimal import Decimal
+from unittest import skipUnless
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from loans.db_router import PRIMARY_PIN_COOKIE, ReplicaRoutingMiddleware, read_from_replica
+from loans.models import Customer, Loan
+from datetime import date
+
+
+def _has_separate_replica():
+    """A 'replica1' database with its own test database (e.g. a second SQLite file), not a mirror"""
+    replica = settings.DATABASES.get('replica1')
+    return replica is not None and not replica.get('TEST', {}).get('MIRROR')
+
+
+@read_from_replica
+def _marked_read():
+    return router.db_for_read(Loan)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    def _handle(self, view, request=None):
+        """Run view(request) through the middleware; returns (view result, response)"""
+        outcome = {}
+        
+        def get_response(request):
+            outcome['result'] = view()
+            return HttpResponse()
+        
+        response = ReplicaRoutingMiddleware(get_response)(request or self.factory.get('/'))
+        return outcome['result'], response
+    
+    def test_only_marked_reads_use_a_replica(self):
+        """Test reads go to the replica inside read_from_replica and to the primary elsewhere"""
+        result, response = self._handle(lambda: (_marked_read(), router.db_for_read(Loan)))
+        self.assertEqual(result, ('replica1', 'default'))
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        # Outside a request (tasks, commands) everything stays on the primary
+        self.assertEqual(_marked_read(), 'default')
+    
+    def test_write_pins_request_and_client_to_primary(self):
+        """Test a write moves the rest of the request and the client's next requests to the primary"""
+        def write_then_read():
+            self.assertEqual(router.db_for_write(Loan), 'default')
+            return _marked_read()
+        
+        result, response = self._handle(write_then_read)
+        self.assertEqual(result, 'default')
+        cookie = response.cookies[PRIMARY_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        
+        request = self.factory.get('/')
+        request.COOKIES[PRIMARY_PIN_COOKIE] = cookie.value
+        self.assertEqual(self._handle(_marked_read, request)[0], 'default')
+    
+    def test_expired_or_implausible_pins_are_ignored(self):
+        """Test pins past their window or beyond it do not keep a client off the replicas"""
+        for until in (time.time() - 1, time.time() + 3600, 'garbage'):
+            request = self.factory.get('/')
+            request.COOKIES[PRIMARY_PIN_COOKIE] = str(until)
+            self.assertEqual(self._handle(_marked_read, request)[0], 'replica1')
+    
+    def test_middleware_unused_without_replicas(self):
+        """Test nothing is routed or wrapped when no replica is configured"""
+        with override_settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+@skipUnless(_has_separate_replica(), "needs a separate 'replica1' database, e.g. a second SQLite file")
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingViewsTest(TestCase):
+    """
+    End to end with the replica as its own database. Rows created on the
+    primary are missing from it, as if replication had not caught up yet.
+    """
+    # The runner sets up every database a test class names, skipped or not
+    databases = {'default', 'replica1'} if _has_separate_replica() else {'default'}
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Replica",
+            last_name="User",
+            age=40,
+            phone_number="4440004444",
+            monthly_salary=Decimal('200000'),
+            approved_limit=Decimal('7200000')
+        )
+    
+    def _replicate_customer(self):
+        # bulk_create skips the signals, which would write to the primary
+        Customer.objects.using('replica1').bulk_create([Customer(
+            customer_id=self.customer.customer_id,
+            first_name=self.customer.first_name,
+            last_name=self.customer.last_name,
+            age=self.customer.age,
+            phone_number=self.customer.phone_number,
+            monthly_salary=self.customer.monthly_salary,
+            approved_limit=self.customer.approved_limit
+        )])
+    
+    def test_reads_come_from_the_replica(self):
+        """Test loan views and eligibility read the replica, not the primary"""
+        customer_id = self.customer.customer_id
+        self.assertEqual(self.client.get(f'/api/view-loans/{customer_id}').status_code, 404)
+        application = {'customer_id': customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+        self.assertEqual(self.client.post('/api/check-eligibility', application, format='json').status_code, 404)
+        
+        self._replicate_customer()
+        Loan.objects.using('replica1').bulk_create([Loan(
+            customer_id=customer_id,
+            loan_amount=Decimal('100000'),
+            tenure=12,
+            interest_rate=Decimal('12'),
+            monthly_repayment=Decimal('8884.88'),
+            emis_paid_on_time=3,
+            start_date=date(2025, 1, 1),
+            end_date=date(2099, 1, 1)
+        )])
+        response = self.client.get(f'/api/view-loans/{customer_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.client.post('/api/check-eligibility', application, format='json').status_code, 200)
+    
+    def test_client_reads_its_own_new_loan(self):
+        """Test a loan created on the primary is visible to its creator right away"""
+        self._replicate_customer()
+        response = self.client.post('/api/create-loan', {
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12
+        }, format='json')
+        loan_id = response.json()['loan_id']
+        self.assertIsNotNone(loan_id)
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+        
+        self.assertEqual(self.client.get(f'/api/view-loan/{loan_id}').status_code, 200)
+        # Other clients read the replica, which has not seen the loan yet
+        self.assertEqual(APIClient().get(f'/api/view-loan/{loan_id}').status_code, 404)
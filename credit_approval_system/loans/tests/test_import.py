@@ -0,0 +1,335 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from decimal import Decimal
+from io import StringIO
+import openpyxl
+from loans.models import Customer, Loan, CustomerCreditProfile
+from loans.services.copy_import import copy_import
+from loans.services.data_import import (
+    import_customers,
+    import_loans,
+    refresh_derived_data,
+    rows_as_dicts
+)
+from loans.services.import_readers import read_rows
+from datetime import date, datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CUSTOMER_HEADER = ('Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit')
+LOAN_HEADER = ('Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate',
+               'Monthly payment', 'EMIs paid on Time', 'Date of Approval', 'End Date')
+
+
+def customer_rows(count, start=1):
+    rows = [CUSTOMER_HEADER]
+    for customer_id in range(start, start + count):
+        rows.append((customer_id, 'First', f'Last{customer_id}', 40, 9000000000 + customer_id, 50000, 1800000))
+    return rows
+
+
+class BulkImportTest(TestCase):
+    def test_headers_are_mapped_by_name(self):
+        """Test spreadsheet headers map onto model fields"""
+        rows = list(rows_as_dicts(customer_rows(1)))
+        self.assertEqual(rows[0]['customer_id'], 1)
+        self.assertEqual(rows[0]['phone_number'], 9000000001)
+        
+        loan = next(rows_as_dicts([LOAN_HEADER, (1, 2, 3, 4, 5, 6, 7, 8, 9)]))
+        self.assertEqual(loan['monthly_repayment'], 6)
+        self.assertEqual(loan['start_date'], 8)
+    
+    def test_customers_imported_with_fixed_queries_per_chunk(self):
+        """Test each chunk costs one existence query, one insert and one count of inserted rows"""
+        # 2 chunks x (savepoint, existence check, insert, inserted rows, release)
+        with self.assertNumQueries(10):
+            stats = import_customers(rows_as_dicts(customer_rows(10)), chunk_size=5)
+        
+        self.assertEqual(stats.created, 10)
+        customer = Customer.objects.get(customer_id=3)
+        self.assertEqual(customer.age, 40)
+        self.assertEqual(customer.phone_number, '9000000003')
+    
+    def test_existing_rows_skipped_or_upserted(self):
+        """Test re-imports skip existing rows unless upsert is requested"""
+        import_customers(rows_as_dicts(customer_rows(3)))
+        
+        rows = customer_rows(4)
+        rows[1] = (1, 'Changed', 'Name', 41, 9000000001, 60000, 2200000)
+        
+        stats = import_customers(rows_as_dicts(rows))
+        self.assertEqual((stats.created, stats.skipped), (1, 3))
+        self.assertEqual(Customer.objects.get(customer_id=1).first_name, 'First')
+        
+        stats = import_customers(rows_as_dicts(rows), upsert=True)
+        self.assertEqual((stats.created, stats.updated), (0, 4))
+        self.assertEqual(Customer.objects.get(customer_id=1).first_name, 'Changed')
+    
+    def test_phone_number_conflicts_skipped(self):
+        """Test rows reusing a registered or earlier phone number are skipped, not miscounted"""
+        import_customers(rows_as_dicts(customer_rows(1)))
+        rows = [
+            CUSTOMER_HEADER,
+            (2, 'Taken', 'Number', 30, 9000000001, 50000, 1800000),
+            (3, 'First', 'Claim', 30, 9000000099, 50000, 1800000),
+            (4, 'Second', 'Claim', 30, 9000000099, 50000, 1800000),
+        ]
+        
+        for upsert in [False, True]:
+            warnings = []
+            stats = import_customers(rows_as_dicts(rows), upsert=upsert, warn=warnings.append)
+            self.assertEqual(stats.skipped, 2)
+            self.assertEqual(len(warnings), 2)
+            self.assertEqual(stats.customer_ids, {3})
+        self.assertEqual(sorted(Customer.objects.values_list('customer_id', flat=True)), [1, 3])
+    
+    def test_loans_import_and_profiles_rebuilt(self):
+        """Test loans are validated, imported and reflected in credit profiles"""
+        customers = import_customers(rows_as_dicts(customer_rows(2)))
+        warnings = []
+        loans = import_loans(rows_as_dicts([
+            LOAN_HEADER,
+            (1, 10, 100000, 12, 10.5, 8815, 12, datetime(2020, 1, 1), datetime(2021, 1, 1)),
+            (1, 11, 200000, 24, 12, 9415, 3, '2024-02-01', '2026-02-01'),
+            (1, 11, 999999, 24, 12, 9415, 3, '2024-02-01', '2026-02-01'),
+            (2, 12, 'not a number', 12, 10, 8800, 1, '2024-02-01', '2025-02-01'),
+            (99, 13, 100000, 12, 10, 8800, 1, '2024-02-01', '2025-02-01'),
+        ]), warn=warnings.append, today=date(2025, 6, 1))
+        
+        self.assertEqual(
+            (loans.created, loans.skipped, loans.invalid, loans.missing_customer),
+            (2, 1, 1, 1)
+        )
+        self.assertEqual(len(warnings), 2)
+        self.assertFalse(Loan.objects.get(loan_id=10).is_active)
+        self.assertTrue(Loan.objects.get(loan_id=11).is_active)
+        self.assertEqual(Loan.objects.get(loan_id=11).loan_amount, Decimal('200000'))
+        
+        refresh_derived_data(customers.customer_ids | loans.customer_ids)
+        profile = CustomerCreditProfile.objects.get(customer_id=1)
+        self.assertEqual(profile.loan_count, 2)
+        self.assertEqual(profile.active_loan_sum, Decimal('200000'))
+        self.assertEqual(profile.loans_per_year, {'2020': 1, '2024': 1})
+    
+    def test_upsert_moving_a_loan_refreshes_both_customers(self):
+        """Test the previous owner of a re-assigned loan is refreshed too"""
+        import_customers(rows_as_dicts(customer_rows(2)))
+        import_loans(rows_as_dicts(LOAN_ROWS[:2]), today=date(2025, 6, 1))
+        refresh_derived_data({1})
+        
+        moved = [LOAN_HEADER, (2,) + LOAN_ROWS[1][1:]]
+        stats = import_loans(rows_as_dicts(moved), upsert=True, today=date(2025, 6, 1))
+        self.assertEqual(stats.customer_ids, {1, 2})
+        
+        refresh_derived_data(stats.customer_ids)
+        self.assertEqual(CustomerCreditProfile.objects.get(customer_id=1).loan_count, 0)
+        self.assertEqual(CustomerCreditProfile.objects.get(customer_id=2).loan_count, 1)
+    
+    def test_loans_lost_to_a_concurrent_insert_are_not_counted(self):
+        """Test a loan id taken between the existence check and the insert counts as skipped"""
+        import_customers(rows_as_dicts(customer_rows(2)))
+        bulk_create = Loan.objects.bulk_create
+        
+        def racing_bulk_create(loans, **options):
+            Loan.objects.create(
+                loan_id=10, customer_id=2, loan_amount=Decimal('1'), tenure=1, interest_rate=Decimal('1'),
+                monthly_repayment=Decimal('1'), start_date=date(2024, 1, 1), end_date=date(2024, 2, 1)
+            )
+            return bulk_create(loans, **options)
+        
+        with mock.patch.object(Loan.objects, 'bulk_create', racing_bulk_create):
+            stats = import_loans(rows_as_dicts(LOAN_ROWS), today=date(2025, 6, 1))
+        self.assertEqual((stats.created, stats.skipped), (1, 1))
+        self.assertEqual(Loan.objects.get(loan_id=10).customer_id, 2)
+
+
+
+LOAN_ROWS = [
+    LOAN_HEADER,
+    (1, 10, 100000, 12, 10.5, 8815, 12, '2020-01-01', '2021-01-01'),
+    (2, 11, 200000, 24, 12.25, 9415, 3, '2024-02-01', '2099-02-01'),
+]
+
+
+class ImportFileMixin:
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+    
+    def _write_csv(self, name, rows):
+        path = self._path(name)
+        with open(path, 'w', newline='') as csv_file:
+            csv.writer(csv_file).writerows(rows)
+        return path
+    
+    def _write_xlsx(self, name, rows):
+        path = self._path(name)
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(path)
+        return path
+    
+    def _write_parquet(self, name, rows):
+        path = self._path(name)
+        header, values = rows[0], rows[1:]
+        table = pyarrow.table({column: [row[i] for row in values] for i, column in enumerate(header)})
+        pyarrow.parquet.write_table(table, path, row_group_size=1)
+        return path
+    
+    def _import(self, customers, loans, **options):
+        call_command('import_data', customers=customers, loans=loans, stdout=StringIO(), **options)
+        return list(Loan.objects.order_by('loan_id').values_list(
+            'loan_id', 'customer_id', 'loan_amount', 'interest_rate', 'start_date', 'is_active'
+        ))
+
+
+class ImportReaderTest(ImportFileMixin, TestCase):
+    def test_csv_and_xlsx_import_the_same_rows(self):
+        """Test the CSV and Excel readers feed identical data to the pipeline"""
+        from_xlsx = self._import(
+            self._write_xlsx('customers.xlsx', customer_rows(2)),
+            self._write_xlsx('loans.xlsx', LOAN_ROWS)
+        )
+        Customer.objects.all().delete()
+        
+        from_csv = self._import(
+            self._write_csv('customers.csv', customer_rows(2)),
+            self._write_csv('loans.csv', LOAN_ROWS)
+        )
+        
+        self.assertEqual(len(from_csv), 2)
+        self.assertEqual(from_xlsx, from_csv)
+        self.assertEqual(Customer.objects.get(customer_id=2).phone_number, '9000000002')
+    
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_parquet_reader_streams_row_groups(self):
+        """Test Parquet files are read across row groups"""
+        path = self._write_parquet('loans.parquet', LOAN_ROWS)
+        rows = list(read_rows(path))
+        self.assertEqual(rows[0], LOAN_HEADER)
+        self.assertEqual(rows[1:], LOAN_ROWS[1:])
+        
+        loans = self._import(self._write_csv('customers.csv', customer_rows(2)), path)
+        self.assertEqual([loan[0] for loan in loans], [10, 11])
+    
+    def test_failed_import_still_rebuilds_profiles(self):
+        """Test customers committed before a failure get their profiles"""
+        with mock.patch(
+            'loans.management.commands.import_data.import_loans', side_effect=RuntimeError('lost connection')
+        ):
+            with self.assertRaises(RuntimeError):
+                self._import(self._write_csv('customers.csv', customer_rows(2)), self._write_csv('loans.csv', LOAN_ROWS))
+        self.assertEqual(CustomerCreditProfile.objects.count(), 2)
+    
+    def test_unsupported_extension_rejected(self):
+        """Test unknown formats fail before anything is imported"""
+        path = self._path('customers.json')
+        open(path, 'w').close()
+        with self.assertRaises(CommandError):
+            call_command('import_data', customers=path, loans=path, stdout=StringIO())
+    
+    
+    def test_copy_engine_matches_orm_engine(self):
+        """Test the staging-table engine writes the same rows as the ORM engine"""
+        customers = self._write_csv('customers.csv', customer_rows(2))
+        loans = self._write_csv('loans.csv', LOAN_ROWS + [LOAN_ROWS[1], (99, 12, 1, 1, 1, 1, 1, '2024-01-01', '2024-02-01')])
+        
+        from_orm = self._import(customers, loans)
+        Customer.objects.all().delete()
+        from_copy = self._import(customers, loans, engine='copy')
+        
+        self.assertEqual(from_orm, from_copy)
+        self.assertEqual([loan[-1] for loan in from_copy], [False, True])
+        self.assertEqual(CustomerCreditProfile.objects.get(customer_id=2).active_loan_sum, Decimal('200000'))
+    
+    def test_copy_engine_upsert(self):
+        """Test the staging-table engine updates existing rows with --upsert"""
+        customers = self._write_csv('customers.csv', customer_rows(2))
+        self._import(customers, self._write_csv('loans.csv', LOAN_ROWS))
+        
+        changed = [LOAN_HEADER, (1, 10, 150000, 12, 10.5, 8815, 12, '2020-01-01', '2099-01-01')]
+        loans = self._write_csv('changed.csv', changed)
+        self._import(customers, loans, engine='copy')
+        self.assertEqual(Loan.objects.get(loan_id=10).loan_amount, Decimal('100000'))
+        
+        self._import(customers, loans, engine='copy', upsert=True)
+        loan = Loan.objects.get(loan_id=10)
+        self.assertEqual(loan.loan_amount, Decimal('150000'))
+        self.assertTrue(loan.is_active)
+        self.assertEqual(CustomerCreditProfile.objects.get(customer_id=1).active_loan_sum, Decimal('150000'))
+    
+    def test_copy_engine_upsert_moving_a_loan(self):
+        """Test re-importing a loan under another customer fixes both customers' profiles"""
+        customers = self._write_csv('customers.csv', customer_rows(2))
+        self._import(customers, self._write_csv('loans.csv', LOAN_ROWS), engine='copy')
+        
+        # Only the new owner is in the customers file, so only the loan merge names the old one
+        moved = [LOAN_HEADER, (1,) + LOAN_ROWS[2][1:]]
+        self._import(
+            self._write_csv('new_owner.csv', customer_rows(1)), self._write_csv('moved.csv', moved),
+            engine='copy', upsert=True
+        )
+        
+        self.assertEqual(Loan.objects.get(loan_id=11).customer_id, 1)
+        first, second = CustomerCreditProfile.objects.filter(customer_id__in=[1, 2]).order_by('customer_id')
+        self.assertEqual((first.loan_count, first.active_loan_sum), (2, Decimal('200000')))
+        self.assertEqual((second.loan_count, second.active_loan_sum), (0, Decimal('0')))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'COPY and worker processes need PostgreSQL')
+class PostgresCopyImportTest(ImportFileMixin, TransactionTestCase):
+    """Forked workers use their own connections, so the data has to be committed"""
+    
+    def test_first_occurrence_wins_across_workers(self):
+        """Test duplicates in other chunks are skipped the same with one worker or several"""
+        rows = customer_rows(20) + [
+            (5, 'Later', 'Duplicate', 40, 8000000005, 50000, 1800000),
+            (21, 'Taken', 'Number', 40, 9000000007, 50000, 1800000),
+        ]
+        path = self._write_csv('customers.csv', rows)
+        
+        for workers in [1, 3]:
+            Customer.objects.all().delete()
+            stats = copy_import('customers', path, chunk_size=4, workers=workers)
+            self.assertEqual((stats.rows, stats.created, stats.skipped), (22, 20, 2))
+            self.assertEqual(Customer.objects.count(), 20)
+            self.assertEqual(Customer.objects.get(customer_id=5).first_name, 'First')
+        
+        stats = copy_import('customers', path, chunk_size=4, workers=3, upsert=True)
+        self.assertEqual((stats.created, stats.updated, stats.skipped), (0, 20, 2))
+        self.assertEqual(Customer.objects.get(customer_id=5).first_name, 'First')
+    
+    def test_command_with_workers_matches_orm_engine(self):
+        """Test COPY through worker processes writes the same rows as the ORM engine"""
+        customers = self._write_csv('customers.csv', customer_rows(6))
+        loans = self._write_csv('loans.csv', LOAN_ROWS + [
+            (3, 12, 300000, 36, 11, 9800, 5, '2023-01-01', '2099-01-01'),
+            (6, 13, 50000, 6, 9, 8500, 6, '2022-01-01', '2022-07-01'),
+            (2, 11, 999999, 24, 12, 9415, 3, '2024-02-01', '2099-02-01'),
+        ])
+        
+        from_orm = self._import(customers, loans)
+        Customer.objects.all().delete()
+        from_copy = self._import(customers, loans, engine='copy', workers=3, chunk_size=1)
+        
+        self.assertEqual(from_orm, from_copy)
+        self.assertEqual(Loan.objects.get(loan_id=11).loan_amount, Decimal('200000'))
+        self.assertEqual(CustomerCreditProfile.objects.get(customer_id=3).active_loan_sum, Decimal('300000'))
+
@@ -0,0 +1,118 @@
+import re
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient
+from decimal import Decimal
+from loans.instrumentation import RequestTimings, _current, render_metrics, reset_metrics, timed
+from loans.models import Customer, Loan
+from loans.services.score_cache import get_score_cache_stats
+from loans.services import calculate_monthly_installment
+from datetime import date
+
+def parse_server_timing(header):
+    """{name: (duration_ms, description)}"""
+    metrics = {}
+    for part in header.split(', '):
+        name, *params = part.split(';')
+        values = dict(param.split('=', 1) for param in params)
+        metrics[name] = (float(values['dur']), values.get('desc', '').strip('"'))
+    return metrics
+
+
+class InstrumentationMiddlewareTest(TestCase):
+    def setUp(self):
+        reset_metrics()
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Timed",
+            last_name="Customer",
+            age=38,
+            phone_number="5553330000",
+            monthly_salary=Decimal('80000'),
+            approved_limit=Decimal('2900000')
+        )
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=Decimal('200000'),
+            tenure=24,
+            interest_rate=Decimal('12'),
+            monthly_repayment=Decimal('9414.69'),
+            emis_paid_on_time=10,
+            start_date=date(2024, 1, 1),
+            end_date=date(2026, 1, 1)
+        )
+        self.application = {
+            'customer_id': self.customer.customer_id,
+            'loan_amount': 100000,
+            'interest_rate': 14,
+            'tenure': 12
+        }
+    
+    def test_server_timing_reports_db_and_services(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/check-eligibility', self.application, format='json')
+        
+        timing = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(timing['db'][1], f'{len(queries)} queries')
+        for name in ('app', 'eligibility', 'credit_score', 'score_payment_history', 'score_number_of_loans',
+                     'score_current_year_activity', 'score_loan_volume', 'emi'):
+            self.assertIn(name, timing)
+        self.assertEqual(timing['credit_score'][1], '1 calls')
+        self.assertGreaterEqual(timing['app'][0], timing['eligibility'][0])
+        self.assertGreaterEqual(timing['eligibility'][0], timing['credit_score'][0])
+    
+    def test_metrics_aggregate_requests(self):
+        for _ in range(3):
+            self.client.post('/api/check-eligibility', self.application, format='json')
+        self.client.get('/api/view-loan/999999')
+        
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        
+        self.assertIn('loans_http_request_duration_seconds_count{view="check-eligibility",method="POST"} 3', body)
+        self.assertIn('loans_http_request_duration_seconds_bucket{view="check-eligibility",method="POST",le="+Inf"} 3', body)
+        self.assertIn('loans_http_responses_total{view="check-eligibility",method="POST",status="200"} 3', body)
+        self.assertIn('loans_http_responses_total{view="view-loan",method="GET",status="404"} 1', body)
+        # Scored once, then served from the score cache
+        self.assertIn('loans_service_calls_total{service="credit_score"} 1', body)
+        self.assertIn('loans_service_duration_seconds_count{service="emi"} 3', body)
+        self.assertRegex(body, r'loans_db_queries_total\{view="check-eligibility"\} [1-9]')
+        
+        buckets = re.findall(r'loans_http_request_duration_seconds_bucket\{view="check-eligibility".*\} (\d+)', body)
+        counts = [int(count) for count in buckets]
+        self.assertEqual(counts, sorted(counts))
+    
+    def test_score_cache_counters_are_exported(self):
+        """Test the score cache's hits and misses show up on /metrics"""
+        for _ in range(3):
+            self.client.post('/api/check-eligibility', self.application, format='json')
+        
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('loans_score_cache_total{event="hits"} 2', body)
+        self.assertIn('loans_score_cache_total{event="misses"} 1', body)
+        self.assertEqual(get_score_cache_stats()['hits'], 2)
+    
+    async def test_async_views_are_measured(self):
+        loan = await Loan.objects.aget()
+        response = await AsyncClient().get(f'/api/async/view-loan/{loan.loan_id}')
+        self.assertEqual(response.status_code, 200)
+        timing = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(timing['db'][1], '1 queries')
+    
+    def test_nothing_is_recorded_outside_requests(self):
+        self.assertIsNone(_current.get())
+        self.assertEqual(calculate_monthly_installment(100000, 10, 12), Decimal('8791.59'))
+        
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            timed('probe')(lambda: None)()
+            timed('probe')(lambda: None)()
+        finally:
+            _current.reset(token)
+        self.assertEqual(timings.spans['probe'][0], 2)
+        self.assertNotIn('probe', render_metrics())
@@ -0,0 +1,129 @@
+import threading
+import unittest
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections
+from rest_framework.test import APIClient
+from decimal import Decimal
+from loans.models import Customer, Loan
+from loans.services import originate_loan, calculate_monthly_installment
+from loans.services.credit_profile import verify_profiles
+
+
+def create_customer(phone_number):
+    return Customer.objects.create(
+        first_name="Concurrent",
+        last_name="Customer",
+        age=35,
+        phone_number=phone_number,
+        monthly_salary=Decimal('100000'),
+        approved_limit=Decimal('3600000')
+    )
+
+
+class LoanOriginationTest(TestCase):
+    def setUp(self):
+        self.customer = create_customer("5553330000")
+    
+    def test_debt_updated_in_database_not_from_stale_copy(self):
+        """Test the debt increment is applied to the stored value"""
+        Customer.objects.filter(pk=self.customer.pk).update(current_debt=Decimal('50000'))
+        
+        customer, result, loan = originate_loan(self.customer.pk, 200000, 14, 24)
+        self.assertIsNotNone(loan)
+        self.assertEqual(customer.current_debt, Decimal('250000'))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, Decimal('250000'))
+    
+    def test_debt_update_touches_only_debt_columns(self):
+        """Test the customer is updated with a single F() expression, not a full-row save"""
+        with CaptureQueriesContext(connection) as queries:
+            originate_loan(self.customer.pk, 200000, 14, 24)
+        
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "customers"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"customers"."current_debt" +', updates[0])
+        self.assertNotIn('first_name', updates[0])
+    
+    def test_rejected_loan_leaves_debt_unchanged(self):
+        """Test nothing is written when the loan is not approved"""
+        customer, result, loan = originate_loan(self.customer.pk, 5000000, 14, 6)
+        self.assertIsNone(loan)
+        self.assertFalse(result['approval'])
+        self.assertEqual(Loan.objects.count(), 0)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, Decimal('0'))
+    
+    def test_unknown_customer(self):
+        with self.assertRaises(Customer.DoesNotExist):
+            originate_loan(999999, 200000, 14, 24)
+
+
+@unittest.skipUnless(connection.features.has_select_for_update, 'database has no row locks')
+class ConcurrentOriginationTest(TransactionTestCase):
+    THREADS = 12
+    
+    def test_parallel_requests_keep_invariants(self):
+        """Test parallel loans for one customer neither lose debt nor overrun the EMI cap"""
+        customer = create_customer("5554440000")
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        
+        def submit():
+            try:
+                barrier.wait()
+                originate_loan(customer.pk, 200000, 14, 24)
+            except Exception as exc:  # Reported by the main thread
+                errors.append(exc)
+            finally:
+                connections.close_all()
+        
+        threads = [threading.Thread(target=submit) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        loans = list(Loan.objects.filter(customer=customer))
+        customer.refresh_from_db()
+        
+        # No lost updates: the debt is exactly the sum of the booked loans
+        self.assertEqual(customer.current_debt, sum(loan.loan_amount for loan in loans))
+        
+        # No double approvals: the requested EMIs fit in half the salary
+        emi = calculate_monthly_installment(200000, 14, 24)
+        self.assertGreater(len(loans), 0)
+        self.assertLessEqual(emi * len(loans), customer.monthly_salary * Decimal('0.5'))
+        self.assertLess(len(loans), self.THREADS)
+        
+        self.assertEqual(verify_profiles([customer.pk]), [])
+    
+    def test_concurrent_duplicates_wait_for_first_request(self):
+        """Test parallel retries with one Idempotency-Key book a single loan"""
+        customer = create_customer("5554445555")
+        barrier = threading.Barrier(self.THREADS)
+        responses = []
+        
+        def submit():
+            try:
+                barrier.wait()
+                responses.append(APIClient().post('/api/create-loan', {
+                    'customer_id': customer.pk,
+                    'loan_amount': 200000,
+                    'interest_rate': 14,
+                    'tenure': 24
+                }, format='json', HTTP_IDEMPOTENCY_KEY='parallel-retry'))
+            finally:
+                connections.close_all()
+        
+        threads = [threading.Thread(target=submit) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(Loan.objects.filter(customer=customer).count(), 1)
+        self.assertEqual(len(responses), self.THREADS)
+        self.assertEqual({response.json()['loan_id'] for response in responses}, {Loan.objects.get().loan_id})
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), self.THREADS - 1)
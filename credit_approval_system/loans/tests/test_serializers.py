@@ -0,0 +1,217 @@
+import random
+import uuid
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import DecimalField
+from rest_framework.test import APIClient
+from unittest import mock
+from decimal import Decimal, InvalidOperation
+from loans import fast_serializers, renderers
+from loans.models import Customer, Loan
+from loans.renderers import ORJSONRenderer
+from loans.serializers import (
+    CreateLoanResponseSerializer,
+    CustomerResponseSerializer,
+    CustomerLoanSerializer,
+    LoanDetailSerializer,
+    LoanEligibilityResponseSerializer
+)
+from loans.services import round_to_nearest_lakh
+from loans.services.loan_queries import customer_active_loans_queryset, loan_detail_queryset, loan_detail_rows
+from datetime import date
+
+def drf_json(data):
+    return JSONRenderer().render(data)
+
+
+def fast_json(data):
+    return ORJSONRenderer().render(data)
+
+
+class FastSerializerParityTest(TestCase):
+    """The fast path must render the exact bytes the DRF serializers did"""
+    
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Zoë",
+            last_name="O'Brien",
+            age=33,
+            phone_number="5557770000",
+            monthly_salary=Decimal('120000'),
+            approved_limit=Decimal('4300000')
+        )
+        amounts = [Decimal('0'), Decimal('0.5'), Decimal('100000'), Decimal('9999999999.99'), Decimal('123456.78')]
+        rates = [Decimal('0'), Decimal('8.5'), Decimal('12'), Decimal('999.99'), Decimal('14.25')]
+        for i, (amount, rate) in enumerate(zip(amounts, rates)):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=amount,
+                tenure=12 * (i + 1),
+                interest_rate=rate,
+                monthly_repayment=amount / 7,
+                emis_paid_on_time=i * 20,
+                start_date=date(2024, 1, 1),
+                end_date=date(2030, 1, 1)
+            )
+    
+    def test_decimal_formatter_matches_decimal_field(self):
+        rng = random.Random(7)
+        for max_digits, places in ((12, 2), (5, 2)):
+            field = DecimalField(max_digits=max_digits, decimal_places=places)
+            formatter = fast_serializers.decimal_formatter(max_digits, places)
+            scale = 10 ** (max_digits - places + 3)
+            values = [
+                Decimal('1.005'), Decimal('1.015'), Decimal('-2.5'), Decimal('-2.50'), Decimal('0.00'),
+                3, 4.25, '7.125', Decimal('1E+2'), Decimal('0E-9')
+            ]
+            values += [Decimal(rng.randrange(scale)) / 1000 for _ in range(500)]
+            for value in values:
+                self.assertEqual(formatter(value), field.to_representation(value), value)
+            # Out of range values fail the same way
+            too_big = Decimal(10) ** (max_digits - places)
+            with self.assertRaises(InvalidOperation):
+                field.to_representation(too_big)
+            with self.assertRaises(InvalidOperation):
+                formatter(too_big)
+    
+    def test_registered_customer(self):
+        self.customer.approved_limit = round_to_nearest_lakh(self.customer.monthly_salary * 36)
+        self.assertEqual(
+            fast_json(fast_serializers.registered_customer(self.customer)),
+            drf_json(CustomerResponseSerializer(self.customer).data)
+        )
+    
+    def test_loan_detail(self):
+        for loan in Loan.objects.all():
+            expected = LoanDetailSerializer(loan_detail_queryset().get(loan_id=loan.loan_id)).data
+            row = loan_detail_rows().get(loan_id=loan.loan_id)
+            self.assertEqual(fast_json(fast_serializers.loan_detail(row)), drf_json(expected))
+    
+    def test_customer_loans(self):
+        rows = list(customer_active_loans_queryset(self.customer.customer_id))
+        expected = CustomerLoanSerializer(rows, many=True).data
+        self.assertEqual(fast_json(fast_serializers.customer_loans(rows)), drf_json(expected))
+    
+    def test_customer_loans_from_model_instances(self):
+        """Test the serializer still works on Loan objects, not only the annotated rows"""
+        rows = list(customer_active_loans_queryset(self.customer.customer_id))
+        loans = Loan.objects.filter(loan_id__in=[row['loan_id'] for row in rows]).order_by('loan_id')
+        self.assertEqual(CustomerLoanSerializer(loans, many=True).data, CustomerLoanSerializer(rows, many=True).data)
+        self.assertEqual(CustomerLoanSerializer(loans[0]).data['repayments_left'], loans[0].emis_left())
+    
+    def test_customer_without_loans(self):
+        Loan.objects.all().delete()
+        rows = list(customer_active_loans_queryset(self.customer.customer_id))
+        self.assertEqual(fast_json(fast_serializers.customer_loans(rows)), b'[]')
+    
+    def test_eligibility_results(self):
+        """Cover both the data= round trip and the many=True batch path, including values DRF rejects"""
+        results = [
+            {'customer_id': 1, 'approval': True, 'interest_rate': 12.0,
+             'corrected_interest_rate': 16.0, 'tenure': 12, 'monthly_installment': 8791.59},
+            {'customer_id': 2, 'approval': False, 'interest_rate': 8.5,
+             'corrected_interest_rate': 8.5, 'tenure': 240, 'monthly_installment': 0.0},
+            # More places than the field allows
+            {'customer_id': 3, 'approval': False, 'interest_rate': 12.345,
+             'corrected_interest_rate': 16.0, 'tenure': 6, 'monthly_installment': 100.5},
+            # Too many digits
+            {'customer_id': 4, 'approval': True, 'interest_rate': 999.99,
+             'corrected_interest_rate': 999.99, 'tenure': 1, 'monthly_installment': 18099999999.98},
+        ]
+        for result in results:
+            serializer = LoanEligibilityResponseSerializer(data=result)
+            serializer.is_valid()
+            self.assertEqual(
+                fast_json(fast_serializers.validated_eligibility_result(result)), drf_json(serializer.data)
+            )
+        
+        valid = results[:2]
+        self.assertEqual(
+            fast_json([fast_serializers.eligibility_result(result) for result in valid]),
+            drf_json(LoanEligibilityResponseSerializer(valid, many=True).data)
+        )
+    
+    def test_create_loan_results(self):
+        for data in [
+            {'loan_id': 17, 'customer_id': 3, 'loan_approved': True,
+             'message': 'Loan approved successfully', 'monthly_installment': 8791.59},
+            {'loan_id': None, 'customer_id': 3, 'loan_approved': False,
+             'message': 'Loan not approved based on credit score or EMI-to-salary ratio', 'monthly_installment': 0.1},
+            {'loan_id': None, 'customer_id': 3, 'loan_approved': False,
+             'message': '   ', 'monthly_installment': 1.0},
+        ]:
+            serializer = CreateLoanResponseSerializer(data=data)
+            serializer.is_valid()
+            self.assertEqual(
+                fast_json(fast_serializers.validated_create_loan_result(data)), drf_json(serializer.data)
+            )
+
+
+    def test_drf_fallback_gives_the_same_bytes(self):
+        """Test FAST_SERIALIZERS=False goes through the DRF serializers with the same output"""
+        rows = list(customer_active_loans_queryset(self.customer.customer_id))
+        detail = loan_detail_rows().first()
+        result = {'customer_id': 1, 'approval': True, 'interest_rate': 12.345,
+                  'corrected_interest_rate': 16.0, 'tenure': 12, 'monthly_installment': 8791.59}
+        created = {'loan_id': 17, 'customer_id': 3, 'loan_approved': True,
+                   'message': 'Loan approved successfully', 'monthly_installment': 8791.59}
+        outputs = [
+            lambda: fast_serializers.registered_customer(self.customer),
+            lambda: fast_serializers.loan_detail(detail),
+            lambda: fast_serializers.customer_loan(rows[0]),
+            lambda: fast_serializers.customer_loans(rows),
+            lambda: fast_serializers.eligibility_result({**result, 'interest_rate': 12}),
+            lambda: fast_serializers.validated_eligibility_result(result),
+            lambda: fast_serializers.validated_create_loan_result(created),
+        ]
+        fast = [fast_json(output()) for output in outputs]
+        with override_settings(FAST_SERIALIZERS=False):
+            with mock.patch.object(fast_serializers, 'format_money', side_effect=AssertionError):
+                self.assertEqual([drf_json(output()) for output in outputs], fast)
+
+
+class ORJSONRendererTest(TestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            'text': 'naïve – “quoted”   line   and </script>',
+            'error': [ErrorDetail('This field is required.', code='required')],
+            'lazy': gettext_lazy('Not found.'),
+            'decimal': Decimal('12.50'),
+            'when': timezone.now(),
+            'day': date(2024, 2, 29),
+            'id': uuid.uuid4(),
+            'nested': [{'a': None, 'b': True, 'c': 1.5, 'd': -3}],
+            'big': 2 ** 70,
+            'tuple': (1, 2),
+        }
+        self.assertEqual(fast_json(data), drf_json(data))
+    
+    def test_non_string_keys_fall_back(self):
+        data = {1: 'one', None: 'none'}
+        self.assertEqual(fast_json(data), drf_json(data))
+    
+    def test_indent_and_missing_orjson_use_json_renderer(self):
+        data = {'a': [1, 2]}
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2')
+        )
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(fast_json(data), drf_json(data))
+        self.assertEqual(fast_json(None), b'')
+    
+    def test_fast_serializers_off_uses_json_renderer(self):
+        with override_settings(FAST_SERIALIZERS=False), mock.patch.object(renderers, 'orjson') as orjson:
+            self.assertEqual(fast_json({'a': [1, 2]}), drf_json({'a': [1, 2]}))
+        orjson.dumps.assert_not_called()
+    
+    def test_only_hot_endpoints_use_orjson(self):
+        """Test the renderer is set per view, not as the project default"""
+        client = APIClient()
+        response = client.post('/api/check-eligibility', {}, format='json')
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        response = client.get(f'/api/loan-requests/{uuid.uuid4()}')
+        self.assertIs(type(response.accepted_renderer), JSONRenderer)
@@ -1,8 +1,45 @@
-from django.test import TestCase
+import copy
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from decimal import Decimal
-from loans.models import Customer, Loan
-from loans.services import CreditScoreCalculator, LoanEligibilityChecker, calculate_monthly_installment
-from datetime import date
+from io import StringIO
+from credit_system.celery_app import app as celery_app
+from loans.models import Customer, Loan, CustomerCreditProfile, CustomerScoreSnapshot
+from loans.services import (
+    CreditScoreCalculator,
+    LoanEligibilityChecker,
+    calculate_monthly_installment,
+    calculate_monthly_installments,
+    amortization_schedule
+)
+from loans.services.credit_profile import compute_profiles
+from loans.services.rescoring import customer_id_ranges, score_customer_range
+from loans.services.loan_calculator import annuity_factor, calculate_monthly_installment_uncached
+from loans.services.scoring_rules import (
+    DEFAULT_RULES,
+    DEFAULT_SCORING_RULES,
+    ScoringRules,
+    get_scoring_rules
+)
+from loans.services.score_cache import (
+    get_cached_credit_score,
+    get_score_cache_stats,
+    invalidate_credit_score,
+    invalidate_credit_scores,
+    reset_score_cache_stats,
+    seconds_until_year_end
+)
+from datetime import date, datetime
+from itertools import islice
+from loans.tasks import rescore_portfolio
 
 class LoanCalculatorTest(TestCase):
     def test_calculate_emi_with_interest(self):
@@ -14,6 +51,91 @@ class LoanCalculatorTest(TestCase):
         """Test EMI calculation with zero interest"""
         emi = calculate_monthly_installment(120000, 0, 12)
         self.assertEqual(float(emi), 10000.00)
+    
+    def test_vectorized_emi_matches_decimal_path(self):
+        """Property test: vectorized EMIs equal the Decimal path to the cent"""
+        rng = random.Random(20240101)
+        amounts, rates, tenures = [], [], []
+        for _ in range(5000):
+            amounts.append(Decimal(rng.randint(100, 10 ** 10)) / 100)
+            rates.append(Decimal(rng.choice([0, rng.randint(1, 3500)])) / 100)
+            tenures.append(rng.randint(1, 480))
+        
+        emis = calculate_monthly_installments(amounts, rates, tenures)
+        
+        for amount, rate, tenure, emi in zip(amounts, rates, tenures, emis):
+            expected = calculate_monthly_installment(amount, rate, tenure)
+            self.assertEqual(Decimal(repr(float(emi))), expected, (amount, rate, tenure))
+    
+    def test_vectorized_emi_half_cent_ties(self):
+        """Test values exactly on a half cent round like the Decimal path"""
+        amounts = [Decimal(k) / 100 for k in range(1, 2000, 2)]
+        emis = calculate_monthly_installments(amounts, 0, 2)
+        
+        for amount, emi in zip(amounts, emis):
+            expected = calculate_monthly_installment(amount, 0, 2)
+            self.assertEqual(Decimal(repr(float(emi))), expected, amount)
+    
+    def test_vectorized_emi_broadcasts_scalars(self):
+        """Test scalar arguments broadcast against arrays"""
+        emis = calculate_monthly_installments([100000, 120000], [10, 0], 12)
+        self.assertEqual(list(emis), [8791.59, 10000.0])
+
+
+class AnnuityFactorTableTest(TestCase):
+    def test_factor_table_matches_full_formula(self):
+        """Test principal x factor rounds to the same cent as the full formula"""
+        for tenure in range(6, 85, 6):
+            for rate_cents in range(1, 3001, 37):
+                rate = Decimal(rate_cents) / 100
+                for amount in (1, 99999.99, 123457, Decimal('4567891.23')):
+                    self.assertEqual(
+                        calculate_monthly_installment(amount, rate, tenure),
+                        calculate_monthly_installment_uncached(amount, rate, tenure),
+                        (amount, rate, tenure)
+                    )
+    
+    def test_factor_is_shared_across_input_types(self):
+        """Test equal rates given as float, str-built Decimal or padded Decimal hit one entry"""
+        annuity_factor.cache_clear()
+        calculate_monthly_installment(100000, 10.5, 12)
+        calculate_monthly_installment(250000, Decimal('10.50'), 12)
+        calculate_monthly_installment(Decimal('75000'), Decimal('10.5'), Decimal('12'))
+        
+        info = annuity_factor.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+    
+    def test_factor_table_is_bounded(self):
+        """Test rare pairs are evicted instead of growing the table"""
+        annuity_factor.cache_clear()
+        maxsize = annuity_factor.cache_info().maxsize
+        for tenure in range(1, maxsize + 50):
+            calculate_monthly_installment(100000, 12, tenure)
+        self.assertEqual(annuity_factor.cache_info().currsize, maxsize)
+
+
+class AmortizationScheduleTest(TestCase):
+    def test_schedule_repays_principal(self):
+        """Test principal adds up to the loan amount and the balance reaches zero"""
+        rows = list(amortization_schedule(100000, 10, 12, start_date=date(2025, 1, 15)))
+        
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(sum(row['principal'] for row in rows), Decimal('100000'))
+        self.assertEqual(rows[-1]['balance'], Decimal('0'))
+        self.assertEqual(rows[0]['interest'], Decimal('833.33'))
+        self.assertEqual(rows[0]['payment'], Decimal('8791.59'))
+        self.assertEqual(rows[0]['due_date'], date(2025, 2, 15))
+    
+    def test_schedule_month_range(self):
+        """Test a month range yields the same rows as the full schedule"""
+        full = list(amortization_schedule(2500000, 9.5, 360))
+        page = list(amortization_schedule(2500000, 9.5, 360, from_month=121, to_month=132))
+        self.assertEqual(page, full[120:132])
+    
+    def test_schedule_is_lazy(self):
+        """Test rows are produced on demand"""
+        rows = amortization_schedule(2500000, 9.5, 360)
+        self.assertEqual([row['month'] for row in islice(rows, 3)], [1, 2, 3])
 
 
 class CreditScoreTest(TestCase):
@@ -52,6 +174,47 @@ class CreditScoreTest(TestCase):
         calculator = CreditScoreCalculator(self.customer)
         score = calculator.calculate()
         self.assertGreater(score, 50)
+    
+    def test_score_uses_single_query(self):
+        """Test credit score inputs are loaded with one aggregate query"""
+        for i in range(5):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=Decimal('100000'),
+                tenure=12,
+                interest_rate=Decimal('10'),
+                monthly_repayment=Decimal('8791.59'),
+                emis_paid_on_time=10,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                is_active=i % 2 == 0
+            )
+        
+        calculator = CreditScoreCalculator(self.customer)
+        with self.assertNumQueries(1):
+            score = calculator.calculate()
+        
+        # 50/60 EMIs on time -> 33, 5 loans -> 15, no loans this year -> 5, 0.28 volume -> 20
+        self.assertEqual(score, 73)
+        self.assertEqual(calculator.stats['active_loan_sum'], Decimal('300000'))
+        self.assertEqual(calculator.stats['loan_count'], 5)
+    
+    def test_score_zero_when_active_loans_exceed_limit(self):
+        """Test credit score is zero when active loans exceed approved limit"""
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=Decimal('2000000'),
+            tenure=12,
+            interest_rate=Decimal('10'),
+            monthly_repayment=Decimal('175831.76'),
+            emis_paid_on_time=0,
+            start_date=date(2024, 1, 1),
+            end_date=date(2099, 12, 31),
+            is_active=True
+        )
+        
+        calculator = CreditScoreCalculator(self.customer)
+        self.assertEqual(calculator.calculate(), 0)
 
 
 class LoanEligibilityTest(TestCase):
@@ -97,3 +260,406 @@ class LoanEligibilityTest(TestCase):
         
         # High loan amount should be rejected due to EMI-salary ratio
         self.assertFalse(result['approval'])
+    
+    def test_check_eligibility_uses_single_query(self):
+        """Test score and EMI ratio share the same aggregate query"""
+        checker = LoanEligibilityChecker(
+            self.customer, 100000, 10, 12
+        )
+        with self.assertNumQueries(1):
+            checker.check_eligibility()
+
+
+class ScoringRulesTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Rules",
+            last_name="User",
+            age=35,
+            phone_number="5555555555",
+            monthly_salary=Decimal('60000'),
+            approved_limit=Decimal('2160000')
+        )
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'scoring_rules.json')
+        self.writes = 0
+    
+    def _write_rules(self, content=None, **changes):
+        if content is None:
+            rules = copy.deepcopy(DEFAULT_RULES)
+            rules.update(changes)
+            content = json.dumps(rules)
+        with open(self.path, 'w') as handle:
+            handle.write(content)
+        # Distinct mtimes even where the filesystem clock is coarse
+        self.writes += 1
+        os.utime(self.path, ns=(self.writes * 10**9, self.writes * 10**9))
+    
+    def test_default_tables_match_original_thresholds(self):
+        """Test the built-in ruleset keeps the original buckets and bands"""
+        rules = DEFAULT_SCORING_RULES
+        self.assertEqual([rules.number_of_loans_points(n) for n in range(9)], [10, 20, 20, 20, 15, 15, 15, 10, 10])
+        self.assertEqual([rules.current_year_activity_points(n) for n in range(7)], [5, 20, 20, 15, 15, 10, 10])
+        self.assertEqual(
+            [rules.loan_volume_points(Decimal(total), Decimal('100'))
+             for total in ('49.99', '50', '99.99', '100', '199.99', '200')],
+            [20, 15, 15, 10, 10, 5]
+        )
+        self.assertEqual(rules.loan_volume_points(Decimal('100'), Decimal('0')), 10)
+        self.assertEqual(
+            [rules.rate_band(score) for score in (0, 10, 11, 30, 31, 50, 51)],
+            [(False, None), (False, None), (True, Decimal('16.0')), (True, Decimal('16.0')),
+             (True, Decimal('12.0')), (True, Decimal('12.0')), (True, None)]
+        )
+    
+    def test_batch_matches_single_scores(self):
+        """Test the vectorized scorer agrees with the per-customer path"""
+        rng = random.Random(7)
+        rows, limits = [], []
+        for _ in range(500):
+            loan_count = rng.randint(0, 9)
+            total_tenure = rng.choice([0, 12, 36, 120]) if loan_count else 0
+            limit = Decimal(rng.choice([0, 100000, 250000, 1800000]))
+            rows.append({
+                'loan_count': loan_count,
+                'total_tenure': total_tenure,
+                'emis_paid_on_time': rng.randint(0, total_tenure),
+                'current_year_count': rng.randint(0, loan_count),
+                # Often exactly on a volume bound
+                'total_loan_amount': limit * Decimal(rng.choice(['0', '0.5', '1', '1.99', '2', '3'])),
+                'active_loan_sum': Decimal(rng.randint(0, 300000)),
+                'active_emi_sum': Decimal(0),
+            })
+            limits.append(limit)
+        
+        expected = [DEFAULT_SCORING_RULES.score(row, limit) for row, limit in zip(rows, limits)]
+        self.assertEqual(DEFAULT_SCORING_RULES.score_batch(rows, limits).tolist(), expected)
+        self.assertEqual(DEFAULT_SCORING_RULES.score_batch([], []).tolist(), [])
+    
+    def test_rules_file_is_hot_reloaded(self):
+        """Test a changed rules file takes effect without a restart"""
+        self._write_rules(version=2, max_emi_to_salary='0.01')
+        with override_settings(SCORING_RULES_FILE=self.path, SCORING_RULES_RELOAD_INTERVAL=0):
+            self.assertEqual(get_scoring_rules().version, 2)
+            self.assertFalse(LoanEligibilityChecker(self.customer, 100000, 10, 12).check_eligibility()['approval'])
+            
+            self._write_rules(version=3, rate_bands=[{'above': 50, 'min_interest_rate': '11'}])
+            result = LoanEligibilityChecker(self.customer, 100000, 10, 12).check_eligibility()
+            self.assertTrue(result['approval'])
+            self.assertEqual(result['corrected_interest_rate'], 11.0)
+            
+            # A broken file is reported and the last good rules stay active
+            self._write_rules('{"version": 4,')
+            with self.assertLogs('loans.services.scoring_rules', 'ERROR'):
+                self.assertEqual(get_scoring_rules().version, 3)
+        
+        self.assertIs(get_scoring_rules(), DEFAULT_SCORING_RULES)
+    
+    def test_cached_scores_follow_rule_changes(self):
+        """Test a score cached under other rules is recomputed"""
+        # 20 (no history) + 10 (no loans) + 5 (no loans this year) + 20 (no volume)
+        self.assertEqual(get_cached_credit_score(self.customer)['credit_score'], 55)
+        
+        self._write_rules(number_of_loans={'at_most': [0, 3, 6], 'points': [0, 20, 15, 10]})
+        with override_settings(SCORING_RULES_FILE=self.path):
+            self.assertEqual(get_cached_credit_score(self.customer)['credit_score'], 45)
+        self.assertEqual(get_cached_credit_score(self.customer)['credit_score'], 55)
+    
+    def test_invalid_rulesets_are_rejected(self):
+        """Test inconsistent tables fail to compile and the command reports them"""
+        broken = [
+            {key: value for key, value in DEFAULT_RULES.items() if key != 'rate_bands'},
+            dict(DEFAULT_RULES, number_of_loans={'at_most': [3, 3], 'points': [1, 2, 3]}),
+            dict(DEFAULT_RULES, loan_volume={'below': ['0.5'], 'points': [20], 'no_limit': 10}),
+            dict(DEFAULT_RULES, max_emi_to_salary='half'),
+        ]
+        for rules in broken:
+            with self.assertRaises(ValueError):
+                ScoringRules(rules)
+        
+        self._write_rules(json.dumps(broken[1]))
+        with self.assertRaisesMessage(CommandError, 'must be strictly increasing'):
+            call_command('check_scoring_rules', self.path, stdout=StringIO())
+        
+        self._write_rules()
+        out = StringIO()
+        call_command('check_scoring_rules', self.path, stdout=out)
+        self.assertIn(f'version 1 ({DEFAULT_SCORING_RULES.tag}) is valid', out.getvalue())
+
+
+class CreditProfileTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Profile",
+            last_name="Owner",
+            age=35,
+            phone_number="4444444444",
+            monthly_salary=Decimal('80000'),
+            approved_limit=Decimal('2900000')
+        )
+    
+    def _create_loan(self, **kwargs):
+        values = {
+            'customer': self.customer,
+            'loan_amount': Decimal('100000'),
+            'tenure': 12,
+            'interest_rate': Decimal('10'),
+            'monthly_repayment': Decimal('8791.59'),
+            'emis_paid_on_time': 6,
+            'start_date': date(2024, 3, 1),
+            'end_date': date(2099, 3, 1),
+            'is_active': True,
+        }
+        values.update(kwargs)
+        return Loan.objects.create(**values)
+    
+    def _assert_profile_matches_loans(self):
+        stored = CustomerCreditProfile.objects.get(customer=self.customer)
+        expected = compute_profiles([self.customer.customer_id])[self.customer.customer_id]
+        for field in ['active_loan_sum', 'active_emi_sum', 'total_loan_amount',
+                      'total_tenure', 'emis_paid_on_time', 'loan_count', 'loans_per_year']:
+            self.assertEqual(getattr(stored, field), getattr(expected, field), field)
+    
+    def test_profile_created_with_customer(self):
+        """Test a new customer gets an empty profile"""
+        profile = CustomerCreditProfile.objects.get(customer=self.customer)
+        self.assertEqual(profile.loan_count, 0)
+        self.assertEqual(profile.loans_per_year, {})
+    
+    def test_profile_tracks_loan_changes(self):
+        """Test profile totals follow loan creation, update and deletion"""
+        self._create_loan()
+        loan = self._create_loan(start_date=date(2023, 5, 1), is_active=False)
+        self._assert_profile_matches_loans()
+        
+        loan.emis_paid_on_time = 12
+        loan.save()
+        self._assert_profile_matches_loans()
+        
+        loan.delete()
+        self._assert_profile_matches_loans()
+        self.assertEqual(CustomerCreditProfile.objects.get(customer=self.customer).loan_count, 1)
+    
+    def test_new_customer_profile_is_one_insert(self):
+        """Test a new customer's profile is inserted without a lookup or savepoint first"""
+        with self.assertNumQueries(2):  # customer, profile
+            customer = Customer.objects.create(
+                first_name="Second",
+                last_name="Owner",
+                age=35,
+                phone_number="4444444445",
+                monthly_salary=Decimal('80000'),
+                approved_limit=Decimal('2900000')
+            )
+        self.assertTrue(CustomerCreditProfile.objects.filter(customer=customer).exists())
+    
+    def test_deleting_customer_removes_profile(self):
+        """Test deleting a customer with loans cascades without rebuilding their profile"""
+        self._create_loan()
+        self._create_loan(is_active=False)
+        
+        self.customer.delete()
+        self.assertFalse(CustomerCreditProfile.objects.exists())
+        self.assertFalse(Loan.objects.exists())
+    
+    def test_score_from_profile_matches_loan_scan(self):
+        """Test the profile read gives the same score as aggregating loans"""
+        for year in [2022, 2023, date.today().year]:
+            self._create_loan(start_date=date(year, 1, 1))
+        
+        from_profile = CreditScoreCalculator(self.customer).calculate()
+        CustomerCreditProfile.objects.filter(customer=self.customer).delete()
+        from_loans = CreditScoreCalculator(self.customer).calculate()
+        self.assertEqual(from_profile, from_loans)
+    
+    def test_rebuild_and_verify_command(self):
+        """Test the management command detects and repairs stale profiles"""
+        self._create_loan()
+        CustomerCreditProfile.objects.filter(customer=self.customer).update(loan_count=7)
+        
+        with self.assertRaises(CommandError):
+            call_command('rebuild_credit_profiles', '--verify', stdout=StringIO())
+        
+        call_command('rebuild_credit_profiles', stdout=StringIO())
+        call_command('rebuild_credit_profiles', '--verify', stdout=StringIO())
+        self._assert_profile_matches_loans()
+
+
+
+class ScoreCacheTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Cache",
+            last_name="User",
+            age=45,
+            phone_number="6666666666",
+            monthly_salary=Decimal('70000'),
+            approved_limit=Decimal('2500000')
+        )
+        reset_score_cache_stats()
+    
+    def _create_loan(self):
+        return Loan.objects.create(
+            customer=self.customer,
+            loan_amount=Decimal('300000'),
+            tenure=24,
+            interest_rate=Decimal('12'),
+            monthly_repayment=Decimal('14122.04'),
+            emis_paid_on_time=3,
+            start_date=date(2023, 1, 1),
+            end_date=date(2099, 1, 1)
+        )
+    
+    def test_second_lookup_is_a_hit_without_queries(self):
+        """Test a cached score is served without touching the database"""
+        first = get_cached_credit_score(self.customer)
+        with self.assertNumQueries(0):
+            second = get_cached_credit_score(self.customer)
+        
+        self.assertEqual(first, second)
+        stats = get_score_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+    
+    def test_loan_save_and_delete_invalidate(self):
+        """Test loan changes drop the cached entry"""
+        before = get_cached_credit_score(self.customer)
+        loan = self._create_loan()
+        after_create = get_cached_credit_score(self.customer)
+        self.assertEqual(after_create['active_emi_sum'], Decimal('14122.04'))
+        self.assertNotEqual(before, after_create)
+        
+        loan.delete()
+        self.assertEqual(get_cached_credit_score(self.customer), before)
+        self.assertEqual(get_score_cache_stats()['hits'], 0)
+    
+    def test_approved_limit_change_invalidates(self):
+        """Test changing approved_limit drops the cached entry"""
+        self._create_loan()
+        get_cached_credit_score(self.customer)
+        
+        self.customer.approved_limit = Decimal('100000')
+        self.customer.save(update_fields=['approved_limit'])
+        
+        self.assertEqual(get_cached_credit_score(self.customer)['credit_score'], 0)
+    
+    def test_other_customer_updates_keep_entry(self):
+        """Test saving unrelated customer fields keeps the cached entry"""
+        get_cached_credit_score(self.customer)
+        self.customer.current_debt = Decimal('5000')
+        self.customer.save(update_fields=['current_debt'])
+        
+        get_cached_credit_score(self.customer)
+        self.assertEqual(get_score_cache_stats()['hits'], 1)
+    
+    def test_bulk_invalidation(self):
+        """Test invalidate_credit_scores retires the entries of writes that bypass signals"""
+        get_cached_credit_score(self.customer)
+        invalidate_credit_scores([self.customer.customer_id])
+        get_cached_credit_score(self.customer)
+        self.assertEqual(get_score_cache_stats()['misses'], 2)
+    
+    def test_score_invalidated_while_computed_is_not_cached(self):
+        """Test a score read before a concurrent invalidation is returned but not stored"""
+        calculate = CreditScoreCalculator.calculate
+        
+        def calculate_then_write(calculator):
+            score = calculate(calculator)
+            invalidate_credit_score(self.customer.customer_id)  # another request's write lands here
+            return score
+        
+        with mock.patch.object(CreditScoreCalculator, 'calculate', calculate_then_write):
+            get_cached_credit_score(self.customer)
+        get_cached_credit_score(self.customer)
+        get_cached_credit_score(self.customer)
+        self.assertEqual((get_score_cache_stats()['hits'], get_score_cache_stats()['misses']), (1, 2))
+    
+    @override_settings(REPLICA_READ_YOUR_WRITES_SECONDS=5)
+    def test_replica_reads_right_after_a_write_are_not_cached(self):
+        """Test a replica that may not have replayed the last write cannot cache its score"""
+        invalidate_credit_score(self.customer.customer_id)
+        with mock.patch('loans.services.score_cache.reading_from_replica', return_value=True):
+            get_cached_credit_score(self.customer)
+            get_cached_credit_score(self.customer)
+            self.assertEqual(get_score_cache_stats()['hits'], 0)
+            
+            with mock.patch('loans.services.score_cache.time.time', return_value=time.time() + 5):
+                get_cached_credit_score(self.customer)
+            get_cached_credit_score(self.customer)
+        self.assertEqual(get_score_cache_stats()['hits'], 1)
+    
+    def test_entries_expire_at_year_end(self):
+        """Test the timeout never runs past the end of the year"""
+        self.assertEqual(seconds_until_year_end(datetime(2025, 12, 31, 23, 59, 0)), 60)
+
+
+class RescoringTest(TestCase):
+    def setUp(self):
+        self.customers = []
+        for i in range(7):
+            customer = Customer.objects.create(
+                first_name="Rescore",
+                last_name=f"Customer{i}",
+                age=30 + i,
+                phone_number=f"333000000{i}",
+                monthly_salary=Decimal('50000'),
+                approved_limit=Decimal('1800000') if i != 3 else Decimal('100000')
+            )
+            for n in range(i % 4):
+                Loan.objects.create(
+                    customer=customer,
+                    loan_amount=Decimal('150000') * (n + 1),
+                    tenure=24,
+                    interest_rate=Decimal('12'),
+                    monthly_repayment=Decimal('7061.02'),
+                    emis_paid_on_time=10 + n,
+                    start_date=date(datetime.now().year - n, 1, 1),
+                    end_date=date(2099, 1, 1),
+                    is_active=n != 2
+                )
+            self.customers.append(customer)
+    
+    def _assert_snapshots_match_calculator(self):
+        snapshots = CustomerScoreSnapshot.objects.in_bulk()
+        self.assertEqual(len(snapshots), len(self.customers))
+        for customer in self.customers:
+            calculator = CreditScoreCalculator(customer)
+            self.assertEqual(snapshots[customer.pk].credit_score, calculator.calculate(), customer.pk)
+            self.assertEqual(snapshots[customer.pk].active_emi_sum, calculator.get_stats()['active_emi_sum'])
+    
+    def test_chunk_scored_with_fixed_queries(self):
+        """Test a chunk costs one aggregate query and one upsert, whatever its size"""
+        low, high = self.customers[0].pk, self.customers[-1].pk + 1
+        # savepoint, aggregate, upsert, release
+        with self.assertNumQueries(4):
+            self.assertEqual(score_customer_range(low - 100, high + 100), 7)
+        self._assert_snapshots_match_calculator()
+    
+    def test_command_rescores_in_chunks_and_updates(self):
+        """Test the command covers every chunk and refreshes existing snapshots"""
+        self.assertEqual(len(customer_id_ranges(3)), 3)
+        out = StringIO()
+        call_command('rescore_customers', chunk_size=3, stdout=out)
+        self.assertIn('chunk 3/3', out.getvalue())
+        self.assertIn('Rescored 7 customers', out.getvalue())
+        self._assert_snapshots_match_calculator()
+        
+        for loan in Loan.objects.filter(customer=self.customers[1]):
+            loan.loan_amount = Decimal('5000000')
+            loan.save()
+        call_command('rescore_customers', stdout=StringIO())
+        self.assertEqual(CustomerScoreSnapshot.objects.get(customer=self.customers[1]).credit_score, 0)
+        self._assert_snapshots_match_calculator()
+    
+    def test_beat_task_fans_out_ranges(self):
+        """Test the nightly task scores every range through subtasks"""
+        for name in ['CELERY_TASK_ALWAYS_EAGER', 'CELERY_TASK_EAGER_PROPAGATES']:
+            self.addCleanup(setattr, celery_app.conf, name, celery_app.conf.get(name, False))
+            setattr(celery_app.conf, name, True)
+        
+        self.assertEqual(rescore_portfolio.delay(chunk_size=2).get(), 4)
+        self._assert_snapshots_match_calculator()
+    
+    def test_empty_table(self):
+        Customer.objects.all().delete()
+        self.assertEqual(customer_id_ranges(), [])
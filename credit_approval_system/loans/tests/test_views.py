@@ -0,0 +1,906 @@
+import csv
+import json
+import threading
+import unittest
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from decimal import Decimal
+from io import StringIO
+from kombu.exceptions import OperationalError as KombuOperationalError
+from credit_system.celery_app import app as celery_app
+from loans.models import Customer, Loan, CustomerCreditProfile, IdempotencyKey, LoanRequest
+from loans.services.score_cache import get_score_cache_stats, reset_score_cache_stats
+from loans.tasks import process_loan_request
+from datetime import date, timedelta
+
+class EligibilityBatchViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customers = []
+        for i in range(3):
+            customer = Customer.objects.create(
+                first_name="Batch",
+                last_name=f"User{i}",
+                age=30,
+                phone_number=f"555000000{i}",
+                monthly_salary=Decimal('60000'),
+                approved_limit=Decimal('2200000')
+            )
+            Loan.objects.create(
+                customer=customer,
+                loan_amount=Decimal('100000'),
+                tenure=12,
+                interest_rate=Decimal('10'),
+                monthly_repayment=Decimal('8791.59'),
+                emis_paid_on_time=12 - i * 4,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                is_active=False
+            )
+            self.customers.append(customer)
+    
+    def _application(self, customer_id, loan_amount=100000, interest_rate=10, tenure=12):
+        return {
+            'customer_id': customer_id,
+            'loan_amount': loan_amount,
+            'interest_rate': interest_rate,
+            'tenure': tenure
+        }
+    
+    def test_batch_matches_single_endpoint(self):
+        """Test each batch result equals the single check-eligibility response"""
+        applications = [self._application(c.customer_id, interest_rate=8) for c in self.customers]
+        response = self.client.post('/api/check-eligibility/batch', {'applications': applications}, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        for application, result in zip(applications, response.json()['results']):
+            single = self.client.post('/api/check-eligibility', application, format='json')
+            self.assertEqual(result, single.json())
+    
+    def test_batch_uses_fixed_number_of_queries(self):
+        """Test the number of queries does not grow with the batch size"""
+        applications = [self._application(c.customer_id) for c in self.customers] * 20
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/check-eligibility/batch', {'applications': applications}, format='json')
+        self.assertEqual(len(response.json()['results']), 60)
+    
+    def test_batch_reports_per_item_errors_in_order(self):
+        """Test invalid items and unknown customers are reported in place"""
+        applications = [
+            self._application(self.customers[0].customer_id),
+            self._application(self.customers[1].customer_id, tenure=0),
+            self._application(999999),
+            self._application(self.customers[2].customer_id),
+        ]
+        response = self.client.post('/api/check-eligibility/batch', {'applications': applications}, format='json')
+        results = response.json()['results']
+        
+        self.assertEqual(results[0]['customer_id'], self.customers[0].customer_id)
+        self.assertIn('tenure', results[1]['errors'])
+        self.assertEqual(results[2], {'customer_id': 999999, 'error': 'Customer not found'})
+        self.assertEqual(results[3]['customer_id'], self.customers[2].customer_id)
+    
+    def test_batch_rejects_empty_list(self):
+        """Test an empty batch is a bad request"""
+        response = self.client.post('/api/check-eligibility/batch', {'applications': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class QuoteMatrixViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.good = Customer.objects.create(
+            first_name="Quote",
+            last_name="Good",
+            age=30,
+            phone_number="5550001000",
+            monthly_salary=Decimal('60000'),
+            approved_limit=Decimal('2200000')
+        )
+        self.risky = Customer.objects.create(
+            first_name="Quote",
+            last_name="Risky",
+            age=30,
+            phone_number="5550001001",
+            monthly_salary=Decimal('60000'),
+            approved_limit=Decimal('200000')
+        )
+        for customer, paid_on_time, amount in ((self.good, 12, '100000'), (self.risky, 0, '400000')):
+            Loan.objects.create(
+                customer=customer,
+                loan_amount=Decimal(amount),
+                tenure=12,
+                interest_rate=Decimal('10'),
+                monthly_repayment=Decimal('8791.59'),
+                emis_paid_on_time=paid_on_time,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                is_active=False
+            )
+        self.grid = {
+            'loan_amounts': [50000, 500000, 2000000],
+            'interest_rates': [8, 12, '16.5'],
+            'tenures': [6, 12, 36],
+        }
+    
+    def test_every_cell_matches_check_eligibility(self):
+        """Test each quote equals the check-eligibility response for its terms"""
+        for customer in (self.good, self.risky):
+            response = self.client.post(
+                '/api/quote-matrix', {'customer_id': customer.customer_id, **self.grid}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+            matrix = response.json()
+            self.assertEqual(matrix['loan_amounts'], ['50000.00', '500000.00', '2000000.00'])
+            self.assertEqual(matrix['interest_rates'], ['8.00', '12.00', '16.50'])
+            
+            for a, amount in enumerate(self.grid['loan_amounts']):
+                for r, rate in enumerate(self.grid['interest_rates']):
+                    for t, tenure in enumerate(self.grid['tenures']):
+                        single = self.client.post('/api/check-eligibility', {
+                            'customer_id': customer.customer_id,
+                            'loan_amount': amount,
+                            'interest_rate': rate,
+                            'tenure': tenure
+                        }, format='json').json()
+                        self.assertEqual(
+                            (matrix['approval'][a][r][t], matrix['corrected_interest_rate'][a][r][t],
+                             matrix['monthly_installment'][a][r][t]),
+                            (single['approval'], single['corrected_interest_rate'], single['monthly_installment'])
+                        )
+        
+        # Both branches are covered: a corrected rate and an EMI-to-salary rejection
+        risky = self.client.post(
+            '/api/quote-matrix', {'customer_id': self.risky.customer_id, **self.grid}, format='json'
+        ).json()
+        self.assertEqual(risky['corrected_interest_rate'][0][0][0], '16.00')
+        self.assertFalse(risky['approval'][2][0][0])
+    
+    def test_matrix_scores_customer_once(self):
+        """Test the query count does not depend on the grid size"""
+        payload = {'customer_id': self.good.customer_id, **self.grid}
+        with self.assertNumQueries(2):
+            self.client.post('/api/quote-matrix', payload, format='json')
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/quote-matrix', payload, format='json')
+        self.assertEqual(len(response.json()['monthly_installment'][0][0]), 3)
+    
+    def test_unknown_customer_and_invalid_grids(self):
+        """Test missing customers, bad values and oversized grids are rejected"""
+        response = self.client.post('/api/quote-matrix', {'customer_id': 999999, **self.grid}, format='json')
+        self.assertEqual(response.status_code, 404)
+        
+        bad_tenure = dict(self.grid, tenures=[12, 0])
+        response = self.client.post(
+            '/api/quote-matrix', {'customer_id': self.good.customer_id, **bad_tenure}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tenures', response.json())
+        
+        oversized = {'loan_amounts': list(range(1, 21)), 'interest_rates': list(range(1, 21)), 'tenures': list(range(1, 11))}
+        response = self.client.post(
+            '/api/quote-matrix', {'customer_id': self.good.customer_id, **oversized}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2500', response.json()['non_field_errors'][0])
+
+
+
+class CreateLoanViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Create",
+            last_name="Loan",
+            age=40,
+            phone_number="5551110000",
+            monthly_salary=Decimal('100000'),
+            approved_limit=Decimal('3600000')
+        )
+    
+    def test_create_loan_updates_profile_and_debt(self):
+        """Test an approved loan is reflected in the profile and current debt"""
+        response = self.client.post('/api/create-loan', {
+            'customer_id': self.customer.customer_id,
+            'loan_amount': 200000,
+            'interest_rate': 14,
+            'tenure': 24
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        
+        loan = Loan.objects.get(loan_id=response.json()['loan_id'])
+        profile = CustomerCreditProfile.objects.get(customer=self.customer)
+        self.assertEqual(profile.loan_count, 1)
+        self.assertEqual(profile.active_loan_sum, Decimal('200000'))
+        self.assertEqual(profile.active_emi_sum, loan.monthly_repayment)
+        self.assertEqual(profile.loans_per_year, {str(date.today().year): 1})
+        
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, Decimal('200000'))
+
+
+
+class LoanScheduleViewTest(TestCase):
+    def setUp(self):
+        customer = Customer.objects.create(
+            first_name="Schedule",
+            last_name="Owner",
+            age=33,
+            phone_number="5552220000",
+            monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        self.loan = Loan.objects.create(
+            customer=customer,
+            loan_amount=Decimal('100000'),
+            tenure=12,
+            interest_rate=Decimal('10'),
+            monthly_repayment=Decimal('8791.59'),
+            emis_paid_on_time=0,
+            start_date=date(2025, 1, 1),
+            end_date=date(2026, 1, 1)
+        )
+        self.url = f'/api/view-loan/{self.loan.loan_id}/schedule'
+    
+    def test_json_schedule_is_streamed(self):
+        """Test the JSON schedule streams every month"""
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        
+        self.assertEqual(body['loan_id'], self.loan.loan_id)
+        self.assertEqual(len(body['schedule']), 12)
+        self.assertEqual(body['schedule'][0], {
+            'month': 1,
+            'due_date': '2025-02-01',
+            'payment': '8791.59',
+            'interest': '833.33',
+            'principal': '7958.26',
+            'balance': '92041.74'
+        })
+        self.assertEqual(body['schedule'][-1]['balance'], '0.00')
+    
+    def test_csv_schedule_month_range(self):
+        """Test the CSV output honours the month range"""
+        response = self.client.get(self.url, {'format': 'csv', 'from_month': 4, 'to_month': 6})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ['month', 'due_date', 'payment', 'interest', 'principal', 'balance'])
+        self.assertEqual([row[0] for row in rows[1:]], ['4', '5', '6'])
+    
+    def test_schedule_errors(self):
+        """Test unknown loans and bad ranges are rejected"""
+        self.assertEqual(self.client.get('/api/view-loan/999999/schedule').status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'from_month': 5, 'to_month': 2}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Retry",
+            last_name="Client",
+            age=29,
+            phone_number="5556660000",
+            monthly_salary=Decimal('100000'),
+            approved_limit=Decimal('3600000')
+        )
+        self.payload = {
+            'customer_id': self.customer.customer_id,
+            'loan_amount': 200000,
+            'interest_rate': 14,
+            'tenure': 24
+        }
+    
+    def _create_loan(self, key, payload=None):
+        return self.client.post(
+            '/api/create-loan', payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+    
+    def test_retry_replays_stored_response(self):
+        """Test a retried key returns the first response without scoring or writing again"""
+        first = self._create_loan('retry-1')
+        self.assertEqual(first.status_code, 201)
+        
+        with mock.patch('loans.services.loan_origination.LoanEligibilityChecker') as checker:
+            with self.assertNumQueries(1):
+                retry = self._create_loan('retry-1')
+        
+        checker.assert_not_called()
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Loan.objects.count(), 1)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, Decimal('200000'))
+    
+    def test_replay_restores_response_headers(self):
+        """Test a retry gets the headers the view set, e.g. the 202's Location"""
+        first = self.client.post(
+            '/api/create-loan?async=1', self.payload, format='json', HTTP_IDEMPOTENCY_KEY='queued'
+        )
+        retry = self.client.post(
+            '/api/create-loan?async=1', self.payload, format='json', HTTP_IDEMPOTENCY_KEY='queued'
+        )
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry['Location'], first['Location'])
+        self.assertEqual(retry['Content-Type'], 'application/json')
+        self.assertEqual(LoanRequest.objects.count(), 1)
+    
+    def test_requests_without_key_or_with_new_key_run(self):
+        """Test only repeated keys are deduplicated"""
+        self.client.post('/api/create-loan', self.payload, format='json')
+        self.client.post('/api/create-loan', self.payload, format='json')
+        self._create_loan('first')
+        self._create_loan('second')
+        self.assertEqual(Loan.objects.count(), 4)
+    
+    def test_key_reused_with_different_body(self):
+        """Test a key cannot be replayed for a different request"""
+        self._create_loan('reused')
+        response = self._create_loan('reused', dict(self.payload, loan_amount=300000))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Loan.objects.count(), 1)
+    
+    def test_keys_are_scoped_per_endpoint(self):
+        """Test the same key on register and create-loan are independent"""
+        self._create_loan('shared')
+        response = self.client.post('/api/register', {
+            'first_name': 'Key',
+            'last_name': 'Owner',
+            'age': 30,
+            'monthly_income': 50000,
+            'phone_number': '5556661111'
+        }, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        
+        retry = self.client.post('/api/register', {
+            'first_name': 'Key',
+            'last_name': 'Owner',
+            'age': 30,
+            'monthly_income': 50000,
+            'phone_number': '5556661111'
+        }, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.assertEqual(retry.json(), response.json())
+        self.assertEqual(Customer.objects.filter(phone_number='5556661111').count(), 1)
+    
+    def test_expired_keys_run_again_and_are_purged(self):
+        """Test keys past their TTL are ignored and removed by the purge command"""
+        self._create_loan('expiring')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        
+        response = self._create_loan('expiring')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Loan.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+        
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Purged 1', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class AsyncLoanRequestTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Queued",
+            last_name="Borrower",
+            age=38,
+            phone_number="5557770000",
+            monthly_salary=Decimal('100000'),
+            approved_limit=Decimal('3600000')
+        )
+        self.payload = {
+            'customer_id': self.customer.customer_id,
+            'loan_amount': 200000,
+            'interest_rate': 14,
+            'tenure': 24
+        }
+        # Run tasks in-process; no broker is needed. Settings are namespaced
+        # with CELERY_, as in settings.py
+        for name in ['CELERY_TASK_ALWAYS_EAGER', 'CELERY_TASK_EAGER_PROPAGATES']:
+            self.addCleanup(setattr, celery_app.conf, name, celery_app.conf.get(name, False))
+            setattr(celery_app.conf, name, True)
+    
+    def test_async_create_loan_is_processed_by_task(self):
+        """Test async mode answers 202 and the task books the loan"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/create-loan?async=true', self.payload, format='json')
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], response.json()['status_url'])
+        
+        result = self.client.get(response['Location']).json()
+        self.assertEqual(result['status'], 'approved')
+        self.assertEqual(result['message'], 'Loan approved successfully')
+        loan = Loan.objects.get(loan_id=result['loan_id'])
+        self.assertEqual(Decimal(result['monthly_installment']), loan.monthly_repayment)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, Decimal('200000'))
+    
+    def test_request_is_pending_until_task_runs(self):
+        """Test the status endpoint reports pending, then the outcome, and redelivery is a no-op"""
+        with mock.patch.object(process_loan_request, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/create-loan?async=1', self.payload, format='json')
+        request_id = response.json()['request_id']
+        delay.assert_called_once_with(request_id)
+        
+        self.assertEqual(self.client.get(response['Location']).json()['status'], 'pending')
+        self.assertEqual(Loan.objects.count(), 0)
+        
+        self.assertEqual(process_loan_request(request_id), LoanRequest.APPROVED)
+        self.assertIsNone(process_loan_request(request_id))
+        self.assertEqual(Loan.objects.count(), 1)
+    
+    def test_request_failed_when_broker_is_down(self):
+        """Test a request the broker refuses is reported failed, not left pending, also on replay"""
+        def post():
+            return self.client.post(
+                '/api/create-loan?async=true', self.payload, format='json', HTTP_IDEMPOTENCY_KEY='broker-down'
+            )
+        
+        refused = KombuOperationalError('[Errno 111] Connection refused')
+        with mock.patch.object(process_loan_request, 'delay', side_effect=refused):
+            with self.assertLogs('loans.tasks', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                response = post()
+        self.assertEqual(response.status_code, 202)
+        
+        result = self.client.get(response['Location']).json()
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(result['message'], 'Loan request could not be queued; please submit it again')
+        self.assertEqual(post().json()['request_id'], response.json()['request_id'])
+        self.assertEqual(Loan.objects.count(), 0)
+    
+    def test_rejected_and_failed_requests(self):
+        """Test rejections and unknown customers are reported on the request"""
+        rejected = LoanRequest.objects.create(
+            customer_id=self.customer.customer_id, loan_amount=5000000, interest_rate=14, tenure=6
+        )
+        missing = LoanRequest.objects.create(customer_id=999999, loan_amount=1000, interest_rate=14, tenure=6)
+        
+        self.assertEqual(process_loan_request.delay(str(rejected.request_id)).get(), LoanRequest.REJECTED)
+        self.assertEqual(process_loan_request.delay(str(missing.request_id)).get(), LoanRequest.FAILED)
+        
+        missing.refresh_from_db()
+        self.assertEqual(missing.message, 'Customer not found')
+        self.assertIsNone(LoanRequest.objects.get(pk=rejected.pk).loan)
+    
+    def test_unknown_loan_request(self):
+        response = self.client.get('/api/loan-requests/00000000-0000-0000-0000-000000000000')
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncViewParityTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = Client(enforce_csrf_checks=True)
+        self.customer = Customer.objects.create(
+            first_name="Async",
+            last_name="Reader",
+            age=44,
+            phone_number="5558880000",
+            monthly_salary=Decimal('75000'),
+            approved_limit=Decimal('2700000')
+        )
+        for amount, active in [(Decimal('300000'), True), (Decimal('150000'), True), (Decimal('90000'), False)]:
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=amount,
+                tenure=36,
+                interest_rate=Decimal('11.5'),
+                monthly_repayment=Decimal('9893.22'),
+                emis_paid_on_time=12,
+                start_date=date(2024, 1, 1),
+                end_date=date(2027, 1, 1),
+                is_active=active
+            )
+        self.loan = Loan.objects.filter(customer=self.customer).first()
+    
+    def _assert_same(self, path, payload=None):
+        if payload is None:
+            sync = self.client.get(f'/api/{path}')
+            asynchronous = self.async_client.get(f'/api/async/{path}')
+        else:
+            sync = self.client.post(f'/api/{path}', payload, format='json')
+            asynchronous = self.async_client.post(
+                f'/api/async/{path}', json.dumps(payload), content_type='application/json'
+            )
+        self.assertEqual(asynchronous.status_code, sync.status_code, path)
+        self.assertEqual(asynchronous.json(), sync.json(), path)
+        return asynchronous
+    
+    def test_read_endpoints_match_sync_views(self):
+        """Test the async views return what the DRF views return"""
+        self.assertEqual(len(self._assert_same(f'view-loans/{self.customer.customer_id}').json()), 2)
+        self._assert_same(f'view-loan/{self.loan.loan_id}')
+        self._assert_same('view-loan/999999')
+        self._assert_same('view-loans/999999')
+    
+    def test_check_eligibility_matches_sync_view(self):
+        """Test async eligibility scores like the sync view, without a CSRF token"""
+        for payload in [
+            {'customer_id': self.customer.customer_id, 'loan_amount': 200000, 'interest_rate': 8, 'tenure': 12},
+            {'customer_id': self.customer.customer_id, 'loan_amount': 9000000, 'interest_rate': 14, 'tenure': 12},
+            {'customer_id': 999999, 'loan_amount': 1000, 'interest_rate': 10, 'tenure': 12},
+            {'customer_id': self.customer.customer_id, 'loan_amount': -5},
+        ]:
+            self._assert_same('check-eligibility', payload)
+    
+    def test_check_eligibility_reads_score_cache(self):
+        """Test async eligibility reuses the score the sync view cached, querying only the customer"""
+        cache.clear()
+        payload = {'customer_id': self.customer.customer_id, 'loan_amount': 200000, 'interest_rate': 8, 'tenure': 12}
+        sync = self.client.post('/api/check-eligibility', payload, format='json')
+        
+        reset_score_cache_stats()
+        with self.assertNumQueries(1):
+            asynchronous = self.async_client.post(
+                '/api/async/check-eligibility', json.dumps(payload), content_type='application/json'
+            )
+        self.assertEqual(asynchronous.json(), sync.json())
+        self.assertEqual(get_score_cache_stats()['hits'], 1)
+    
+    def test_async_views_reject_other_methods(self):
+        self.assertEqual(self.async_client.get('/api/async/check-eligibility').status_code, 405)
+        self.assertEqual(Client().post(f'/api/async/view-loan/{self.loan.loan_id}').status_code, 405)
+
+
+class LoanReadQueryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Many",
+            last_name="Loans",
+            age=52,
+            phone_number="5559990000",
+            monthly_salary=Decimal('400000'),
+            approved_limit=Decimal('14400000')
+        )
+        self.loans = []
+        for i in range(40):
+            self.loans.append(Loan.objects.create(
+                customer=self.customer,
+                loan_amount=Decimal('10000') * (i + 1),
+                tenure=24,
+                interest_rate=Decimal('12'),
+                monthly_repayment=Decimal('470.73') * (i + 1),
+                emis_paid_on_time=i,
+                start_date=date(2024, 1, 1),
+                end_date=date(2026, 1, 1),
+                is_active=i % 10 != 9
+            ))
+    
+    def test_view_loan_is_one_query(self):
+        """Test the loan and its customer come from a single join"""
+        loan = self.loans[3]
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/view-loan/{loan.loan_id}')
+        
+        self.assertEqual(response.json(), {
+            'loan_id': loan.loan_id,
+            'customer': {
+                'id': self.customer.customer_id,
+                'first_name': 'Many',
+                'last_name': 'Loans',
+                'phone_number': '5559990000',
+                'age': 52
+            },
+            'loan_amount': '40000.00',
+            'interest_rate': '12.00',
+            'monthly_repayment': '1882.92',
+            'tenure': 24
+        })
+    
+    def test_view_loans_rows_come_from_one_query(self):
+        """Test active loans and repayments_left come from one query after the validator, whatever the loan count"""
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/view-loans/{self.customer.customer_id}')
+        
+        data = response.json()
+        active = [loan for loan in self.loans if loan.is_active]
+        self.assertEqual([item['loan_id'] for item in data], [loan.loan_id for loan in active])
+        self.assertEqual([item['repayments_left'] for item in data], [loan.emis_left() for loan in active])
+        self.assertEqual(data[0]['loan_amount'], '10000.00')
+        # EMIs paid beyond the tenure never give negative repayments
+        self.assertEqual(data[-1]['repayments_left'], 0)
+    
+    def test_view_loans_without_active_loans_or_customer(self):
+        """Test the existence check is folded into the same query"""
+        Loan.objects.filter(customer=self.customer).update(is_active=False)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/api/view-loans/{self.customer.customer_id}').json(), [])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/view-loans/999999').status_code, 404)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/view-loan/999999').status_code, 404)
+    
+    def test_cursor_pages_cover_the_full_list(self):
+        """Test walking the cursor returns the unpaginated list, one query per page"""
+        url = f'/api/view-loans/{self.customer.customer_id}'
+        full = self.client.get(url).json()
+        
+        collected, params, pages = [], {'limit': 8}, 0
+        while True:
+            with self.assertNumQueries(1):
+                page = self.client.get(url, params).json()
+            pages += 1
+            collected.extend(page['results'])
+            if page['next_cursor'] is None:
+                break
+            self.assertIn(f"cursor={page['next_cursor']}", page['next'])
+            params = {'limit': 8, 'cursor': page['next_cursor']}
+        
+        self.assertEqual(collected, full)
+        self.assertEqual(pages, 5)  # 36 active loans
+    
+    def test_bad_pagination_parameters(self):
+        url = f'/api/view-loans/{self.customer.customer_id}'
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/api/view-loans/999999', {'limit': 5}).status_code, 404)
+    
+    def test_stream_writes_ndjson(self):
+        """Test the stream mode yields one loan per line in a single query"""
+        url = f'/api/view-loans/{self.customer.customer_id}'
+        full = self.client.get(url).json()
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'stream': 1})
+            body = b''.join(response.streaming_content).decode()
+        
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], full)
+        self.assertEqual(self.client.get('/api/view-loans/999999', {'stream': 1}).status_code, 404)
+
+
+class LoanReadCachingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(
+            first_name="Polled",
+            last_name="Customer",
+            age=41,
+            phone_number="5558880000",
+            monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        self.loans = [
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=Decimal('100000') * (i + 1),
+                tenure=12,
+                interest_rate=Decimal('10'),
+                monthly_repayment=Decimal('8791.59') * (i + 1),
+                emis_paid_on_time=2,
+                start_date=date(2024, 1, 1),
+                end_date=date(2025, 1, 1)
+            )
+            for i in range(3)
+        ]
+        self.loan_url = f'/api/view-loan/{self.loans[0].loan_id}'
+        self.list_url = f'/api/view-loans/{self.customer.customer_id}'
+    
+    def test_responses_carry_validators(self):
+        for url in (self.loan_url, self.list_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertRegex(response['ETag'], r'^"[0-9a-f]{40}"$')
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+    
+    def test_matching_if_none_match_returns_304(self):
+        """Test a repeat poll gets 304 from the validator query alone"""
+        for url in (self.loan_url, self.list_url):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+            
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}').status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+    
+    def test_304_skips_serialization(self):
+        etag = self.client.get(self.loan_url)['ETag']
+        with mock.patch('loans.fast_serializers.loan_detail') as serializer:
+            self.assertEqual(self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        serializer.assert_not_called()
+    
+    def test_cached_body_is_served_without_serializing(self):
+        first = self.client.get(self.list_url).json()
+        with mock.patch('loans.fast_serializers.customer_loans') as serializer, self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.list_url).json(), first)
+        serializer.assert_not_called()
+    
+    def test_loan_save_changes_etags_and_body(self):
+        loan_etag = self.client.get(self.loan_url)['ETag']
+        list_etag = self.client.get(self.list_url)['ETag']
+        
+        loan = self.loans[0]
+        loan.emis_paid_on_time = 5
+        loan.save()
+        
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['repayments_left'], 7)
+        
+        loan.monthly_repayment = Decimal('9000.00')
+        loan.save()
+        response = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=loan_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['monthly_repayment'], '9000.00')
+    
+    def test_loan_deactivation_and_delete_change_list(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.loans[1].is_active = False
+        self.loans[1].save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([item['loan_id'] for item in response.json()], [self.loans[0].loan_id, self.loans[2].loan_id])
+        
+        self.loans[2].delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual([item['loan_id'] for item in response.json()], [self.loans[0].loan_id])
+    
+    def test_customer_change_revalidates_loan_detail(self):
+        """Test the customer's name is part of the loan detail validator"""
+        etag = self.client.get(self.loan_url)['ETag']
+        self.customer.first_name = "Renamed"
+        self.customer.save()
+        response = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['customer']['first_name'], "Renamed")
+    
+    def test_stale_cache_entry_is_not_served(self):
+        """Test an entry the signals missed (queryset update) is rejected by its ETag"""
+        self.client.get(self.loan_url)
+        Loan.objects.filter(loan_id=self.loans[0].loan_id).update(
+            tenure=24, updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertEqual(self.client.get(self.loan_url).json()['tenure'], 24)
+
+
+class RegistrationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.existing = Customer.objects.create(
+            first_name="Already",
+            last_name="Here",
+            age=30,
+            phone_number="5554440000",
+            monthly_salary=Decimal('50000'),
+            approved_limit=Decimal('1800000')
+        )
+    
+    def registration(self, phone_number, **overrides):
+        data = {
+            'first_name': 'New',
+            'last_name': 'Customer',
+            'age': 28,
+            'monthly_income': 75000,
+            'phone_number': phone_number
+        }
+        data.update(overrides)
+        return data
+    
+    def test_register_inserts_without_lookup(self):
+        """Test the phone number is not looked up before the INSERT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/register', self.registration('5554441111'), format='json')
+        customer_queries = [query['sql'] for query in queries if '"customers"' in query['sql']]
+        self.assertEqual(len(customer_queries), 1)
+        self.assertTrue(customer_queries[0].startswith('INSERT'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['approved_limit'], '2700000.00')
+        self.assertTrue(CustomerCreditProfile.objects.filter(customer_id=response.json()['customer_id']).exists())
+    
+    def test_duplicate_phone_number_is_a_400(self):
+        response = self.client.post('/api/register', self.registration('5554440000'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'phone_number': ['Phone number already registered']})
+        self.assertEqual(Customer.objects.filter(phone_number='5554440000').count(), 1)
+    
+    def test_other_integrity_errors_are_not_a_400(self):
+        """Test a conflict that is not the phone number is raised, not reported as a taken number"""
+        with mock.patch.object(Customer, 'save', side_effect=IntegrityError('UNIQUE constraint failed: customers.customer_id')):
+            with self.assertRaises(IntegrityError):
+                self.client.post('/api/register', self.registration('5554441111'), format='json')
+    
+    def test_duplicate_with_idempotency_key_is_stored(self):
+        """Test the savepoint keeps the key's transaction usable after the IntegrityError"""
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'dup-phone'}
+        first = self.client.post('/api/register', self.registration('5554440000'), format='json', **headers)
+        retry = self.client.post('/api/register', self.registration('5554440000'), format='json', **headers)
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+    
+    def test_batch_reports_per_item_results_in_order(self):
+        customers = [
+            self.registration('5554442222'),
+            self.registration('5554440000'),  # already registered
+            self.registration('5554443333', age=12),
+            self.registration('5554442222'),  # repeated in the batch
+            self.registration('5554444444', first_name='Last'),
+        ]
+        response = self.client.post('/api/register/batch', {'customers': customers}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        
+        taken = {'errors': {'phone_number': ['Phone number already registered']}}
+        self.assertEqual(results[0]['phone_number'], '5554442222')
+        self.assertEqual(results[1], taken)
+        self.assertIn('age', results[2]['errors'])
+        self.assertEqual(results[3], taken)
+        self.assertEqual(results[4]['name'], 'Last Customer')
+        
+        created = [results[0]['customer_id'], results[4]['customer_id']]
+        self.assertEqual(Customer.objects.filter(customer_id__in=created).count(), 2)
+        self.assertEqual(CustomerCreditProfile.objects.filter(customer_id__in=created).count(), 2)
+    
+    def test_batch_without_conflicts_uses_fixed_number_of_queries(self):
+        for size in (5, 50):
+            customers = [self.registration(f'55{size:02d}{i:06d}') for i in range(size)]
+            with self.assertNumQueries(4):  # savepoint, customers, profiles, release
+                response = self.client.post('/api/register/batch', {'customers': customers}, format='json')
+            self.assertEqual(len(response.json()['results']), size)
+    
+    def test_batch_matches_single_registration(self):
+        single = self.client.post('/api/register', self.registration('5554445555'), format='json').json()
+        batch = self.client.post(
+            '/api/register/batch', {'customers': [self.registration('5554446666')]}, format='json'
+        ).json()['results'][0]
+        self.assertEqual(set(batch), set(single))
+        self.assertEqual(batch['approved_limit'], single['approved_limit'])
+    
+    def test_batch_rejects_empty_and_oversized(self):
+        self.assertEqual(self.client.post('/api/register/batch', {'customers': []}, format='json').status_code, 400)
+        too_many = [self.registration(str(i)) for i in range(1001)]
+        self.assertEqual(self.client.post('/api/register/batch', {'customers': too_many}, format='json').status_code, 400)
+
+
+@unittest.skipUnless(connection.features.test_db_allows_multiple_connections, 'test database takes one writer at a time')
+class ConcurrentRegistrationTest(TransactionTestCase):
+    THREADS = 12
+    
+    def test_parallel_registrations_of_one_phone_number(self):
+        """Test the unique constraint lets exactly one of the racing registrations through"""
+        barrier = threading.Barrier(self.THREADS)
+        responses = []
+        
+        def submit():
+            try:
+                barrier.wait()
+                responses.append(APIClient().post('/api/register', {
+                    'first_name': 'Racing',
+                    'last_name': 'Customer',
+                    'age': 30,
+                    'monthly_income': 50000,
+                    'phone_number': '5554446666'
+                }, format='json'))
+            finally:
+                connections.close_all()
+        
+        threads = [threading.Thread(target=submit) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(response.status_code for response in responses), [201] + [400] * (self.THREADS - 1))
+        self.assertEqual(Customer.objects.filter(phone_number='5554446666').count(), 1)
@@ -1,10 +1,20 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('register', views.register_customer, name='register'),
+    path('register/batch', views.register_customers_batch, name='register-batch'),
     path('check-eligibility', views.check_eligibility, name='check-eligibility'),
+    path('check-eligibility/batch', views.check_eligibility_batch, name='check-eligibility-batch'),
+    path('quote-matrix', views.quote_matrix, name='quote-matrix'),
     path('create-loan', views.create_loan, name='create-loan'),
+    path('loan-requests/<uuid:request_id>', views.view_loan_request, name='view-loan-request'),
     path('view-loan/<int:loan_id>', views.view_loan, name='view-loan'),
+    path('view-loan/<int:loan_id>/schedule', views.view_loan_schedule, name='view-loan-schedule'),
     path('view-loans/<int:customer_id>', views.view_loans_by_customer, name='view-loans'),
+    
+    # Async versions of the read-heavy endpoints, for ASGI deployments
+    path('async/check-eligibility', async_views.check_eligibility, name='async-check-eligibility'),
+    path('async/view-loan/<int:loan_id>', async_views.view_loan, name='async-view-loan'),
+    path('async/view-loans/<int:customer_id>', async_views.view_loans_by_customer, name='async-view-loans'),
 ]
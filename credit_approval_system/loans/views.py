@@ -1,25 +1,70 @@
+import base64
+import csv
+import json
+from itertools import chain
+from decimal import Decimal
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from datetime import date
-from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
 
-from .models import Customer, Loan
+from . import fast_serializers
+from .db_router import read_from_replica
+from .idempotency import idempotent
+from .tasks import dispatch_loan_request
+from .models import Customer, Loan, LoanRequest
+from .renderers import ORJSONRenderer
 from .serializers import (
+    PHONE_NUMBER_TAKEN,
     CustomerRegistrationSerializer,
-    CustomerResponseSerializer,
+    CustomerRegistrationBatchSerializer,
     LoanEligibilityRequestSerializer,
-    LoanEligibilityResponseSerializer,
+    LoanEligibilityBatchRequestSerializer,
+    QuoteMatrixRequestSerializer,
     CreateLoanRequestSerializer,
-    CreateLoanResponseSerializer,
-    LoanDetailSerializer,
-    CustomerLoanSerializer
+    LoanRequestSerializer
 )
-from .services import LoanEligibilityChecker, calculate_monthly_installment, round_to_nearest_lakh
+from .services.loan_queries import (
+    customer_active_loans_queryset,
+    customer_loans_validator,
+    loan_detail_rows
+)
+from .services.response_cache import (
+    cache_body,
+    customer_loans_key,
+    get_cached_body,
+    loan_detail_key,
+    make_etag
+)
+from .services import (
+    LoanEligibilityChecker,
+    check_eligibility_batch as run_eligibility_batch,
+    quote_matrix as run_quote_matrix,
+    calculate_monthly_installment,
+    amortization_schedule,
+    originate_loan,
+    round_to_nearest_lakh
+)
+from .services.registration import create_customers
+
+SCHEDULE_COLUMNS = ['month', 'due_date', 'payment', 'interest', 'principal', 'balance']
+
+LOANS_PAGE_SIZE = 100
+LOANS_MAX_PAGE_SIZE = 1000
+LOANS_STREAM_CHUNK_SIZE = 2000
+
+# Renderers of the hot endpoints; the rest use REST_FRAMEWORK's default
+FAST_RENDERERS = [ORJSONRenderer]
+
+# Loan data is per customer, so no shared caches; clients always revalidate
+LOAN_READ_CACHE_CONTROL = 'private, no-cache'
 
 
 @api_view(['POST'])
+@idempotent
 def register_customer(request):
     """Register a new customer"""
     serializer = CustomerRegistrationSerializer(data=request.data)
@@ -27,28 +72,74 @@ def register_customer(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    data = serializer.validated_data
+    customer = _new_customer(serializer.validated_data)
+    try:
+        # Savepoint, so a duplicate leaves @idempotent's transaction usable
+        with transaction.atomic():
+            customer.save()
+    except IntegrityError:
+        # Only a taken phone number is the client's fault; anything else
+        # (a primary key clash, a failing profile insert) is a server error
+        if not Customer.objects.filter(phone_number=customer.phone_number).exists():
+            raise
+        return Response({'phone_number': [PHONE_NUMBER_TAKEN]}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Calculate approved limit
-    monthly_salary = data['monthly_income']
-    approved_limit = round_to_nearest_lakh(monthly_salary * 36)
+    return Response(fast_serializers.registered_customer(customer), status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@idempotent
+def register_customers_batch(request):
+    """Register a batch of customers, reporting the outcome per item in order"""
+    serializer = CustomerRegistrationBatchSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    items = serializer.validated_data['customers']
+    results = [None] * len(items)
+    taken = {'errors': {'phone_number': [PHONE_NUMBER_TAKEN]}}
     
-    # Create customer
-    customer = Customer.objects.create(
+    # Valid items by phone number; a repeat within the batch counts as taken
+    pending = {}
+    for index, item in enumerate(items):
+        item_serializer = CustomerRegistrationSerializer(data=item)
+        if not item_serializer.is_valid():
+            results[index] = {'errors': item_serializer.errors}
+            continue
+        customer = _new_customer(item_serializer.validated_data)
+        if customer.phone_number in pending:
+            results[index] = taken
+        else:
+            pending[customer.phone_number] = (index, customer)
+    
+    create_customers([customer for _, customer in pending.values()])
+    for index, customer in pending.values():
+        if customer.customer_id is None:
+            results[index] = taken
+        else:
+            results[index] = fast_serializers.registered_customer(customer)
+    
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+def _new_customer(data):
+    """Unsaved Customer for validated registration data"""
+    monthly_salary = data['monthly_income']
+    return Customer(
         first_name=data['first_name'],
         last_name=data['last_name'],
         age=data['age'],
         phone_number=data['phone_number'],
         monthly_salary=monthly_salary,
-        approved_limit=approved_limit,
+        approved_limit=round_to_nearest_lakh(monthly_salary * 36),
         current_debt=0
     )
-    
-    response_serializer = CustomerResponseSerializer(customer)
-    return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['POST'])
+@renderer_classes(FAST_RENDERERS)
+@read_from_replica
 def check_eligibility(request):
     """Check loan eligibility for a customer"""
     serializer = LoanEligibilityRequestSerializer(data=request.data)
@@ -77,23 +168,63 @@ def check_eligibility(request):
     
     result = checker.check_eligibility()
     
-    response_serializer = LoanEligibilityResponseSerializer(data=result)
-    response_serializer.is_valid()
+    return Response(fast_serializers.validated_eligibility_result(result), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@renderer_classes(FAST_RENDERERS)
+@read_from_replica
+def check_eligibility_batch(request):
+    """Check loan eligibility for a batch of applications"""
+    serializer = LoanEligibilityBatchRequestSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    applications = serializer.validated_data['applications']
+    results = [None] * len(applications)
+    
+    # Validate each application on its own so errors are reported per item
+    valid_indexes = []
+    valid_applications = []
+    for index, item in enumerate(applications):
+        item_serializer = LoanEligibilityRequestSerializer(data=item)
+        if item_serializer.is_valid():
+            valid_indexes.append(index)
+            valid_applications.append(item_serializer.validated_data)
+        else:
+            results[index] = {'errors': item_serializer.errors}
+    
+    eligibility_results = run_eligibility_batch(valid_applications)
+    
+    found = []
+    for index, application, result in zip(valid_indexes, valid_applications, eligibility_results):
+        if result is None:
+            results[index] = {
+                'customer_id': application['customer_id'],
+                'error': 'Customer not found'
+            }
+        else:
+            found.append((index, result))
     
-    return Response(response_serializer.data, status=status.HTTP_200_OK)
+    for index, result in found:
+        results[index] = fast_serializers.eligibility_result(result)
+    
+    return Response({'results': results}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
-def create_loan(request):
-    """Create a new loan"""
-    serializer = CreateLoanRequestSerializer(data=request.data)
+@renderer_classes(FAST_RENDERERS)
+@read_from_replica
+def quote_matrix(request):
+    """Eligibility for a grid of loan amounts, interest rates and tenures in one request"""
+    serializer = QuoteMatrixRequestSerializer(data=request.data)
     
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     data = serializer.validated_data
     
-    # Get customer
     try:
         customer = Customer.objects.get(customer_id=data['customer_id'])
     except Customer.DoesNotExist:
@@ -102,17 +233,45 @@ def create_loan(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Check eligibility
-    checker = LoanEligibilityChecker(
-        customer=customer,
-        loan_amount=data['loan_amount'],
-        interest_rate=data['interest_rate'],
-        tenure=data['tenure']
+    # Scored once; every cell reuses the score and current EMI load
+    quotes = run_quote_matrix(customer, data['loan_amounts'], data['interest_rates'], data['tenures'])
+    
+    return Response(
+        fast_serializers.quote_matrix(data['loan_amounts'], data['interest_rates'], data['tenures'], quotes),
+        status=status.HTTP_200_OK
     )
+
+
+@api_view(['POST'])
+@renderer_classes(FAST_RENDERERS)
+@idempotent
+def create_loan(request):
+    """Create a new loan"""
+    serializer = CreateLoanRequestSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    
+    if request.query_params.get('async') in ('1', 'true'):
+        return enqueue_loan_request(data)
     
-    eligibility_result = checker.check_eligibility()
+    # Eligibility check, loan insert and debt update run under a lock on the customer
+    try:
+        customer, eligibility_result, loan = originate_loan(
+            customer_id=data['customer_id'],
+            loan_amount=data['loan_amount'],
+            interest_rate=data['interest_rate'],
+            tenure=data['tenure']
+        )
+    except Customer.DoesNotExist:
+        return Response(
+            {'error': 'Customer not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    if not eligibility_result['approval']:
+    if loan is None:
         response_data = {
             'loan_id': None,
             'customer_id': customer.customer_id,
@@ -120,29 +279,7 @@ def create_loan(request):
             'message': 'Loan not approved based on credit score or EMI-to-salary ratio',
             'monthly_installment': eligibility_result['monthly_installment']
         }
-        response_serializer = CreateLoanResponseSerializer(data=response_data)
-        response_serializer.is_valid()
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
-    
-    # Create loan
-    start_date = date.today()
-    end_date = start_date + relativedelta(months=data['tenure'])
-    
-    loan = Loan.objects.create(
-        customer=customer,
-        loan_amount=data['loan_amount'],
-        tenure=data['tenure'],
-        interest_rate=eligibility_result['corrected_interest_rate'],
-        monthly_repayment=eligibility_result['monthly_installment'],
-        emis_paid_on_time=0,
-        start_date=start_date,
-        end_date=end_date,
-        is_active=True
-    )
-    
-    # Update customer's current debt
-    customer.current_debt += data['loan_amount']
-    customer.save()
+        return Response(fast_serializers.validated_create_loan_result(response_data), status=status.HTTP_200_OK)
     
     response_data = {
         'loan_id': loan.loan_id,
@@ -152,24 +289,252 @@ def create_loan(request):
         'monthly_installment': float(loan.monthly_repayment)
     }
     
-    response_serializer = CreateLoanResponseSerializer(data=response_data)
-    response_serializer.is_valid()
+    return Response(fast_serializers.validated_create_loan_result(response_data), status=status.HTTP_201_CREATED)
+
+
+def enqueue_loan_request(data):
+    """Queue a validated create-loan request for the worker and answer 202 right away"""
+    loan_request = LoanRequest.objects.create(
+        customer_id=data['customer_id'],
+        loan_amount=data['loan_amount'],
+        interest_rate=data['interest_rate'],
+        tenure=data['tenure']
+    )
+    request_id = str(loan_request.request_id)
+    transaction.on_commit(lambda: dispatch_loan_request(request_id))
     
-    return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+    status_url = f'/api/loan-requests/{request_id}'
+    response = Response(
+        {'request_id': request_id, 'status': loan_request.status, 'status_url': status_url},
+        status=status.HTTP_202_ACCEPTED
+    )
+    response['Location'] = status_url
+    return response
 
 
 @api_view(['GET'])
-def view_loan(request, loan_id):
-    """View details of a specific loan"""
-    loan = get_object_or_404(Loan, loan_id=loan_id)
-    serializer = LoanDetailSerializer(loan)
+def view_loan_request(request, request_id):
+    """Report the status of a queued create-loan request"""
+    try:
+        loan_request = LoanRequest.objects.get(request_id=request_id)
+    except LoanRequest.DoesNotExist:
+        return Response(
+            {'error': 'Loan request not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    serializer = LoanRequestSerializer(loan_request)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
+@read_from_replica
+def view_loan(request, loan_id):
+    """
+    View details of a specific loan.
+    The ETag follows the loan's and its customer's updated_at; a matching
+    If-None-Match gets 304 without serializing.
+    """
+    row = loan_detail_rows().filter(loan_id=loan_id).first()
+    if row is None:
+        raise Http404
+    etag = make_etag(row['loan_id'], row['updated_at'], row['customer__updated_at'])
+    if _etag_matches(request, etag):
+        return _with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+    
+    key = loan_detail_key(loan_id)
+    data = get_cached_body(key, etag)
+    if data is None:
+        data = fast_serializers.loan_detail(row)
+        cache_body(key, etag, data)
+    return _with_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+
+@api_view(['GET'])
+@renderer_classes(FAST_RENDERERS)
+@read_from_replica
 def view_loans_by_customer(request, customer_id):
-    """View all loans for a specific customer"""
-    customer = get_object_or_404(Customer, customer_id=customer_id)
-    loans = Loan.objects.filter(customer=customer, is_active=True)
-    serializer = CustomerLoanSerializer(loans, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    """
+    View all loans for a specific customer.
+    ?limit= and/or ?cursor= return one page with a cursor for the next;
+    ?stream=1 streams every loan as NDJSON. Without either the full
+    list is returned as before, with an ETag over the customer's active
+    loans and a cached body.
+    """
+    params = request.query_params
+    if params.get('stream') in ('1', 'true'):
+        return _stream_customer_loans(customer_id)
+    if 'cursor' in params or 'limit' in params:
+        return _customer_loans_page(request, customer_id)
+    
+    # Count and latest updated_at of the active loans: one aggregate row
+    # decides 404, 304 or a cached body before any loan row is read
+    validator = customer_loans_validator(customer_id)
+    if validator is None:
+        raise Http404
+    active_loans, last_change = validator
+    etag = make_etag(customer_id, active_loans, last_change)
+    if _etag_matches(request, etag):
+        return _with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+    
+    key = customer_loans_key(customer_id)
+    data = get_cached_body(key, etag)
+    if data is None:
+        data = []
+        if active_loans:
+            data = fast_serializers.customer_loans(customer_active_loans_queryset(customer_id))
+        cache_body(key, etag, data)
+    return _with_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+
+def _etag_matches(request, etag):
+    """If-None-Match names etag (weak comparison, as RFC 9110 asks for GET)"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def _with_validators(response, etag):
+    response['ETag'] = etag
+    response['Cache-Control'] = LOAN_READ_CACHE_CONTROL
+    return response
+
+
+def _encode_cursor(loan_id):
+    return base64.urlsafe_b64encode(str(loan_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Last loan_id of the previous page; ValueError for a malformed token"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+def _customer_loans_page(request, customer_id):
+    """Keyset page: loan_id > cursor, ordered by loan_id, one query"""
+    params = request.query_params
+    try:
+        limit = int(params.get('limit', LOANS_PAGE_SIZE))
+        after = _decode_cursor(params['cursor']) if params.get('cursor') else None
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= limit <= LOANS_MAX_PAGE_SIZE:
+        return Response(
+            {'error': f'limit must be between 1 and {LOANS_MAX_PAGE_SIZE}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # One extra row tells whether another page follows
+    rows = list(customer_active_loans_queryset(customer_id, after=after)[:limit + 1])
+    if not rows:
+        raise Http404
+    loans = [row for row in rows if row['loan_id'] is not None]
+    
+    next_cursor = next_url = None
+    if len(loans) > limit:
+        loans = loans[:limit]
+        next_cursor = _encode_cursor(loans[-1]['loan_id'])
+        query = params.copy()
+        query['cursor'] = next_cursor
+        next_url = f'{request.build_absolute_uri(request.path)}?{query.urlencode()}'
+    
+    return Response({
+        'results': fast_serializers.customer_loans(loans),
+        'next_cursor': next_cursor,
+        'next': next_url
+    }, status=status.HTTP_200_OK)
+
+
+def _ndjson_loans(rows):
+    for row in rows:
+        if row['loan_id'] is not None:
+            yield json.dumps(fast_serializers.customer_loan(row), separators=(',', ':')) + '\n'
+
+
+def _stream_customer_loans(customer_id):
+    """Every active loan as one JSON object per line, fetched in chunks"""
+    rows = customer_active_loans_queryset(customer_id).iterator(chunk_size=LOANS_STREAM_CHUNK_SIZE)
+    # The first row decides between 404 and a stream, before any byte is sent
+    first = next(rows, None)
+    if first is None:
+        raise Http404
+    return StreamingHttpResponse(_ndjson_loans(chain([first], rows)), content_type='application/x-ndjson')
+
+
+def _schedule_values(row):
+    """Schedule row as JSON/CSV-ready values, money as 2-decimal strings"""
+    values = []
+    for column in SCHEDULE_COLUMNS:
+        value = row[column]
+        if isinstance(value, Decimal):
+            value = str(value.quantize(Decimal('0.01')))
+        elif value is not None and column == 'due_date':
+            value = value.isoformat()
+        values.append(value)
+    return values
+
+
+def _stream_schedule_json(loan_id, rows):
+    yield f'{{"loan_id":{loan_id},"schedule":['
+    for index, row in enumerate(rows):
+        item = json.dumps(dict(zip(SCHEDULE_COLUMNS, _schedule_values(row))), separators=(',', ':'))
+        yield item if index == 0 else ',' + item
+    yield ']}'
+
+
+class _Echo:
+    """File-like object that hands back what csv.writer writes"""
+    def write(self, value):
+        return value
+
+
+def _stream_schedule_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(SCHEDULE_COLUMNS)
+    for row in rows:
+        yield writer.writerow(_schedule_values(row))
+
+
+@require_GET
+def view_loan_schedule(request, loan_id):
+    """Stream the amortization schedule of a loan as JSON or CSV"""
+    loan = Loan.objects.filter(loan_id=loan_id).values(
+        'loan_amount', 'interest_rate', 'tenure', 'monthly_repayment', 'start_date'
+    ).first()
+    if loan is None:
+        return JsonResponse({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    output_format = request.GET.get('format', 'json')
+    if output_format not in ('json', 'csv'):
+        return JsonResponse({'error': 'format must be json or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        from_month = int(request.GET.get('from_month', 1))
+        to_month = int(request.GET.get('to_month', loan['tenure']))
+    except ValueError:
+        return JsonResponse({'error': 'from_month and to_month must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= from_month <= to_month:
+        return JsonResponse(
+            {'error': 'Month range must satisfy 1 <= from_month <= to_month'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rows = amortization_schedule(
+        loan['loan_amount'],
+        loan['interest_rate'],
+        loan['tenure'],
+        monthly_installment=loan['monthly_repayment'],
+        start_date=loan['start_date'],
+        from_month=from_month,
+        to_month=to_month
+    )
+    
+    if output_format == 'csv':
+        response = StreamingHttpResponse(_stream_schedule_csv(rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="loan-{loan_id}-schedule.csv"'
+        return response
+    
+    return StreamingHttpResponse(_stream_schedule_json(loan_id, rows), content_type='application/json')